@@ -37,16 +37,22 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'core',
     'user',
     'recipe',
+    'benchmark',
     'rest_framework',
     'drf_spectacular',
     'rest_framework.authtoken'
 ]
 
 MIDDLEWARE = [
+    'core.middleware.InstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.CompressionMiddleware',
+    'core.middleware.ReplicaPinMiddleware',
+    'core.middleware.RateLimitHeadersMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -55,6 +61,30 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# ?since= syncs re-send changes this close to the token, accept tokens as
+# old as the tombstones kept by prune_tombstones, and page their rows
+SYNC_OVERLAP_SECONDS = int(os.environ.get('SYNC_OVERLAP_SECONDS', 10))
+SYNC_TOMBSTONE_DAYS = int(os.environ.get('SYNC_TOMBSTONE_DAYS', 30))
+SYNC_PAGE_SIZE = int(os.environ.get('SYNC_PAGE_SIZE', 500))
+
+# ?q= searches rank at most this many of the newest matches
+SEARCH_MAX_MATCHES = int(os.environ.get('SEARCH_MAX_MATCHES', 1000))
+
+# smaller bodies are sent uncompressed; brotli needs the Brotli package
+COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', 1024))
+COMPRESSION_GZIP_LEVEL = int(os.environ.get('COMPRESSION_GZIP_LEVEL', 6))
+COMPRESSION_BROTLI_QUALITY = int(
+    os.environ.get('COMPRESSION_BROTLI_QUALITY', 4)
+)
+
+# /metrics is only served to these addresses
+METRICS_ALLOWED_IPS = os.environ.get(
+    'METRICS_ALLOWED_IPS', '127.0.0.1,::1'
+).split(',')
+
+# In DEBUG, log a warning when a request runs the same query this often
+N_PLUS_ONE_THRESHOLD = int(os.environ.get('N_PLUS_ONE_THRESHOLD', 5))
+
 ROOT_URLCONF = 'app.urls'
 
 TEMPLATES = [
@@ -79,16 +109,75 @@ WSGI_APPLICATION = 'app.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/3.2/ref/settings/#databases
 
+# core.db is Django's PostgreSQL backend plus connection health checks
+# and an optional in-process pool, enabled by setting DB_POOL_SIZE.
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': 'core.db',
         'HOST': os.environ.get('DB_HOST'),
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('DB_USER'),
         'PASSWORD': os.environ.get('DB_PASSWORD'),
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': (
+            os.environ.get('DB_CONN_HEALTH_CHECKS', '1') == '1'
+        ),
+        'POOL': {
+            'SIZE': int(os.environ['DB_POOL_SIZE']),
+            'MAX_OVERFLOW': int(os.environ.get('DB_POOL_MAX_OVERFLOW', 10)),
+            'TIMEOUT': float(os.environ.get('DB_POOL_TIMEOUT', 30)),
+        } if os.environ.get('DB_POOL_SIZE') else None,
+    }
+}
+
+# Read replicas, e.g. DB_REPLICA_HOSTS=replica1,replica2, share the primary's
+# name and credentials. core.routers sends reads to them, and
+# ReplicaPinMiddleware keeps a client on the primary for
+# DATABASE_REPLICA_PIN_SECONDS after it writes.
+
+DATABASE_REPLICAS = []
+for index, host in enumerate(
+        filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(',')), 1):
+    DATABASES[f'replica_{index}'] = dict(
+        DATABASES['default'],
+        HOST=host.strip(),
+        TEST={'MIRROR': 'default'},
+    )
+    DATABASE_REPLICAS.append(f'replica_{index}')
+
+DATABASE_ROUTERS = ['core.routers.PrimaryReplicaRouter']
+DATABASE_REPLICA_PIN_SECONDS = int(
+    os.environ.get('DB_REPLICA_PIN_SECONDS', 5)
+)
+
+
+# Cache
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+# Use a shared backend when running several worker processes so cached
+# responses are invalidated across all of them.
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
     }
 }
 
+RESPONSE_CACHE_ALIAS = 'default'
+RESPONSE_CACHE_TIMEOUT = int(os.environ.get('RESPONSE_CACHE_TIMEOUT', 300))
+
+# Render recipe tags from the denormalized Recipe.tags_cache snapshot
+# instead of joining the tags table on reads
+RECIPE_TAGS_CACHE = os.environ.get('RECIPE_TAGS_CACHE', '1') == '1'
+
+# Render recipe and tag lists from .values() rows with precompiled field
+# conversions; recipe lists need RECIPE_TAGS_CACHE for their tags
+LIST_ROW_SERIALIZERS = os.environ.get('LIST_ROW_SERIALIZERS', '1') == '1'
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -108,6 +197,29 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Password hashing
+# Signup, password changes and token issue hash in the request worker. At
+# most PASSWORD_HASHING_CONCURRENCY hashes run at once; a request waiting
+# PASSWORD_HASHING_TIMEOUT seconds for a slot gets a 503. Raise
+# PASSWORD_HASH_ITERATIONS for stronger hashes; counts below Django's
+# default are ignored.
+
+PASSWORD_HASHERS = [
+    'core.hashing.TunedPBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+]
+PASSWORD_HASH_ITERATIONS = int(
+    os.environ.get('PASSWORD_HASH_ITERATIONS', 260000)
+)
+PASSWORD_HASHING_CONCURRENCY = int(
+    os.environ.get('PASSWORD_HASHING_CONCURRENCY', os.cpu_count() or 1)
+)
+PASSWORD_HASHING_TIMEOUT = float(
+    os.environ.get('PASSWORD_HASHING_TIMEOUT', 5)
+)
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/3.2/topics/i18n/
@@ -135,6 +247,50 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = 'core.User'
 
+# Token authentication cache
+# Entries live in-process for TOKEN_AUTH_CACHE_TTL seconds. With several
+# workers set TOKEN_AUTH_CACHE_ALIAS to keep them in that Django cache
+# instead, so a token revoked in one worker is rejected by all of them.
+
+TOKEN_AUTH_CACHE_SIZE = int(os.environ.get('TOKEN_AUTH_CACHE_SIZE', 10000))
+TOKEN_AUTH_CACHE_TTL = int(os.environ.get('TOKEN_AUTH_CACHE_TTL', 60))
+TOKEN_AUTH_CACHE_ALIAS = os.environ.get('TOKEN_AUTH_CACHE_ALIAS')
+
+# default page size of the recipe and tag lists, which set their own
+# pagination classes
+API_PAGE_SIZE = int(os.environ.get('API_PAGE_SIZE', 100))
+
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'core.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+    'DEFAULT_THROTTLE_CLASSES': [
+        'core.throttling.AnonBucketThrottle',
+        'core.throttling.UserBucketThrottle',
+        'core.throttling.ScopedBucketThrottle',
+    ],
+    # N/period allows bursts of N and refills N per period; bulk is
+    # counted in recipes written or deleted rather than requests
+    'DEFAULT_THROTTLE_RATES': {
+        'anon': os.environ.get('THROTTLE_RATE_ANON', '1200/min'),
+        'user': os.environ.get('THROTTLE_RATE_USER', '6000/min'),
+        'token': os.environ.get('THROTTLE_RATE_TOKEN', '60/min'),
+        'bulk': os.environ.get('THROTTLE_RATE_BULK', '20000/hour'),
+        'export': os.environ.get('THROTTLE_RATE_EXPORT', '60/hour'),
+    },
+    # anonymous clients are throttled by the address NUM_PROXIES hops from
+    # the end of X-Forwarded-For; 0 ignores the header for REMOTE_ADDR
+    'NUM_PROXIES': int(os.environ.get('NUM_PROXIES', 0)),
 }
+
+THROTTLE_ENABLED = os.environ.get('THROTTLE_ENABLED', '1') == '1'
+# buckets are spent with add() and incr(), which must be atomic and shared
+# across workers: memcached or redis
+THROTTLE_CACHE_ALIAS = 'default'
@@ -0,0 +1,72 @@
+"""
+Benchmark data generator
+"""
+import random
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+
+from core.models import Recipe, Tag
+
+# every seeded user signs in with this password
+PASSWORD = 'benchmark-pass-123'
+
+WORDS = [
+    'chicken', 'curry', 'lentil', 'soup', 'salad', 'pasta', 'rice', 'bean',
+    'tomato', 'garlic', 'ginger', 'lemon', 'spicy', 'roast', 'grilled',
+    'baked', 'vegan', 'cheese', 'mushroom', 'noodle', 'pancake', 'stew',
+]
+
+
+def _sentence(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize()
+
+
+def email(seed, index):
+    """Return the address of a seeded user"""
+    return f'benchmark-{seed}-{index}@example.com'
+
+
+def seed(users=1, recipes=10000, tags=50, tags_per_recipe=3, seed=0,
+         batch_size=2000, password=PASSWORD):
+    """Create users, each with the given number of recipes and tags"""
+    rng = random.Random(seed)
+    password = make_password(password)
+    created = get_user_model().objects.bulk_create(
+        get_user_model()(
+            email=email(seed, index),
+            name=f'Benchmark {index}',
+            password=password
+        )
+        for index in range(users)
+    )
+
+    RecipeTag = Recipe.tags.through
+    for user in created:
+        user_tags = Tag.objects.bulk_create(
+            Tag(user=user, name=f'{rng.choice(WORDS)} {index}')
+            for index in range(tags)
+        )
+        for start in range(0, recipes, batch_size):
+            batch = Recipe.objects.bulk_create(
+                Recipe(
+                    user=user,
+                    title=_sentence(rng, 3),
+                    description=_sentence(rng, 12),
+                    time_minutes=rng.randint(5, 180),
+                    price=Decimal(rng.randint(100, 99999)) / 100,
+                    link=f'https://example.com/{start + index}'
+                )
+                for index in range(min(batch_size, recipes - start))
+            )
+            RecipeTag.objects.bulk_create(
+                RecipeTag(recipe_id=recipe.id, tag_id=tag.id)
+                for recipe in batch
+                for tag in rng.sample(
+                    user_tags, min(tags_per_recipe, len(user_tags))
+                )
+            )
+        Recipe.objects.filter(user=user).update_tag_fields()
+
+    return created
@@ -0,0 +1,155 @@
+"""
+Django command to benchmark API endpoints against generated data
+"""
+import json
+from contextlib import ExitStack
+from fnmatch import fnmatch
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import override_settings
+
+from benchmark import data
+from benchmark.runner import measure
+from benchmark.scenarios import SCENARIOS, Context, HTTPContext
+
+
+class Command(BaseCommand):
+    """Django command to run benchmark scenarios"""
+    help = (
+        'Seed benchmark data, time the selected scenarios in-process and '
+        'roll the data back, or time them against a running server.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'patterns', nargs='*', default=['*'],
+            help='Scenario name patterns, e.g. "recipes.filter.*"'
+        )
+        parser.add_argument('--users', type=int, default=1)
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument('--tags', type=int, default=50)
+        parser.add_argument('--tags-per-recipe', type=int, default=3)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument(
+            '--url',
+            help='Base URL of a running server to benchmark over HTTP, '
+                 'using data from benchmark_seed'
+        )
+        parser.add_argument(
+            '--email', default=data.email(0, 0),
+            help='Seeded user to authenticate as with --url'
+        )
+        parser.add_argument(
+            '--concurrency', type=int, default=1,
+            help='Concurrent requests with --url'
+        )
+        parser.add_argument(
+            '--output', help='Write the results to this JSON file'
+        )
+        parser.add_argument(
+            '--response-cache', action='store_true',
+            help='Serve repeated lists from the response cache'
+        )
+        parser.add_argument('--list', action='store_true',
+                            help='List the scenarios and exit')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        server = options['url'] is not None
+        names = [
+            name for name in SCENARIOS
+            if any(fnmatch(name, pattern) for pattern in options['patterns'])
+            and not (server and SCENARIOS[name].local)
+        ]
+        if options['list']:
+            self.stdout.write('\n'.join(names))
+            return
+        if not names:
+            raise CommandError('No scenarios match the given patterns')
+        if options['concurrency'] > 1 and not server:
+            raise CommandError('--concurrency needs --url')
+
+        with ExitStack() as stack:
+            if server:
+                ctx = self._server_context(options)
+            else:
+                ctx = self._local_context(stack, options)
+
+            results = {}
+            for name in names:
+                stats = measure(
+                    SCENARIOS[name](ctx), options['repeat'],
+                    concurrency=options['concurrency'],
+                    count_queries=not server
+                )
+                results[name] = stats
+                self._report(name, stats)
+
+            if not server:
+                transaction.set_rollback(True)
+
+        if options['output']:
+            self._write(options, results)
+
+    def _local_context(self, stack, options):
+        """Seed data inside a transaction rolled back on exit"""
+        cache_timeout = None if options['response_cache'] else 0
+        stack.enter_context(override_settings(
+            ALLOWED_HOSTS=['testserver'],
+            RESPONSE_CACHE_TIMEOUT=cache_timeout,
+            THROTTLE_ENABLED=False
+        ))
+        stack.enter_context(transaction.atomic())
+        self.stdout.write(
+            f"Seeding {options['users']} users with {options['recipes']} "
+            f"recipes and {options['tags']} tags"
+        )
+        user = data.seed(
+            users=options['users'],
+            recipes=options['recipes'],
+            tags=options['tags'],
+            tags_per_recipe=options['tags_per_recipe']
+        )[0]
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        return Context(user)
+
+    def _server_context(self, options):
+        """Use already seeded data and a token for the server"""
+        try:
+            user = get_user_model().objects.get(email=options['email'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(
+                f"No user {options['email']}, run benchmark_seed first"
+            )
+        self.stdout.write(f"Benchmarking {options['url']} as {user.email}")
+        return HTTPContext(user, options['url'])
+
+    def _report(self, name, stats):
+        queries = stats['queries']
+        queries = '  -' if queries is None else f'{queries:>3}'
+        self.stdout.write(
+            f'{name:<32} {stats["req_per_s"]:>9.1f} req/s  '
+            f'p50 {stats["p50_ms"]:>8.2f} ms  '
+            f'p95 {stats["p95_ms"]:>8.2f} ms  '
+            f'p99 {stats["p99_ms"]:>8.2f} ms  '
+            f'{queries} queries  '
+            f'{stats["bytes"]:>9} bytes'
+        )
+
+    def _write(self, options, results):
+        params = {
+            key: options[key] for key in (
+                'users', 'recipes', 'tags', 'tags_per_recipe', 'repeat',
+                'concurrency', 'response_cache', 'url',
+            )
+        }
+        with open(options['output'], 'w') as fp:
+            json.dump({
+                'mode': 'server' if options['url'] else 'local',
+                'params': params,
+                'results': results,
+            }, fp, indent=2, sort_keys=True)
+        self.stdout.write(f"Wrote {options['output']}")
@@ -0,0 +1,57 @@
+"""
+Django command to compare benchmark results against a baseline
+"""
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmark.runner import compare
+
+
+class Command(BaseCommand):
+    """Django command to diff two benchmark JSON files"""
+    help = (
+        'Compare benchmark --output files and fail when a scenario got '
+        'slower than allowed or runs more queries.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('baseline')
+        parser.add_argument('current')
+        parser.add_argument(
+            '--max-slowdown', type=float, default=10.0,
+            help='Allowed p95 latency increase or throughput drop, percent'
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        baseline = self._load(options['baseline'])
+        current = self._load(options['current'])
+        if baseline['mode'] != current['mode']:
+            self.stderr.write(
+                f"Comparing {baseline['mode']} with {current['mode']} results"
+            )
+
+        rows, regressions = compare(
+            baseline, current, options['max_slowdown']
+        )
+        for row in rows:
+            name, metric, before, after, change = row
+            flag = ' !' if row in regressions else ''
+            self.stdout.write(
+                f'{name:<32} {metric:<10} {before:>10.2f} {after:>10.2f} '
+                f'{change:>+8.1f}%{flag}'
+            )
+        if regressions:
+            raise CommandError(
+                f'{len(regressions)} regressions: ' + ', '.join(
+                    f'{name} {metric}' for name, metric, *_ in regressions
+                )
+            )
+
+    def _load(self, path):
+        try:
+            with open(path) as fp:
+                return json.load(fp)
+        except (OSError, ValueError) as exc:
+            raise CommandError(f'Cannot read {path}: {exc}')
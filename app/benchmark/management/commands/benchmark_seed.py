@@ -0,0 +1,40 @@
+"""
+Django command to seed persistent data for benchmarking a server
+"""
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from benchmark import data
+
+
+class Command(BaseCommand):
+    """Django command to seed benchmark users, recipes and tags"""
+    help = (
+        'Create benchmark users with recipes and tags, for benchmark --url. '
+        'Every user signs in with the benchmark password.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1)
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument('--tags', type=int, default=50)
+        parser.add_argument('--tags-per-recipe', type=int, default=3)
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help='Random seed, also part of the user emails'
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        with transaction.atomic():
+            users = data.seed(
+                users=options['users'],
+                recipes=options['recipes'],
+                tags=options['tags'],
+                tags_per_recipe=options['tags_per_recipe'],
+                seed=options['seed']
+            )
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        for user in users:
+            self.stdout.write(user.email)
@@ -0,0 +1,91 @@
+"""
+Timing and query counting for benchmark scenarios
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+def percentile(samples, fraction):
+    """Return the nearest-rank percentile of a list of samples"""
+    ordered = sorted(samples)
+    index = max(int(round(fraction * len(ordered))) - 1, 0)
+    return ordered[index]
+
+
+def _timed(func):
+    start = time.perf_counter()
+    size = func()
+    return time.perf_counter() - start, size or 0
+
+
+def measure(func, repeat, warmup=1, concurrency=1, count_queries=True):
+    """Call func repeatedly, returning latency and query statistics.
+
+    With concurrency above one the calls are spread over that many
+    threads and throughput is taken from the wall clock. Queries are
+    only counted for serial calls on this thread's connection.
+    """
+    for _ in range(warmup):
+        func()
+
+    queries = None
+    start = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(concurrency) as executor:
+            results = list(executor.map(
+                lambda _: _timed(func), range(repeat)
+            ))
+    elif count_queries:
+        results, queries = [], []
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as captured:
+                results.append(_timed(func))
+            queries.append(len(captured))
+    else:
+        results = [_timed(func) for _ in range(repeat)]
+    elapsed = time.perf_counter() - start
+
+    timings = [timing for timing, _ in results]
+    return {
+        'repeat': repeat,
+        'concurrency': concurrency,
+        'req_per_s': repeat / elapsed if elapsed else 0.0,
+        'mean_ms': sum(timings) / repeat * 1000,
+        'p50_ms': percentile(timings, 0.50) * 1000,
+        'p95_ms': percentile(timings, 0.95) * 1000,
+        'p99_ms': percentile(timings, 0.99) * 1000,
+        'queries': max(queries) if queries else None,
+        'bytes': max(size for _, size in results),
+    }
+
+
+def compare(baseline, current, max_slowdown):
+    """Return (name, metric, before, after, change) rows comparing two
+       benchmark results, and the subset exceeding max_slowdown percent.
+
+    Latency regresses when it grows, throughput when it shrinks and
+    query counts on any increase.
+    """
+    rows, regressions = [], []
+    for name, after in current['results'].items():
+        before = baseline['results'].get(name)
+        if before is None:
+            continue
+        for metric, worse in (('p95_ms', 1), ('req_per_s', -1),
+                              ('queries', 1)):
+            old, new = before.get(metric), after.get(metric)
+            if old is None or new is None:
+                continue
+            change = (new - old) / old * 100 if old else 0.0
+            row = (name, metric, old, new, change)
+            rows.append(row)
+            if metric == 'queries':
+                regressed = new > old
+            else:
+                regressed = change * worse > max_slowdown
+            if regressed:
+                regressions.append(row)
+    return rows, regressions
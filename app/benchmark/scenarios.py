@@ -0,0 +1,314 @@
+"""
+Benchmark scenarios
+
+Each scenario receives a Context and returns a callable performing one
+operation; the callable returns the size of its response in bytes.
+Scenarios registered as local call Python directly and only run
+in-process.
+"""
+import itertools
+import json
+import urllib.parse
+import urllib.request
+
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from core import compression
+from core.models import Recipe, Tag
+from core.renderers import FastJSONRenderer
+from recipe.serializers import RecipeRowSerializer, RecipeSerializer
+
+from .data import PASSWORD
+
+SCENARIOS = {}
+
+
+def scenario(name, local=False):
+    """Register a scenario under name"""
+    def register(func):
+        func.local = local
+        SCENARIOS[name] = func
+        return func
+    return register
+
+
+class Context:
+    """Seeded data and in-process API clients, one authenticated as a
+       seeded user, going through Django's request handler"""
+
+    def __init__(self, user, password=PASSWORD):
+        self.user = user
+        self.password = password
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+        self.anonymous = APIClient()
+        self.tag_ids = list(
+            Tag.objects.filter(user=user).order_by('id')
+            .values_list('id', flat=True)
+        )
+        self.recipe_ids = list(
+            Recipe.objects.filter(user=user).order_by('id')
+            .values_list('id', flat=True)
+        )
+        self._sequence = itertools.count()
+
+    def unique(self, prefix):
+        """Return prefix followed by a number unique to this run"""
+        return f'{prefix}-{self.user.pk}-{next(self._sequence)}'
+
+    def request(self, method, url, params=None, data=None,
+                expected=status.HTTP_200_OK, auth=True, headers=None):
+        """Return a callable issuing a request and returning the body
+           size; data may be a callable building a fresh payload"""
+        client = self.client if auth else self.anonymous
+        send = getattr(client, method.lower())
+        meta = {
+            'HTTP_' + name.upper().replace('-', '_'): value
+            for name, value in (headers or {}).items()
+        }
+
+        def request():
+            payload = data() if callable(data) else data
+            if method == 'GET':
+                res = send(url, params, **meta)
+            else:
+                res = send(url, payload, format='json', **meta)
+            assert res.status_code == expected, res.status_code
+            return len(res.content)
+        return request
+
+    def get(self, url, params=None, headers=None):
+        return self.request('GET', url, params, headers=headers)
+
+    def post(self, url, data, expected=status.HTTP_201_CREATED, auth=True):
+        return self.request('POST', url, data=data, expected=expected,
+                            auth=auth)
+
+    def render(self, serializer_class, items, renderer_class=JSONRenderer):
+        """Return a callable serializing and rendering items to JSON"""
+        def serialize():
+            data = serializer_class(items, many=True).data
+            return len(renderer_class().render(data))
+        return serialize
+
+    def render_only(self, data, renderer_class):
+        """Return a callable rendering already serialized data"""
+        def render():
+            return len(renderer_class().render(data))
+        return render
+
+
+class HTTPContext(Context):
+    """Seeded data and requests to a running server at base_url,
+       authenticated with a token issued to the seeded user"""
+
+    def __init__(self, user, base_url, password=PASSWORD):
+        super().__init__(user, password)
+        self.base_url = base_url.rstrip('/')
+        self.token = None
+        res = self._send('POST', reverse('user:token'), data={
+            'email': user.email,
+            'password': password,
+        }, auth=False)
+        self.token = json.loads(res)['token']
+
+    def _send(self, method, url, params=None, data=None,
+              expected=status.HTTP_200_OK, auth=True, headers=None):
+        url = self.base_url + url
+        if params:
+            url += '?' + urllib.parse.urlencode(params)
+        headers = {'Accept': 'application/json', **(headers or {})}
+        body = None
+        if data is not None:
+            body = json.dumps(data).encode()
+            headers['Content-Type'] = 'application/json'
+        if auth:
+            headers['Authorization'] = f'Token {self.token}'
+        req = urllib.request.Request(url, body, headers, method=method)
+        with urllib.request.urlopen(req) as res:
+            assert res.status == expected, res.status
+            return res.read()
+
+    def request(self, method, url, params=None, data=None,
+                expected=status.HTTP_200_OK, auth=True, headers=None):
+        def request():
+            payload = data() if callable(data) else data
+            return len(self._send(method, url, params, payload, expected,
+                                  auth, headers))
+        return request
+
+
+RECIPE_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+TOKEN_URL = reverse('user:token')
+CREATE_USER_URL = reverse('user:create')
+ME_URL = reverse('user:me')
+
+
+def recipe_detail_url(recipe_id):
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+@scenario('recipes.list')
+def recipe_list(ctx):
+    return ctx.get(RECIPE_URL)
+
+
+@scenario('recipes.list.fields')
+def recipe_list_fields(ctx):
+    return ctx.get(RECIPE_URL, {'fields': 'id,title'})
+
+
+@scenario('recipes.list.gzip')
+def recipe_list_gzip(ctx):
+    return ctx.get(RECIPE_URL, headers={'Accept-Encoding': 'gzip'})
+
+
+if 'br' in compression.available_encodings():
+    @scenario('recipes.list.br')
+    def recipe_list_br(ctx):
+        return ctx.get(RECIPE_URL, headers={'Accept-Encoding': 'br'})
+
+
+@scenario('recipes.detail')
+def recipe_detail(ctx):
+    recipe_id = ctx.recipe_ids[len(ctx.recipe_ids) // 2]
+    return ctx.get(recipe_detail_url(recipe_id))
+
+
+@scenario('recipes.create')
+def recipe_create(ctx):
+    return ctx.post(RECIPE_URL, lambda: {
+        'title': ctx.unique('Benchmark recipe'),
+        'time_minutes': 20,
+        'price': '7.50',
+        'tags': [{'name': 'benchmark'}, {'name': 'quick'}],
+    })
+
+
+@scenario('recipes.filter.tags_any')
+def recipe_filter_tags_any(ctx):
+    tags = ','.join(str(tag_id) for tag_id in ctx.tag_ids[:3])
+    return ctx.get(RECIPE_URL, {'tags': tags})
+
+
+@scenario('recipes.filter.tags_all')
+def recipe_filter_tags_all(ctx):
+    tags = ','.join(str(tag_id) for tag_id in ctx.tag_ids[:2])
+    return ctx.get(RECIPE_URL, {'tags': tags, 'tags_match': 'all'})
+
+
+@scenario('recipes.filter.max_time')
+def recipe_filter_max_time(ctx):
+    return ctx.get(RECIPE_URL, {'max_time': 15})
+
+
+@scenario('recipes.filter.price_lte')
+def recipe_filter_price_lte(ctx):
+    return ctx.get(RECIPE_URL, {'price_lte': '20.00'})
+
+
+@scenario('recipes.filter.combined')
+def recipe_filter_combined(ctx):
+    return ctx.get(RECIPE_URL, {
+        'tags': str(ctx.tag_ids[0]),
+        'max_time': 60,
+        'price_lte': '500.00',
+    })
+
+
+@scenario('recipes.search')
+def recipe_search(ctx):
+    return ctx.get(RECIPE_URL, {'q': 'spicy lentil'})
+
+
+@scenario('tags.list')
+def tag_list(ctx):
+    return ctx.get(TAGS_URL)
+
+
+@scenario('tags.assigned_only')
+def tag_assigned_only(ctx):
+    return ctx.get(TAGS_URL, {'assigned_only': 1})
+
+
+@scenario('user.me')
+def user_me(ctx):
+    return ctx.get(ME_URL)
+
+
+@scenario('user.create')
+def user_create(ctx):
+    return ctx.post(CREATE_USER_URL, lambda: {
+        'email': ctx.unique('benchmark-new') + '@example.com',
+        'password': ctx.password,
+        'name': 'Benchmark',
+    }, auth=False)
+
+
+@scenario('token.issue')
+def token_issue(ctx):
+    return ctx.post(TOKEN_URL, {
+        'email': ctx.user.email,
+        'password': ctx.password,
+    }, expected=status.HTTP_200_OK, auth=False)
+
+
+@scenario('serialize.recipes.model', local=True)
+def serialize_recipes_model(ctx):
+    recipes = list(
+        Recipe.objects.filter(user=ctx.user).order_by('-id')
+        .only('user', *RecipeSerializer.Meta.fields[:-1], 'tags_cache')
+    )
+    return ctx.render(RecipeSerializer, recipes)
+
+
+@scenario('serialize.recipes.rows', local=True)
+def serialize_recipes_rows(ctx):
+    rows = list(
+        Recipe.objects.filter(user=ctx.user).order_by('-id')
+        .values(*RecipeRowSerializer.columns())
+    )
+    return ctx.render(RecipeRowSerializer, rows)
+
+
+def _recipe_list_data(ctx):
+    rows = (
+        Recipe.objects.filter(user=ctx.user).order_by('-id')
+        .values(*RecipeRowSerializer.columns())
+    )
+    return RecipeRowSerializer(rows, many=True).data
+
+
+@scenario('render.recipes.drf', local=True)
+def render_recipes_drf(ctx):
+    return ctx.render_only(_recipe_list_data(ctx), JSONRenderer)
+
+
+@scenario('render.recipes.orjson', local=True)
+def render_recipes_orjson(ctx):
+    return ctx.render_only(_recipe_list_data(ctx), FastJSONRenderer)
+
+
+def _compress_list(ctx, coding):
+    """compress a rendered page of the recipe list, timing the CPU cost
+       and reporting the compressed size"""
+    content = FastJSONRenderer().render(_recipe_list_data(ctx)[:100])
+
+    def compress():
+        return len(compression.compress(coding, content))
+    return compress
+
+
+@scenario('compress.recipes.gzip', local=True)
+def compress_recipes_gzip(ctx):
+    return _compress_list(ctx, 'gzip')
+
+
+if 'br' in compression.available_encodings():
+    @scenario('compress.recipes.br', local=True)
+    def compress_recipes_br(ctx):
+        return _compress_list(ctx, 'br')
@@ -0,0 +1,198 @@
+"""
+Test the benchmark management commands
+"""
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connections
+from django.test import LiveServerTestCase, TestCase, override_settings
+
+from benchmark import data
+from benchmark.runner import compare
+from benchmark.scenarios import SCENARIOS
+from core.models import Recipe
+
+
+def results(**scenarios):
+    return {'mode': 'local', 'params': {}, 'results': scenarios}
+
+
+class BenchmarkCommandTests(TestCase):
+    """Test running benchmark scenarios"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def path(self, name):
+        return os.path.join(self.tmp.name, name)
+
+    def test_runs_all_scenarios_and_rolls_back(self):
+        """Test every scenario reports and seeded data is discarded"""
+        out = StringIO()
+
+        call_command('benchmark', recipes=30, tags=5, repeat=2, stdout=out)
+
+        for name in SCENARIOS:
+            self.assertIn(name, out.getvalue())
+        self.assertFalse(Recipe.objects.exists())
+        self.assertFalse(get_user_model().objects.exists())
+
+    def test_unknown_pattern_error(self):
+        """Test selecting no scenarios is an error"""
+        with self.assertRaises(CommandError):
+            call_command('benchmark', 'nothing.*', stdout=StringIO())
+
+    def test_concurrency_needs_url(self):
+        """Test concurrent requests are only made against a server"""
+        with self.assertRaises(CommandError):
+            call_command('benchmark', concurrency=4, stdout=StringIO())
+
+    def test_output_json_baseline(self):
+        """Test results are written with the run parameters"""
+        output = self.path('baseline.json')
+
+        call_command('benchmark', 'recipes.list', 'user.*', users=2,
+                     recipes=10, tags=3, repeat=3, output=output,
+                     stdout=StringIO())
+
+        with open(output) as fp:
+            baseline = json.load(fp)
+        self.assertEqual(baseline['mode'], 'local')
+        self.assertEqual(baseline['params']['users'], 2)
+        self.assertEqual(set(baseline['results']),
+                         {'recipes.list', 'user.me', 'user.create'})
+        stats = baseline['results']['recipes.list']
+        self.assertEqual(stats['repeat'], 3)
+        self.assertGreater(stats['queries'], 0)
+        for key in ('req_per_s', 'p50_ms', 'p95_ms', 'p99_ms', 'bytes'):
+            self.assertGreater(stats[key], 0)
+
+    def test_seed_persists_users(self):
+        """Test benchmark_seed creates users that can sign in"""
+        out = StringIO()
+
+        call_command('benchmark_seed', users=2, recipes=5, tags=2, seed=7,
+                     stdout=out)
+
+        emails = [data.email(7, 0), data.email(7, 1)]
+        self.assertEqual(out.getvalue().split(), emails)
+        user = get_user_model().objects.get(email=emails[0])
+        self.assertTrue(user.check_password(data.PASSWORD))
+        self.assertEqual(Recipe.objects.filter(user=user).count(), 5)
+
+    def test_server_mode_needs_seeded_user(self):
+        """Test benchmarking a server without seeded data is an error"""
+        with self.assertRaises(CommandError):
+            call_command('benchmark', url='http://localhost:1',
+                         stdout=StringIO())
+
+
+class BenchmarkCompareTests(TestCase):
+    """Test comparing benchmark results"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def write(self, name, content):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, 'w') as fp:
+            json.dump(content, fp)
+        return path
+
+    def stats(self, p95_ms=10.0, req_per_s=100.0, queries=3):
+        return {'p95_ms': p95_ms, 'req_per_s': req_per_s,
+                'queries': queries}
+
+    def test_compare_within_threshold(self):
+        """Test small changes are not regressions"""
+        _, regressions = compare(
+            results(a=self.stats()),
+            results(a=self.stats(p95_ms=10.5, req_per_s=96.0)),
+            max_slowdown=10
+        )
+
+        self.assertEqual(regressions, [])
+
+    def test_compare_flags_regressions(self):
+        """Test slower latency, lower throughput and more queries"""
+        _, regressions = compare(
+            results(a=self.stats(), b=self.stats()),
+            results(a=self.stats(p95_ms=12.0),
+                    b=self.stats(req_per_s=80.0, queries=4),
+                    new=self.stats()),
+            max_slowdown=10
+        )
+
+        self.assertEqual(
+            [(name, metric) for name, metric, *_ in regressions],
+            [('a', 'p95_ms'), ('b', 'req_per_s'), ('b', 'queries')]
+        )
+
+    def test_compare_skips_missing_query_counts(self):
+        """Test server results without query counts compare timings"""
+        rows, _ = compare(
+            results(a=self.stats()),
+            results(a=self.stats(queries=None)),
+            max_slowdown=10
+        )
+
+        self.assertEqual([metric for _, metric, *_ in rows],
+                         ['p95_ms', 'req_per_s'])
+
+    def test_command_fails_on_regression(self):
+        """Test benchmark_compare raises on a regression"""
+        baseline = self.write('baseline.json', results(a=self.stats()))
+        current = self.write('current.json',
+                             results(a=self.stats(p95_ms=20.0)))
+        out = StringIO()
+
+        with self.assertRaisesMessage(CommandError, 'a p95_ms'):
+            call_command('benchmark_compare', baseline, current, stdout=out)
+        self.assertIn('+100.0%', out.getvalue())
+
+        call_command('benchmark_compare', baseline, current,
+                     max_slowdown=150, stdout=StringIO())
+
+    def test_command_unreadable_file(self):
+        """Test a missing results file is an error"""
+        with self.assertRaises(CommandError):
+            call_command('benchmark_compare', 'missing.json', 'missing.json')
+
+
+@override_settings(THROTTLE_ENABLED=False)
+class BenchmarkServerTests(LiveServerTestCase):
+    """Test benchmarking a running server over HTTP"""
+
+    @classmethod
+    def setUpClass(cls):
+        # Django 3.2's live server never closes the persistent connections
+        # of its request threads, which keeps the test database in use
+        settings_dict = connections.settings['default']
+        max_age = settings_dict['CONN_MAX_AGE']
+        settings_dict['CONN_MAX_AGE'] = 0
+        cls.addClassCleanup(settings_dict.__setitem__, 'CONN_MAX_AGE', max_age)
+        super().setUpClass()
+
+    def test_server_scenarios(self):
+        """Test HTTP scenarios run concurrently against seeded data"""
+        call_command('benchmark_seed', recipes=10, tags=3, stdout=StringIO())
+        out = StringIO()
+
+        call_command('benchmark', 'recipes.list', 'recipes.create',
+                     'token.issue', 'serialize.*', url=self.live_server_url,
+                     repeat=4, concurrency=2, stdout=out)
+
+        lines = out.getvalue().splitlines()[1:]
+        self.assertEqual([line.split()[0] for line in lines],
+                         ['recipes.list', 'recipes.create', 'token.issue'])
+        self.assertTrue(all(' - queries' in line for line in lines))
+        self.assertEqual(Recipe.objects.filter(
+            title__startswith='Benchmark recipe'
+        ).count(), 5)
@@ -0,0 +1,94 @@
+"""
+Authentication classes for the API's
+"""
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.authentication import TokenAuthentication
+
+
+class TokenCache:
+    """In-process LRU cache of authenticated tokens with a time to live"""
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached value for key, or None if missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout):
+        """Cache value for key for timeout seconds, evicting the least
+           recently used entries"""
+        expires_at = time.monotonic() + timeout
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > settings.TOKEN_AUTH_CACHE_SIZE:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+token_cache = TokenCache()
+
+
+def _cache_key(key):
+    """hash the token so raw keys never reach a shared cache"""
+    return 'auth-token:' + hashlib.sha256(key.encode()).hexdigest()
+
+
+def _tier():
+    """the shared cache when TOKEN_AUTH_CACHE_ALIAS is set, else the
+       in-process LRU; an LRU in front of a shared cache would keep
+       serving tokens other processes have revoked"""
+    alias = settings.TOKEN_AUTH_CACHE_ALIAS
+    return caches[alias] if alias else token_cache
+
+
+def invalidate_token(key):
+    """Drop a token from the cache"""
+    _tier().delete(_cache_key(key))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Token authentication that caches the token and user lookup
+
+    Changes made with bulk update() or delete(), which send no signals,
+    are seen once entries expire after TOKEN_AUTH_CACHE_TTL seconds.
+    """
+
+    def authenticate_credentials(self, key):
+        cache_key = _cache_key(key)
+        cache = _tier()
+
+        cached = cache.get(cache_key)
+        if cached is None:
+            cached = super().authenticate_credentials(key)
+            cache.set(cache_key, cached, settings.TOKEN_AUTH_CACHE_TTL)
+
+        # requests must not share the cached instances
+        user, token = (copy.copy(obj) for obj in cached)
+        token.user = user
+        return user, token
@@ -0,0 +1,65 @@
+"""
+Response body compression with gzip, and brotli when it is installed
+"""
+import zlib
+
+from django.conf import settings
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+
+def available_encodings():
+    """Content codings this process can produce, most preferred first"""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def negotiate(accept_encoding):
+    """Return the preferred coding the Accept-Encoding header allows,
+       or None to send the body as is"""
+    weights = {}
+    for item in accept_encoding.split(','):
+        coding, _sep, params = item.strip().partition(';')
+        weight = 1.0
+        for param in params.split(';'):
+            name, _sep, value = param.strip().partition('=')
+            if name == 'q':
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[coding.strip().lower()] = weight
+
+    for coding in available_encodings():
+        if weights.get(coding, weights.get('*', 0.0)) > 0:
+            return coding
+    return None
+
+
+def compressor(coding):
+    """Return (compress, finish) callables for a content coding"""
+    if coding == 'br':
+        engine = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY)
+        return engine.process, engine.finish
+    engine = zlib.compressobj(
+        settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS
+    )
+    return engine.compress, engine.flush
+
+
+def compress(coding, content):
+    """Compress a whole body"""
+    process, finish = compressor(coding)
+    return process(content) + finish()
+
+
+def compress_sequence(coding, sequence):
+    """Compress a streamed body chunk by chunk"""
+    process, finish = compressor(coding)
+    for chunk in sequence:
+        data = process(chunk)
+        if data:
+            yield data
+    yield finish()
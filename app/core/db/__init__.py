@@ -0,0 +1,4 @@
+"""
+PostgreSQL backend adding connection health checks and an optional
+in-process connection pool to Django's psycopg2 backend
+"""
@@ -0,0 +1,116 @@
+"""
+Django's PostgreSQL backend with connection health checks and pooling
+
+CONN_HEALTH_CHECKS backports the Django 4.1 setting of the same name: a
+persistent connection reused by a new request is checked with a cheap
+query before its first cursor and reopened if the server dropped it.
+
+POOL, a dict of SIZE, MAX_OVERFLOW and TIMEOUT, hands out connections
+from an in-process pool shared by the threads of a worker. Closing a
+connection returns it to the pool, which happens at the end of every
+request, so CONN_MAX_AGE does not apply to pooled connections.
+"""
+import psycopg2.extras
+from django.db.backends.postgresql import base
+
+from . import pool
+from .creation import DatabaseCreation
+
+
+def _connect(conn_params):
+    """open a raw connection set up the way Django's backend does"""
+    connection = base.Database.connect(**conn_params)
+    psycopg2.extras.register_default_jsonb(
+        conn_or_curs=connection, loads=lambda x: x
+    )
+    return connection
+
+
+def _is_usable(connection):
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+    except base.Database.Error:
+        return False
+    return True
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    creation_class = DatabaseCreation
+    health_check_done = False
+    _pool = None
+
+    @property
+    def health_check_enabled(self):
+        return self.settings_dict.get('CONN_HEALTH_CHECKS', False)
+
+    def get_pool(self, conn_params):
+        """Return the pool for these connection parameters, if pooling"""
+        options = self.settings_dict.get('POOL')
+        if not options:
+            return None
+        label = '{user}@{host}:{port}/{database}'.format(
+            user=conn_params.get('user', ''),
+            host=conn_params.get('host', ''),
+            port=conn_params.get('port', ''),
+            database=conn_params['database'],
+        )
+        return pool.get_pool(
+            label,
+            lambda: _connect(conn_params),
+            size=options.get('SIZE', 5),
+            overflow=options.get('MAX_OVERFLOW', 10),
+            timeout=options.get('TIMEOUT', 30.0),
+        )
+
+    def get_new_connection(self, conn_params):
+        connection_pool = self.get_pool(conn_params)
+        if connection_pool is None:
+            return super().get_new_connection(conn_params)
+        while True:
+            connection, created = connection_pool.acquire()
+            # a connection may have been dropped while idle in the pool
+            if (created or not self.health_check_enabled
+                    or _is_usable(connection)):
+                break
+            connection_pool.discard(connection)
+        options = self.settings_dict['OPTIONS']
+        try:
+            self.isolation_level = options['isolation_level']
+        except KeyError:
+            self.isolation_level = connection.isolation_level
+        else:
+            if self.isolation_level != connection.isolation_level:
+                connection.set_session(isolation_level=self.isolation_level)
+        self._pool = connection_pool
+        return connection
+
+    def _close(self):
+        if self.connection is None or self._pool is None:
+            return super()._close()
+        with self.wrap_database_errors:
+            connection_pool, self._pool = self._pool, None
+            connection_pool.release(self.connection)
+
+    def connect(self):
+        super().connect()
+        self.health_check_done = True
+
+    def _cursor(self, name=None):
+        self.close_if_health_check_failed()
+        return super()._cursor(name)
+
+    def close_if_health_check_failed(self):
+        """Close the connection if it no longer answers queries"""
+        if (self.connection is None or not self.health_check_enabled
+                or self.health_check_done):
+            return
+        if not self.is_usable():
+            self.close()
+        self.health_check_done = True
+
+    def close_if_unusable_or_obsolete(self):
+        super().close_if_unusable_or_obsolete()
+        self.health_check_done = False
+        if self._pool is not None and not self.in_atomic_block:
+            self.close()
@@ -0,0 +1,18 @@
+"""
+Test database creation for the pooling backend
+"""
+from django.db.backends.postgresql import creation
+
+from . import pool
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+
+    def _create_test_db(self, *args, **kwargs):
+        pool.close_pools()
+        return super()._create_test_db(*args, **kwargs)
+
+    def _destroy_test_db(self, *args, **kwargs):
+        # pooled connections would keep the database in use
+        pool.close_pools()
+        return super()._destroy_test_db(*args, **kwargs)
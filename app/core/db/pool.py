@@ -0,0 +1,160 @@
+"""
+In-process pool of psycopg2 connections
+"""
+import threading
+import time
+from collections import deque
+
+from psycopg2 import OperationalError, extensions
+
+
+class PoolTimeout(OperationalError):
+    """No pooled connection became free within the pool timeout"""
+
+
+class ConnectionPool:
+    """Keep up to size idle connections, open up to overflow more under
+       load, and make callers wait at most timeout seconds for one"""
+
+    # stats that only ever grow; the others are point-in-time values
+    counters = ('acquired', 'created', 'discarded', 'timeouts',
+                'wait_seconds_total')
+
+    def __init__(self, connect, size=5, overflow=10, timeout=30.0):
+        self._connect = connect
+        self.size = size
+        self.overflow = overflow
+        self.timeout = timeout
+        self._idle = deque()
+        self._open = 0
+        self._cond = threading.Condition()
+        self._stats = {
+            'acquired': 0,
+            'created': 0,
+            'discarded': 0,
+            'timeouts': 0,
+            'waiting': 0,
+            'wait_seconds_total': 0.0,
+            'wait_seconds_max': 0.0,
+        }
+
+    def acquire(self):
+        """Return an idle connection, or a new one while below the limit,
+           and whether the connection is new"""
+        queued_at = time.monotonic()
+        deadline = queued_at + self.timeout
+        conn = None
+        with self._cond:
+            self._stats['waiting'] += 1
+            try:
+                while not self._idle and (
+                        self._open >= self.size + self.overflow):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats['timeouts'] += 1
+                        raise PoolTimeout(
+                            f'No connection free after {self.timeout}s'
+                        )
+                    self._cond.wait(remaining)
+            finally:
+                self._stats['waiting'] -= 1
+            if self._idle:
+                conn = self._idle.pop()
+            else:
+                self._open += 1
+            wait = time.monotonic() - queued_at
+            self._stats['acquired'] += 1
+            self._stats['wait_seconds_total'] += wait
+            self._stats['wait_seconds_max'] = max(
+                self._stats['wait_seconds_max'], wait
+            )
+
+        if conn is not None:
+            return conn, False
+        try:
+            conn = self._connect()
+        except BaseException:
+            self._forget()
+            raise
+        with self._cond:
+            self._stats['created'] += 1
+        return conn, True
+
+    def release(self, conn):
+        """Return a connection, closing it if broken or beyond size"""
+        try:
+            if not conn.closed and (
+                    conn.get_transaction_status()
+                    != extensions.TRANSACTION_STATUS_IDLE):
+                conn.rollback()
+            reusable = not conn.closed
+        except Exception:
+            reusable = False
+
+        with self._cond:
+            if reusable and len(self._idle) < self.size:
+                self._idle.append(conn)
+                self._cond.notify()
+                return
+        self.discard(conn)
+
+    def discard(self, conn):
+        """Close a connection taken from the pool instead of returning it"""
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._stats['discarded'] += 1
+        self._forget()
+
+    def _forget(self):
+        with self._cond:
+            self._open -= 1
+            self._cond.notify()
+
+    def close(self):
+        """Close every idle connection"""
+        with self._cond:
+            idle, self._idle = list(self._idle), deque()
+        for conn in idle:
+            self.discard(conn)
+
+    def metrics(self):
+        """Return a snapshot of the pool counters"""
+        with self._cond:
+            return dict(
+                self._stats,
+                size=self.size,
+                overflow=self.overflow,
+                open=self._open,
+                idle=len(self._idle),
+                in_use=self._open - len(self._idle),
+            )
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(key, connect, **options):
+    """Return the pool for key, creating it on first use"""
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = ConnectionPool(connect, **options)
+        return _pools[key]
+
+
+def close_pools():
+    """Close the idle connections of every pool"""
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        pool.close()
+
+
+def metrics():
+    """Return the counters of every pool by database and user"""
+    with _pools_lock:
+        pools = dict(_pools)
+    return {key: pool.metrics() for key, pool in pools.items()}
@@ -0,0 +1,111 @@
+"""
+Password hashing with a bounded number of hashes running at once
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.utils.translation import gettext_lazy as _
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class HashingBusy(APIException):
+    """No hashing slot became free within PASSWORD_HASHING_TIMEOUT"""
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = _('Too many passwords are being checked, try again '
+                       'shortly')
+    default_code = 'hashing_busy'
+
+
+class HashingLimiter:
+    """Let at most PASSWORD_HASHING_CONCURRENCY hashes run at once,
+       making callers wait at most PASSWORD_HASHING_TIMEOUT seconds for a
+       slot, and count the waits"""
+
+    # stats that only ever grow; the others are point-in-time values
+    counters = ('completed', 'timeouts', 'wait_seconds_total')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._slots = None
+        self._size = None
+        self._stats = {
+            'completed': 0,
+            'timeouts': 0,
+            'waiting': 0,
+            'in_flight': 0,
+            'wait_seconds_total': 0.0,
+            'wait_seconds_max': 0.0,
+        }
+
+    def _get_slots(self):
+        size = settings.PASSWORD_HASHING_CONCURRENCY
+        with self._lock:
+            if self._size != size:
+                self._slots = threading.BoundedSemaphore(size)
+                self._size = size
+            return self._slots
+
+    @contextmanager
+    def slot(self):
+        """Hold a hashing slot for the block, raising HashingBusy if none
+           frees up in time"""
+        slots = self._get_slots()
+        queued_at = time.monotonic()
+        with self._lock:
+            self._stats['waiting'] += 1
+        acquired = slots.acquire(timeout=settings.PASSWORD_HASHING_TIMEOUT)
+        wait = time.monotonic() - queued_at
+        with self._lock:
+            self._stats['waiting'] -= 1
+            self._stats['wait_seconds_total'] += wait
+            self._stats['wait_seconds_max'] = max(
+                self._stats['wait_seconds_max'], wait
+            )
+            self._stats['in_flight' if acquired else 'timeouts'] += 1
+        if not acquired:
+            raise HashingBusy()
+
+        try:
+            yield
+        finally:
+            slots.release()
+            with self._lock:
+                self._stats['in_flight'] -= 1
+                self._stats['completed'] += 1
+
+    def metrics(self):
+        """Return a snapshot of the limiter stats"""
+        with self._lock:
+            return dict(
+                self._stats,
+                concurrency=settings.PASSWORD_HASHING_CONCURRENCY,
+            )
+
+
+limiter = HashingLimiter()
+
+
+class TunedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """PBKDF2 running PASSWORD_HASH_ITERATIONS rounds, never fewer than
+       Django's default, inside a limiter slot.
+
+    Hashes with fewer rounds are upgraded at the user's next login; hashes
+    with more are kept.
+    """
+
+    @property
+    def iterations(self):
+        return max(settings.PASSWORD_HASH_ITERATIONS,
+                   PBKDF2PasswordHasher.iterations)
+
+    def encode(self, password, salt, iterations=None):
+        # verify() and harden_runtime() hash through here too
+        with limiter.slot():
+            return super().encode(password, salt, iterations)
+
+    def must_update(self, encoded):
+        return self.decode(encoded)['iterations'] < self.iterations
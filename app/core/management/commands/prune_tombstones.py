@@ -0,0 +1,29 @@
+"""
+Django command to delete tombstones older than any accepted sync token
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.models import Tombstone
+
+
+class Command(BaseCommand):
+    """Django command to prune Tombstone rows"""
+    help = (
+        'Delete tombstones older than SYNC_TOMBSTONE_DAYS; clients with '
+        'older sync tokens are told to sync from scratch.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=settings.SYNC_TOMBSTONE_DAYS
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for commands"""
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        deleted, _ = Tombstone.objects.filter(deleted_at__lt=cutoff).delete()
+        self.stdout.write(self.style.SUCCESS(f'Pruned {deleted} tombstones'))
@@ -0,0 +1,51 @@
+"""
+Django command to rebuild or verify the denormalized recipe tag snapshots
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import F
+
+from core.models import Recipe, recipe_tags_snapshot
+
+
+class Command(BaseCommand):
+    """Django command to rebuild Recipe.tags_cache from the tags table"""
+    help = 'Rebuild the tags_cache snapshot of every recipe'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Only report recipes whose snapshot is out of date'
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for commands"""
+        batch_size = options['batch_size']
+        total = 0
+        last_id = 0
+        while True:
+            ids = list(
+                Recipe.objects.filter(id__gt=last_id)
+                .order_by('id')
+                .values_list('id', flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            last_id = ids[-1]
+            batch = Recipe.objects.filter(id__in=ids)
+            if options['verify']:
+                total += batch.annotate(
+                    snapshot=recipe_tags_snapshot()
+                ).exclude(tags_cache=F('snapshot')).count()
+            else:
+                total += batch.update_tags_cache()
+
+        if options['verify']:
+            if total:
+                raise CommandError(f'{total} recipes have a stale tags_cache')
+            self.stdout.write(self.style.SUCCESS('tags_cache is up to date'))
+        else:
+            self.stdout.write(
+                self.style.SUCCESS(f'Rebuilt tags_cache of {total} recipes')
+            )
@@ -1,24 +1,71 @@
 """
 Django commnad to wait for the database to be available
 """
-from django.core.management.base import BaseCommand
-from time import sleep
-from psycopg2 import OperationalError as Psycopg2OpError
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.migrations.executor import MigrationExecutor
 from django.db.utils import OperationalError
+from psycopg2 import OperationalError as Psycopg2OpError
 
 
 class Command(BaseCommand):
-    """Django command to wait for the database"""
+    """Django command to wait for the databases"""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--timeout', type=float, default=60,
+            help='Give up after this many seconds'
+        )
+        parser.add_argument(
+            '--migrations-applied', action='store_true',
+            help='Also wait until every migration has been applied'
+        )
+        parser.add_argument('--initial-delay', type=float, default=0.05)
+        parser.add_argument('--max-delay', type=float, default=2)
+
+    def ping(self, alias):
+        """Open a connection to alias, raising if it is unavailable"""
+        connections[alias].ensure_connection()
+
+    def pending_migrations(self, alias):
+        """Return the migrations not yet applied on alias"""
+        executor = MigrationExecutor(connections[alias])
+        return executor.migration_plan(executor.loader.graph.leaf_nodes())
 
     def handle(self, *args, **options):
         """Entrypoint for commands"""
         self.stdout.write('waiting for Database')
-        db_up = False
-        while db_up is False:
-            try:
-                self.check(databases=['default'])
-                db_up = True
-            except (Psycopg2OpError, OperationalError):
-                self.stdout.write('Database Unavailable, waiting 1 sec')
-                sleep(1)
+        deadline = time.monotonic() + options['timeout']
+        for alias in connections:
+            self.wait(alias, deadline, options)
         self.stdout.write(self.style.SUCCESS('Database available!'))
+
+    def wait(self, alias, deadline, options):
+        """Retry alias with exponential backoff and full jitter"""
+        # doubled after each failure, but never past max_delay
+        ceiling = min(options['max_delay'], options['initial_delay'])
+        while True:
+            try:
+                self.ping(alias)
+                if options['migrations_applied']:
+                    pending = self.pending_migrations(alias)
+                    if pending:
+                        raise OperationalError(
+                            f'{len(pending)} migrations not applied'
+                        )
+                return
+            except (Psycopg2OpError, OperationalError) as exc:
+                delay = random.uniform(0, ceiling)
+                if time.monotonic() + delay > deadline:
+                    raise CommandError(
+                        f'Database {alias!r} unavailable: {exc}'
+                    )
+                self.stdout.write(
+                    f'Database {alias!r} unavailable, '
+                    f'waiting {delay:.2f} sec'
+                )
+                time.sleep(delay)
+                ceiling = min(options['max_delay'], ceiling * 2)
@@ -0,0 +1,164 @@
+"""
+In-process request metrics rendered in the Prometheus text format
+
+Each worker process keeps its own counters, so scrape every worker (or
+sum across them) when running several.
+"""
+import bisect
+import contextvars
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from rest_framework.serializers import ListSerializer
+
+DURATION_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+_current = contextvars.ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    """What one request spent, filled in while it is served"""
+
+    def __init__(self):
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.serializer_seconds = 0.0
+        self.statements = defaultdict(int)
+        self._serializing = False
+
+
+@contextmanager
+def collect():
+    """Gather the metrics of the code run inside the block"""
+    metrics = RequestMetrics()
+    token = _current.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _current.reset(token)
+
+
+def current():
+    """Return the metrics being gathered, if any"""
+    return _current.get()
+
+
+class TimedDataMixin:
+    """Add the time spent building a serializer's .data to the request"""
+
+    @property
+    def data(self):
+        metrics = _current.get()
+        if metrics is None or metrics._serializing:
+            return super().data
+        metrics._serializing = True
+        started_at = time.perf_counter()
+        try:
+            return super().data
+        finally:
+            metrics.serializer_seconds += time.perf_counter() - started_at
+            metrics._serializing = False
+
+
+class TimedListSerializer(TimedDataMixin, ListSerializer):
+    """ListSerializer recording its serialization time"""
+
+
+class Registry:
+    """Per endpoint counters and a request duration histogram"""
+
+    counters = {
+        'http_requests_total': 'Requests served',
+        'http_request_db_queries_total': 'Database queries run',
+        'http_request_db_seconds_total': 'Time spent in database queries',
+        'http_request_serializer_seconds_total':
+            'Time spent building serializer data',
+        'http_response_bytes_total': 'Response body bytes, not streamed',
+    }
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._counters = defaultdict(lambda: defaultdict(float))
+            self._buckets = defaultdict(lambda: [0] * len(DURATION_BUCKETS))
+            self._duration = defaultdict(float)
+
+    def observe(self, labels, seconds, metrics, size):
+        """Record a served request under labels"""
+        with self._lock:
+            counters = self._counters[labels]
+            counters['http_requests_total'] += 1
+            counters['http_request_db_queries_total'] += metrics.db_queries
+            counters['http_request_db_seconds_total'] += metrics.db_seconds
+            counters['http_request_serializer_seconds_total'] += (
+                metrics.serializer_seconds
+            )
+            counters['http_response_bytes_total'] += size
+            index = bisect.bisect_left(DURATION_BUCKETS, seconds)
+            if index < len(DURATION_BUCKETS):
+                self._buckets[labels][index] += 1
+            self._duration[labels] += seconds
+
+    def render(self, gauges=(), counters=()):
+        """Return the metrics in the Prometheus text exposition format,
+           followed by the (name, help, samples) gauges and counters of
+           other components"""
+        with self._lock:
+            totals = {labels: dict(values)
+                      for labels, values in self._counters.items()}
+            buckets = {labels: list(values)
+                       for labels, values in self._buckets.items()}
+            duration = dict(self._duration)
+
+        lines = []
+        for name, help_text in self.counters.items():
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+            for labels, values in sorted(totals.items()):
+                lines.append(f'{name}{_labels(labels)} {values[name]:g}')
+
+        name = 'http_request_duration_seconds'
+        lines += [f'# HELP {name} Request wall time',
+                  f'# TYPE {name} histogram']
+        for labels, values in sorted(buckets.items()):
+            cumulative = 0
+            for le, count in zip(DURATION_BUCKETS, values):
+                cumulative += count
+                bucket_labels = labels + (('le', f'{le:g}'),)
+                lines.append(f'{name}_bucket{_labels(bucket_labels)} '
+                             f'{cumulative}')
+            total = totals[labels]['http_requests_total']
+            lines.append(
+                f'{name}_bucket{_labels(labels + (("le", "+Inf"),))} '
+                f'{total:g}'
+            )
+            lines.append(f'{name}_sum{_labels(labels)} {duration[labels]:g}')
+            lines.append(f'{name}_count{_labels(labels)} {total:g}')
+
+        for kind, families in (('gauge', gauges), ('counter', counters)):
+            for name, help_text, samples in families:
+                lines += [f'# HELP {name} {help_text}',
+                          f'# TYPE {name} {kind}']
+                for labels, value in samples:
+                    lines.append(f'{name}{_labels(labels)} {value:g}')
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    pairs = ','.join(
+        '{}="{}"'.format(key, str(value).replace('\\', r'\\')
+                         .replace('"', r'\"').replace('\n', r'\n'))
+        for key, value in labels
+    )
+    return '{' + pairs + '}'
+
+
+registry = Registry()
@@ -0,0 +1,177 @@
+"""
+Middleware for the API's
+"""
+import hashlib
+import logging
+import re
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.utils.cache import patch_vary_headers
+
+from . import compression, metrics
+from .routers import use_primary
+
+logger = logging.getLogger(__name__)
+
+# IN lists of different lengths are the same query for N+1 detection
+_IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def _pin_key(request):
+    """cache key identifying the client by its credentials, if any"""
+    credentials = (
+        request.META.get('HTTP_AUTHORIZATION')
+        or request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    )
+    if not credentials:
+        return None
+    digest = hashlib.sha256(credentials.encode()).hexdigest()
+    return f'replica-pin:{digest}'
+
+
+class ReplicaPinMiddleware:
+    """Serve writes, and a client's reads for DATABASE_REPLICA_PIN_SECONDS
+       after its last write, from the primary so it reads its own writes"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.DATABASE_REPLICAS:
+            return self.get_response(request)
+
+        key = _pin_key(request)
+        write = request.method not in SAFE_METHODS
+        pinned = write or (key is not None and cache.get(key) is not None)
+        with use_primary(pinned):
+            response = self.get_response(request)
+        if write and key is not None:
+            cache.set(key, 1, settings.DATABASE_REPLICA_PIN_SECONDS)
+        if pinned and response.streaming:
+            response.streaming_content = self._pinned(
+                response.streaming_content
+            )
+        return response
+
+    def _pinned(self, content):
+        """stream a response body while still reading from the primary"""
+        with use_primary():
+            yield from content
+
+
+class CompressionMiddleware:
+    """Compress response bodies of at least COMPRESSION_MIN_SIZE bytes
+       with the best coding the client accepts, brotli or gzip"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if response.has_header('Content-Encoding'):
+            return response
+        if (not response.streaming
+                and len(response.content) < settings.COMPRESSION_MIN_SIZE):
+            return response
+
+        patch_vary_headers(response, ['Accept-Encoding'])
+        coding = compression.negotiate(
+            request.META.get('HTTP_ACCEPT_ENCODING', '')
+        )
+        if coding is None:
+            return response
+
+        if response.streaming:
+            response.streaming_content = compression.compress_sequence(
+                coding, response.streaming_content
+            )
+            del response['Content-Length']
+        else:
+            compressed = compression.compress(coding, response.content)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response['Content-Length'] = str(len(compressed))
+
+        # the encoded body is no longer byte-identical to the entity
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = coding
+        return response
+
+
+class RateLimitHeadersMiddleware:
+    """Report the most depleted throttle bucket of a request in
+       X-RateLimit-* headers"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        limits = getattr(request, 'rate_limits', None)
+        if limits:
+            bucket = min(
+                limits, key=lambda limit: limit['remaining'] / limit['limit']
+            )
+            response['X-RateLimit-Limit'] = bucket['limit']
+            response['X-RateLimit-Remaining'] = bucket['remaining']
+            response['X-RateLimit-Reset'] = bucket['reset']
+            response['X-RateLimit-Scope'] = bucket['scope']
+        return response
+
+
+class InstrumentationMiddleware:
+    """Record wall time, database queries and time, serializer time and
+       response size per endpoint, and log likely N+1 queries in DEBUG"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started_at = time.perf_counter()
+        with metrics.collect() as collected, ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(self.execute))
+            response = self.get_response(request)
+        seconds = time.perf_counter() - started_at
+
+        match = request.resolver_match
+        view = match.view_name if match else '<unmatched>'
+        size = 0 if response.streaming else len(response.content)
+        metrics.registry.observe(
+            (('view', view), ('method', request.method),
+             ('status', str(response.status_code))),
+            seconds, collected, size
+        )
+        if settings.DEBUG:
+            self.log_repeated_queries(view, collected)
+        return response
+
+    def execute(self, execute, sql, params, many, context):
+        """database execute wrapper timing each query"""
+        started_at = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            collected = metrics.current()
+            if collected is not None:
+                collected.db_queries += 1
+                collected.db_seconds += time.perf_counter() - started_at
+                if settings.DEBUG:
+                    collected.statements[_IN_LIST.sub('IN (...)', sql)] += 1
+
+    def log_repeated_queries(self, view, collected):
+        for sql, count in collected.statements.items():
+            if count >= settings.N_PLUS_ONE_THRESHOLD:
+                logger.warning(
+                    'Possible N+1 query in %s: %d similar queries: %s',
+                    view, count, sql
+                )
@@ -0,0 +1,43 @@
+from django.db import migrations, models
+
+
+def merge_duplicate_tags(apps, schema_editor):
+    """point recipes at the oldest of any same-named tags and drop the rest"""
+    Tag = apps.get_model('core', 'Tag')
+    Recipe = apps.get_model('core', 'Recipe')
+    RecipeTag = Recipe.tags.through
+
+    duplicates = (
+        Tag.objects.values('user_id', 'name')
+        .annotate(keep_id=models.Min('id'), total=models.Count('id'))
+        .filter(total__gt=1)
+    )
+    for duplicate in duplicates:
+        tags = Tag.objects.filter(
+            user_id=duplicate['user_id'],
+            name=duplicate['name']
+        ).exclude(id=duplicate['keep_id'])
+        recipe_ids = set(
+            RecipeTag.objects.filter(tag__in=tags)
+            .values_list('recipe_id', flat=True)
+        )
+        recipe_ids -= set(
+            RecipeTag.objects.filter(tag_id=duplicate['keep_id'])
+            .values_list('recipe_id', flat=True)
+        )
+        RecipeTag.objects.bulk_create([
+            RecipeTag(recipe_id=recipe_id, tag_id=duplicate['keep_id'])
+            for recipe_id in recipe_ids
+        ])
+        tags.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_auto_20230126_0725'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_tags, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 3.2.25 on 2026-10-18 01:35
+
+from django.db import migrations, models
+
+BACKFILL_TAGS_CACHE = """
+UPDATE core_recipe SET tags_cache = coalesce((
+    SELECT jsonb_agg(
+        jsonb_build_object('id', core_tag.id, 'name', core_tag.name)
+        ORDER BY core_tag.id
+    )
+    FROM core_tag
+    JOIN core_recipe_tags ON core_recipe_tags.tag_id = core_tag.id
+    WHERE core_recipe_tags.recipe_id = core_recipe.id
+), '[]'::jsonb)
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_recipe_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='tags_cache',
+            field=models.JSONField(default=list, editable=False, null=True),
+        ),
+        migrations.RunSQL(BACKFILL_TAGS_CACHE, migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 3.2.25 on 2026-10-18 03:22
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import BtreeGinExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_sync_updated_at_tombstones'),
+    ]
+
+    operations = [
+        BtreeGinExtension(),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['user', 'search_vector'], name='core_recipe_user_search_idx'),
+        ),
+        migrations.RemoveIndex(
+            model_name='recipe',
+            name='core_recipe_search_idx',
+        ),
+    ]
@@ -1,5 +1,13 @@
 """Database Models"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.contrib.postgres.aggregates import JSONBAgg, StringAgg
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.db import models
+from django.db.models.functions import Coalesce, JSONObject
+from django.utils import timezone
 from django.contrib.auth.models import (
     BaseUserManager,
     AbstractBaseUser,
@@ -7,6 +15,9 @@ from django.contrib.auth.models import (
 )
 from django.conf import settings
 
+# text search configuration for recipe titles, descriptions and tags
+SEARCH_CONFIG = 'english'
+
 
 class UserManager(BaseUserManager):
     """Manager for the base user"""
@@ -40,6 +51,60 @@ class User(AbstractBaseUser, PermissionsMixin):
     USERNAME_FIELD = 'email'
 
 
+def recipe_search_vector():
+    """Expression building a recipe's weighted full-text document"""
+    tag_names = (
+        Tag.objects.filter(recipe=models.OuterRef('pk'))
+        .values('recipe')
+        .annotate(names=StringAgg('name', ' '))
+        .values('names')
+    )
+    return (
+        SearchVector('title', weight='A', config=SEARCH_CONFIG)
+        + SearchVector('description', weight='B', config=SEARCH_CONFIG)
+        + SearchVector(
+            models.Subquery(tag_names), weight='C', config=SEARCH_CONFIG
+        )
+    )
+
+
+def recipe_tags_snapshot():
+    """Expression building a recipe's tags as a JSON list ordered by id"""
+    tags = (
+        Tag.objects.filter(recipe=models.OuterRef('pk'))
+        .values('recipe')
+        .annotate(tags=JSONBAgg(
+            JSONObject(id='id', name='name'), ordering='id'
+        ))
+        .values('tags')
+    )
+    return Coalesce(
+        models.Subquery(tags, output_field=models.JSONField()),
+        models.Value([], output_field=models.JSONField())
+    )
+
+
+class RecipeQuerySet(models.QuerySet):
+    """Queries for recipes"""
+
+    def update_search_vector(self):
+        """Recompute the stored full-text document of these recipes"""
+        return self.update(search_vector=recipe_search_vector())
+
+    def update_tags_cache(self):
+        """Recompute the stored tag snapshot of these recipes"""
+        return self.update(tags_cache=recipe_tags_snapshot())
+
+    def update_tag_fields(self):
+        """Recompute every stored field derived from these recipes' tags,
+           marking the recipes changed for syncing clients"""
+        return self.update(
+            search_vector=recipe_search_vector(),
+            tags_cache=recipe_tags_snapshot(),
+            updated_at=timezone.now()
+        )
+
+
 class Recipe(models.Model):
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -51,6 +116,38 @@ class Recipe(models.Model):
     price = models.DecimalField(max_digits=5, decimal_places=2)
     link = models.CharField(max_length=255, blank=True)
     tags = models.ManyToManyField('Tag')
+    search_vector = SearchVectorField(null=True, editable=False)
+    # [{"id": ..., "name": ...}] of the recipe's tags, kept in step by
+    # signal handlers so lists can render tags without a join
+    tags_cache = models.JSONField(null=True, default=list, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = RecipeQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', '-id'],
+                name='core_recipe_user_id_desc_idx'
+            ),
+            models.Index(
+                fields=['user', 'time_minutes'],
+                name='core_recipe_user_time_idx'
+            ),
+            models.Index(
+                fields=['user', 'price'],
+                name='core_recipe_user_price_idx'
+            ),
+            # btree_gin lets a search scan only the user's entries
+            GinIndex(
+                fields=['user', 'search_vector'],
+                name='core_recipe_user_search_idx'
+            ),
+            models.Index(
+                fields=['user', 'updated_at'],
+                name='core_recipe_user_updated_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.title
@@ -63,6 +160,88 @@ class Tag(models.Model):
         on_delete=models.CASCADE
     )
     name = models.CharField(max_length=255)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'name'],
+                name='core_tag_unique_user_name'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', 'updated_at'],
+                name='core_tag_user_updated_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.name
+
+
+# tombstones waiting to be inserted together by TombstoneManager.batched()
+_pending_tombstones = ContextVar('pending_tombstones', default=None)
+
+
+class TombstoneManager(models.Manager):
+    """Manager recording deletions"""
+
+    def record(self, instance):
+        """Record a deleted recipe or tag, now or at the end of the
+           enclosing batched() block"""
+        tombstone = self.model(
+            user_id=instance.user_id,
+            kind=self.model.kind_of(instance),
+            object_id=instance.pk
+        )
+        pending = _pending_tombstones.get()
+        if pending is None:
+            tombstone.save(using=self.db)
+        else:
+            pending.append(tombstone)
+
+    @contextmanager
+    def batched(self):
+        """Insert the tombstones recorded inside the block in one query"""
+        pending = []
+        token = _pending_tombstones.set(pending)
+        try:
+            yield
+        finally:
+            _pending_tombstones.reset(token)
+        self.bulk_create(pending)
+
+
+class Tombstone(models.Model):
+    """Record of a deleted recipe or tag, for clients syncing changes"""
+    RECIPE = 'recipe'
+    TAG = 'tag'
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE
+    )
+    kind = models.CharField(
+        max_length=16,
+        choices=[(RECIPE, 'Recipe'), (TAG, 'Tag')]
+    )
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    objects = TombstoneManager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', 'kind', 'deleted_at'],
+                name='core_tombstone_user_kind_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.kind} {self.object_id}'
+
+    @classmethod
+    def kind_of(cls, instance):
+        return cls.RECIPE if isinstance(instance, Recipe) else cls.TAG
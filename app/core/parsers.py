@@ -0,0 +1,29 @@
+"""
+JSON parser backed by orjson, with DRF's parser as the fallback
+"""
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+
+from .renderers import FastJSONRenderer, orjson
+
+
+class FastJSONParser(JSONParser):
+    """Parse JSON request bodies with orjson
+
+    orjson only reads UTF-8 and always rejects NaN and Infinity, so other
+    encodings and non-strict settings use DRF's parser.
+    """
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        utf8 = encoding.lower().replace('_', '-') in ('utf-8', 'utf8')
+        if orjson is None or not self.strict or not utf8:
+            return super().parse(stream, media_type, parser_context)
+
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
@@ -0,0 +1,46 @@
+"""
+JSON renderer backed by orjson, with DRF's renderer as the fallback
+"""
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """Render JSON with orjson in the same format as DRF's JSONRenderer
+
+    Dates, times, UUIDs and nested dicts and lists are encoded by orjson
+    itself; anything else (Decimal, lazy strings, querysets, ...) goes
+    through DRF's encoder. Floats are written in their shortest form, so
+    exponents may be spelt 1e16 where the stdlib writes 1e+16. Indented
+    output, non-unicode, non-compact or non-strict settings and values
+    orjson refuses (e.g. integers beyond 64 bits) use DRF's renderer.
+    """
+    if orjson is not None:
+        options = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if (orjson is None or indent is not None or self.ensure_ascii
+                or not self.compact or not self.strict):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(
+                data, default=self.encoder_class().default,
+                option=self.options
+            )
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # keep DRF's escaping of U+2028 and U+2029 so the output stays a
+        # strict javascript subset
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028')
+            ret = ret.replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
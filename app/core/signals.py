@@ -0,0 +1,113 @@
+"""
+Signal handlers for the core models
+"""
+from contextvars import ContextVar
+
+from django.contrib.auth import get_user_model
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete
+)
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import invalidate_token
+from .models import Recipe, Tag, Tombstone
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    """Stop accepting a token from the cache once it is deleted"""
+    invalidate_token(instance.key)
+
+
+@receiver(post_save, sender=get_user_model())
+def invalidate_user_tokens(sender, instance, created, **kwargs):
+    """Re-read a user's token after the user is updated or deactivated"""
+    if created:
+        return
+    keys = Token.objects.filter(user=instance).values_list('key', flat=True)
+    for key in keys:
+        invalidate_token(key)
+
+
+@receiver(post_save, sender=Recipe)
+def update_saved_recipe(sender, instance, created, update_fields, **kwargs):
+    """Index a recipe's text after it is saved, and restore its tag snapshot
+       in case a stale in-memory copy was written back; saves naming their
+       fields only trigger this for a text or snapshot change, and new
+       recipes marked _tags_follow are left to the tags being added"""
+    if instance.__dict__.pop('_tags_follow', False) and created:
+        return
+    if update_fields is not None and not (
+        {'title', 'description', 'tags_cache'} & set(update_fields)
+    ):
+        return
+    Recipe.objects.filter(pk=instance.pk).update_tag_fields()
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def update_tagged_recipes(sender, instance, action, reverse, pk_set,
+                          **kwargs):
+    """Re-index and re-snapshot recipes whose tags were added or removed"""
+    if not reverse:
+        recipe_ids = {instance.pk}
+    elif action == 'pre_clear':
+        instance._cleared_recipe_ids = set(
+            instance.recipe_set.values_list('pk', flat=True)
+        )
+        return
+    elif action == 'post_clear':
+        recipe_ids = instance.__dict__.pop('_cleared_recipe_ids', set())
+    else:
+        recipe_ids = pk_set
+
+    if action in ('post_add', 'post_remove', 'post_clear') and recipe_ids:
+        Recipe.objects.filter(pk__in=recipe_ids).update_tag_fields()
+
+
+@receiver(post_save, sender=Tag)
+def update_renamed_tag_recipes(sender, instance, created, **kwargs):
+    """Re-index and re-snapshot recipes carrying a renamed tag"""
+    if not created:
+        Recipe.objects.filter(tags=instance).update_tag_fields()
+
+
+@receiver(pre_delete, sender=Tag)
+def remember_deleted_tag_recipes(sender, instance, **kwargs):
+    instance._tagged_recipe_ids = list(
+        instance.recipe_set.values_list('pk', flat=True)
+    )
+
+
+@receiver(post_delete, sender=Tag)
+def update_deleted_tag_recipes(sender, instance, **kwargs):
+    """Re-index and re-snapshot recipes that lost a deleted tag"""
+    recipe_ids = getattr(instance, '_tagged_recipe_ids', None)
+    if recipe_ids:
+        Recipe.objects.filter(pk__in=recipe_ids).update_tag_fields()
+
+
+# users being deleted, whose recipes and tags go without tombstones
+_deleting_users = ContextVar('deleting_users', default=frozenset())
+
+
+@receiver(pre_delete, sender=get_user_model())
+def start_user_delete(sender, instance, **kwargs):
+    _deleting_users.set(_deleting_users.get() | {instance.pk})
+
+
+@receiver(post_delete, sender=get_user_model())
+def end_user_delete(sender, instance, **kwargs):
+    _deleting_users.set(_deleting_users.get() - {instance.pk})
+
+
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Tag)
+def record_tombstone(sender, instance, **kwargs):
+    """Remember a deleted recipe or tag for syncing clients, unless it
+       goes with its user"""
+    if instance.user_id not in _deleting_users.get():
+        Tombstone.objects.record(instance)
@@ -0,0 +1,113 @@
+"""
+Query budgets for API endpoints
+
+QueryBudgetTestCase runs a request against growing data and checks the
+SQL it runs stays the same at every size and within the query count
+stored in query_budgets.json. Fewer queries pass; run the tests with
+QUERY_BUDGETS_UPDATE=1 to record the new counts and shapes after an
+intended change, and review the diff.
+"""
+import json
+import os
+import re
+from contextlib import contextmanager
+
+from django.db import connection
+from django.test import TestCase, override_settings
+
+BUDGETS_PATH = os.path.join(os.path.dirname(__file__), 'query_budgets.json')
+UPDATE = os.environ.get('QUERY_BUDGETS_UPDATE') == '1'
+
+_TABLES = re.compile(r'(?:FROM|JOIN|INTO|UPDATE) "(\w+)"')
+
+
+def shape(sql):
+    """Return the statement type and tables of a query, e.g.
+       'SELECT core_tag core_recipe_tags'"""
+    verb = sql.split(None, 1)[0].upper()
+    tables = dict.fromkeys(_TABLES.findall(sql))
+    return ' '.join([verb, *tables])
+
+
+@contextmanager
+def capture_shapes(conn=connection):
+    """Collect the shape of every query run on a connection"""
+    shapes = []
+
+    def execute(execute, sql, params, many, context):
+        shapes.append(shape(sql))
+        return execute(sql, params, many, context)
+
+    with conn.execute_wrapper(execute):
+        yield shapes
+
+
+def load_budgets(path=BUDGETS_PATH):
+    try:
+        with open(path) as fp:
+            return json.load(fp)
+    except FileNotFoundError:
+        return {}
+
+
+def save_budgets(budgets, path=BUDGETS_PATH):
+    with open(path, 'w') as fp:
+        json.dump(budgets, fp, indent=2, sort_keys=True)
+        fp.write('\n')
+
+
+@override_settings(RESPONSE_CACHE_TIMEOUT=0, THROTTLE_ENABLED=False)
+class QueryBudgetTestCase(TestCase):
+    """TestCase checking endpoint queries against stored budgets"""
+    sizes = (1, 10, 50)
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.budgets = load_budgets()
+
+    @classmethod
+    def tearDownClass(cls):
+        if UPDATE:
+            budgets = load_budgets()
+            budgets.update(cls.budgets)
+            save_budgets(budgets)
+        super().tearDownClass()
+
+    def assertQueryBudget(self, name, populate, request, status_code=200):
+        """Grow the data to each size with populate(size), then call
+           request() with its result and check the queries it runs.
+
+        A first unmeasured call warms process wide caches such as
+        content types.
+        """
+        request(populate(self.sizes[0]))
+        measured = []
+        for size in self.sizes:
+            fixture = populate(size)
+            with capture_shapes() as shapes:
+                res = request(fixture)
+            self.assertEqual(res.status_code, status_code, name)
+            measured.append((size, shapes))
+
+        first_size, first = measured[0]
+        for size, shapes in measured[1:]:
+            self.assertEqual(
+                shapes, first,
+                f'{name} runs {len(shapes)} queries with {size} items '
+                f'and {len(first)} with {first_size}'
+            )
+
+        if UPDATE:
+            self.budgets[name] = {'queries': len(first), 'shape': first}
+            return
+        budget = self.budgets.get(name)
+        self.assertIsNotNone(
+            budget, f'{name} has no budget, run with QUERY_BUDGETS_UPDATE=1'
+        )
+        self.assertLessEqual(
+            len(first), budget['queries'],
+            f'{name} runs {len(first)} queries, over its budget of '
+            f'{budget["queries"]}:\n  ' + '\n  '.join(first)
+            + '\nbudgeted:\n  ' + '\n  '.join(budget['shape'])
+        )
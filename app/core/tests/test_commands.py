@@ -2,32 +2,117 @@
 Test custom Django management commands
 """
 
+from io import StringIO
 from unittest.mock import patch
 from psycopg2 import OperationalError as Psycopg2Error
 from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connections
 from django.db.utils import OperationalError
-from django.test import SimpleTestCase
+from django.test import SimpleTestCase, TestCase
 
+ALIASES = list(connections)
 
-@patch("core.management.commands.wait_for_db.Command.check")
+
+class FakeClock:
+    """monotonic clock advanced by the patched sleep"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+@patch("core.management.commands.wait_for_db.Command.ping")
 class CommandTests(SimpleTestCase):
     """Test Commands"""
 
-    def test_wait_for_db_ready(self, patched_check):
-        """test waiting for DB, if DB is ready"""
-        patched_check.return_value = True
+    def test_wait_for_db_ready(self, patched_ping):
+        """test waiting for every configured DB, if DBs are ready"""
+        patched_ping.return_value = None
 
-        call_command('wait_for_db')
+        call_command('wait_for_db', stdout=StringIO())
 
-        patched_check.assert_called_once_with(databases=['default'])
+        self.assertEqual(
+            [call.args for call in patched_ping.call_args_list],
+            [(alias,) for alias in ALIASES]
+        )
 
     @patch("time.sleep")
-    def test_wait_for_db_delay(self, patched_sleep, patched_check):
+    def test_wait_for_db_delay(self, patched_sleep, patched_ping):
         """test waiting for database when getting operational error"""
-        patched_check.side_effect = [Psycopg2Error] * 2 + \
-            [OperationalError] * 3 + [True]
+        patched_ping.side_effect = [Psycopg2Error] * 2 + \
+            [OperationalError] * 3 + [None] * len(ALIASES)
+
+        call_command('wait_for_db', stdout=StringIO())
+
+        self.assertEqual(patched_ping.call_count, 5 + len(ALIASES))
+        patched_ping.assert_called_with(ALIASES[-1])
+        self.assertEqual(patched_sleep.call_count, 5)
+
+    @patch("time.sleep")
+    def test_wait_for_db_backoff(self, patched_sleep, patched_ping):
+        """test retry delays grow exponentially up to the maximum"""
+        patched_ping.side_effect = [OperationalError] * 6 + [None] * 10
+
+        with patch('random.uniform', side_effect=lambda low, high: high):
+            call_command('wait_for_db', '--initial-delay', '0.1',
+                         '--max-delay', '1', stdout=StringIO())
+
+        delays = [call.args[0] for call in patched_sleep.call_args_list]
+        self.assertEqual(delays, [0.1, 0.2, 0.4, 0.8, 1, 1])
+
+    @patch("time.sleep")
+    def test_wait_for_db_many_attempts(self, patched_sleep, patched_ping):
+        """test the delay stays at the maximum after many retries"""
+        patched_ping.side_effect = [OperationalError] * 1200 + [None] * 10
+
+        with patch('random.uniform', side_effect=lambda low, high: high):
+            call_command('wait_for_db', '--timeout', '10000',
+                         '--max-delay', '2', stdout=StringIO())
+
+        self.assertEqual(patched_sleep.call_count, 1200)
+        patched_sleep.assert_called_with(2)
+
+    def test_wait_for_db_timeout(self, patched_ping):
+        """test giving up once the timeout would be exceeded"""
+        patched_ping.side_effect = OperationalError
+        clock = FakeClock()
+
+        with patch('time.monotonic', clock.monotonic), \
+                patch('time.sleep', clock.sleep), \
+                patch('random.uniform', side_effect=lambda low, high: high):
+            with self.assertRaises(CommandError):
+                call_command('wait_for_db', '--timeout', '1',
+                             stdout=StringIO())
+
+        self.assertLessEqual(clock.now, 1)
+        self.assertGreater(clock.now, 0.5)
+
+
+class MigrationsAppliedTests(TestCase):
+    """Test waiting for migrations against the test database"""
+
+    def test_migrations_applied(self):
+        out = StringIO()
+
+        call_command('wait_for_db', '--migrations-applied', stdout=out)
+
+        self.assertIn('Database available!', out.getvalue())
+
+    @patch("time.sleep")
+    @patch("core.management.commands.wait_for_db.Command"
+           ".pending_migrations")
+    def test_waits_for_pending_migrations(self, patched_pending,
+                                          patched_sleep):
+        patched_pending.side_effect = [['0009_pending'], []] + \
+            [[]] * len(ALIASES)
 
-        call_command('wait_for_db')
+        call_command('wait_for_db', '--migrations-applied',
+                     stdout=StringIO())
 
-        self.assertEqual(patched_check.call_count, 6)
-        patched_check.assert_called_with(databases=['default'])
+        self.assertEqual(patched_sleep.call_count, 1)
@@ -0,0 +1,138 @@
+"""
+Test response compression
+"""
+import gzip
+import json
+from decimal import Decimal
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import compression
+from core.models import Recipe
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+RECIPE_URL = reverse('recipe:recipe-list')
+EXPORT_URL = reverse('recipe:recipe-export')
+
+
+class NegotiateTests(SimpleTestCase):
+    """Test choosing a content coding from Accept-Encoding"""
+
+    def test_gzip(self):
+        self.assertEqual(compression.negotiate('gzip, deflate'), 'gzip')
+
+    def test_identity(self):
+        self.assertIsNone(compression.negotiate(''))
+        self.assertIsNone(compression.negotiate('identity, deflate'))
+
+    def test_refused_with_zero_weight(self):
+        self.assertIsNone(compression.negotiate('gzip;q=0, br;q=0'))
+        self.assertIsNone(compression.negotiate('*;q=0'))
+
+    def test_wildcard(self):
+        self.assertIn(compression.negotiate('*'), ('br', 'gzip'))
+
+    @skipUnless(brotli, 'Brotli is not installed')
+    def test_brotli_preferred(self):
+        self.assertEqual(compression.negotiate('gzip, br'), 'br')
+        self.assertEqual(compression.negotiate('gzip, br;q=0'), 'gzip')
+
+    @skipUnless(brotli, 'Brotli is not installed')
+    def test_round_trip(self):
+        content = b'{"title": "Spicy lentil soup"}' * 100
+        for coding, decompress in (('gzip', gzip.decompress),
+                                   ('br', brotli.decompress)):
+            compressed = compression.compress(coding, content)
+            self.assertEqual(decompress(compressed), content)
+            streamed = b''.join(compression.compress_sequence(
+                coding, [content[:500], b'', content[500:]]
+            ))
+            self.assertEqual(decompress(streamed), content)
+
+
+@override_settings(RESPONSE_CACHE_TIMEOUT=0, COMPRESSION_MIN_SIZE=1024)
+class CompressionMiddlewareTests(TestCase):
+    """Test API responses are compressed when large enough"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        Recipe.objects.bulk_create(
+            Recipe(user=self.user, title=f'Spicy lentil soup {i}',
+                   time_minutes=10, price=Decimal('5.00'))
+            for i in range(50)
+        )
+
+    def test_gzip_list(self):
+        """Test a large list is gzipped and decodes to the same JSON"""
+        plain = self.client.get(RECIPE_URL)
+        res = self.client.get(RECIPE_URL, HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertEqual(res['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', res['Vary'])
+        self.assertLess(len(res.content), len(plain.content) / 4)
+        self.assertEqual(int(res['Content-Length']), len(res.content))
+        self.assertEqual(gzip.decompress(res.content), plain.content)
+        self.assertEqual(res['ETag'], 'W/' + plain['ETag'])
+
+    @skipUnless(brotli, 'Brotli is not installed')
+    def test_brotli_list(self):
+        plain = self.client.get(RECIPE_URL)
+        res = self.client.get(RECIPE_URL, HTTP_ACCEPT_ENCODING='gzip, br')
+
+        self.assertEqual(res['Content-Encoding'], 'br')
+        self.assertEqual(brotli.decompress(res.content), plain.content)
+
+    def test_uncompressed_without_accept_encoding(self):
+        res = self.client.get(RECIPE_URL)
+
+        self.assertFalse(res.has_header('Content-Encoding'))
+        self.assertIn('Accept-Encoding', res['Vary'])
+        json.loads(res.content)
+
+    def test_small_response_uncompressed(self):
+        """Test bodies under COMPRESSION_MIN_SIZE are sent as they are"""
+        res = self.client.get(RECIPE_URL, {'page_size': 1},
+                              HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertFalse(res.has_header('Content-Encoding'))
+
+    def test_weak_etag_not_modified(self):
+        """Test the weakened ETag of a compressed list matches"""
+        etag = self.client.get(RECIPE_URL, HTTP_ACCEPT_ENCODING='gzip')['ETag']
+
+        with self.assertNumQueries(0):
+            res = self.client.get(RECIPE_URL, HTTP_ACCEPT_ENCODING='gzip',
+                                  HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_no_etag_without_version(self):
+        """Test views without version validators get no hashed ETag"""
+        res = self.client.get(reverse('user:me'))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertFalse(res.has_header('ETag'))
+
+    def test_streamed_export_gzip(self):
+        plain = self.client.get(EXPORT_URL)
+        res = self.client.get(EXPORT_URL, HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertEqual(res['Content-Encoding'], 'gzip')
+        self.assertEqual(
+            gzip.decompress(b''.join(res.streaming_content)),
+            b''.join(plain.streaming_content)
+        )
@@ -0,0 +1,166 @@
+"""
+Test the database backend's health checks and connection pool
+"""
+import threading
+from unittest.mock import patch
+
+from django.db import connection
+from django.test import SimpleTestCase, TransactionTestCase
+
+from core.db import pool
+from core.db.base import DatabaseWrapper
+
+
+class FakeConnection:
+    closed = 0
+
+    def get_transaction_status(self):
+        return 0
+
+    def close(self):
+        self.closed = 1
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    """Test handing out and taking back pooled connections"""
+
+    def make_pool(self, **options):
+        return pool.ConnectionPool(FakeConnection, **options)
+
+    def test_reuses_released_connections(self):
+        connection_pool = self.make_pool(size=2, overflow=0)
+
+        conn, created = connection_pool.acquire()
+        self.assertTrue(created)
+        connection_pool.release(conn)
+
+        self.assertEqual(connection_pool.acquire(), (conn, False))
+        metrics = connection_pool.metrics()
+        self.assertEqual(metrics['created'], 1)
+        self.assertEqual(metrics['acquired'], 2)
+        self.assertEqual(metrics['in_use'], 1)
+
+    def test_overflow_connections_closed_on_release(self):
+        connection_pool = self.make_pool(size=1, overflow=1)
+
+        first, _created = connection_pool.acquire()
+        second, _created = connection_pool.acquire()
+        connection_pool.release(first)
+        connection_pool.release(second)
+
+        self.assertFalse(first.closed)
+        self.assertTrue(second.closed)
+        metrics = connection_pool.metrics()
+        self.assertEqual((metrics['open'], metrics['idle']), (1, 1))
+
+    def test_broken_connection_discarded(self):
+        connection_pool = self.make_pool(size=1, overflow=0)
+
+        conn, _created = connection_pool.acquire()
+        conn.closed = 2
+        connection_pool.release(conn)
+
+        self.assertIsNot(connection_pool.acquire()[0], conn)
+        self.assertEqual(connection_pool.metrics()['discarded'], 1)
+
+    def test_timeout_when_exhausted(self):
+        connection_pool = self.make_pool(size=1, overflow=0, timeout=0.01)
+        connection_pool.acquire()
+
+        with self.assertRaises(pool.PoolTimeout):
+            connection_pool.acquire()
+
+        metrics = connection_pool.metrics()
+        self.assertEqual(metrics['timeouts'], 1)
+        self.assertEqual(metrics['waiting'], 0)
+        self.assertGreater(metrics['wait_seconds_max'], 0)
+
+    def test_waiter_gets_released_connection(self):
+        connection_pool = self.make_pool(size=1, overflow=0, timeout=5)
+        conn, _created = connection_pool.acquire()
+        acquired = []
+
+        waiter = threading.Thread(
+            target=lambda: acquired.append(connection_pool.acquire()[0])
+        )
+        waiter.start()
+        connection_pool.release(conn)
+        waiter.join()
+
+        self.assertEqual(acquired, [conn])
+
+    def test_failed_connect_frees_slot(self):
+        connection_pool = pool.ConnectionPool(
+            FakeConnection, size=1, overflow=0, timeout=0.01
+        )
+        with patch.object(connection_pool, '_connect',
+                          side_effect=OSError):
+            with self.assertRaises(OSError):
+                connection_pool.acquire()
+
+        self.assertIsInstance(connection_pool.acquire()[0], FakeConnection)
+
+
+class DatabaseWrapperTests(TransactionTestCase):
+    """Test pooling and health checks against the test database"""
+
+    def make_wrapper(self, **settings):
+        settings_dict = dict(connection.settings_dict, **settings)
+        wrapper = DatabaseWrapper(settings_dict)
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def test_pooled_connection_reused(self):
+        wrapper = self.make_wrapper(POOL={'SIZE': 1, 'MAX_OVERFLOW': 0})
+        wrapper.ensure_connection()
+        raw = wrapper.connection
+        label = next(
+            key for key in pool.metrics()
+            if key.endswith('/' + connection.settings_dict['NAME'])
+        )
+        created = pool.metrics()[label]['created']
+
+        wrapper.close_if_unusable_or_obsolete()
+        self.assertIsNone(wrapper.connection)
+        self.assertFalse(raw.closed)
+
+        with wrapper.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        self.assertIs(wrapper.connection, raw)
+        self.assertEqual(pool.metrics()[label]['created'], created)
+
+    def test_pooled_connection_health_checked(self):
+        wrapper = self.make_wrapper(POOL={'SIZE': 1, 'MAX_OVERFLOW': 0},
+                                    CONN_HEALTH_CHECKS=True)
+        wrapper.ensure_connection()
+        raw = wrapper.connection
+        wrapper.close_if_unusable_or_obsolete()
+        raw.close()
+
+        with wrapper.cursor() as cursor:
+            cursor.execute('SELECT 1')
+            self.assertEqual(cursor.fetchone(), (1,))
+        self.assertIsNot(wrapper.connection, raw)
+
+    def test_health_check_replaces_dead_connection(self):
+        wrapper = self.make_wrapper(CONN_HEALTH_CHECKS=True, POOL=None)
+        wrapper.ensure_connection()
+        wrapper.connection.close()
+
+        wrapper.close_if_unusable_or_obsolete()
+        with wrapper.cursor() as cursor:
+            cursor.execute('SELECT 1')
+            self.assertEqual(cursor.fetchone(), (1,))
+
+    def test_health_check_once_per_request(self):
+        wrapper = self.make_wrapper(CONN_HEALTH_CHECKS=True, POOL=None)
+        wrapper.ensure_connection()
+        wrapper.close_if_unusable_or_obsolete()
+
+        with patch.object(wrapper, 'is_usable',
+                          wraps=wrapper.is_usable) as is_usable:
+            for _ in range(3):
+                with wrapper.cursor() as cursor:
+                    cursor.execute('SELECT 1')
+
+        is_usable.assert_called_once()
@@ -0,0 +1,116 @@
+"""Test password hashing with the tuned work factor and limiter"""
+from django.contrib.auth import authenticate, get_user_model
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, make_password
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import hashing
+from core.tests.test_metrics import sample
+
+DEFAULT = PBKDF2PasswordHasher.iterations
+MORE = DEFAULT + 1000
+
+
+class TunedHasherTests(TestCase):
+    """Test hashes follow PASSWORD_HASH_ITERATIONS above Django's default"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123'
+        )
+
+    def login(self):
+        return authenticate(username='user@example.com',
+                            password='testpass123')
+
+    @override_settings(PASSWORD_HASH_ITERATIONS=MORE)
+    def test_iterations_from_settings(self):
+        encoded = make_password('testpass123')
+
+        self.assertTrue(encoded.startswith(f'pbkdf2_sha256${MORE}$'))
+
+    @override_settings(PASSWORD_HASH_ITERATIONS=1000)
+    def test_iterations_floored_at_default(self):
+        encoded = make_password('testpass123')
+
+        self.assertTrue(encoded.startswith(f'pbkdf2_sha256${DEFAULT}$'))
+
+    def test_raised_iterations_rehashed_on_login(self):
+        """Test a hash made with fewer rounds is upgraded by authenticate"""
+        with override_settings(PASSWORD_HASH_ITERATIONS=MORE):
+            user = self.login()
+
+        self.assertEqual(user, self.user)
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith(f'pbkdf2_sha256${MORE}$'))
+        self.assertTrue(user.check_password('testpass123'))
+
+    def test_stronger_hash_not_downgraded_on_login(self):
+        with override_settings(PASSWORD_HASH_ITERATIONS=MORE):
+            self.user.set_password('testpass123')
+            self.user.save()
+
+        user = self.login()
+
+        self.assertEqual(user, self.user)
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith(f'pbkdf2_sha256${MORE}$'))
+
+    def test_outdated_hasher_upgraded_on_login(self):
+        self.user.password = make_password('testpass123', hasher='pbkdf2_sha1')
+        self.user.save()
+
+        user = self.login()
+
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('pbkdf2_sha256$'))
+
+
+@override_settings(PASSWORD_HASHING_CONCURRENCY=1,
+                   PASSWORD_HASHING_TIMEOUT=0.01)
+class HashingLimiterTests(TestCase):
+    """Test hashes wait for a free slot and give up with a 503"""
+
+    def setUp(self):
+        get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123'
+        )
+        self.client = APIClient()
+
+    def request_token(self):
+        return self.client.post(reverse('user:token'), {
+            'email': 'user@example.com',
+            'password': 'testpass123',
+        })
+
+    def test_login_without_free_slot_unavailable(self):
+        with hashing.limiter.slot():
+            res = self.request_token()
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    def test_slot_freed_after_hash(self):
+        self.assertEqual(self.request_token().status_code, status.HTTP_200_OK)
+        self.assertEqual(self.request_token().status_code, status.HTTP_200_OK)
+
+    def test_waits_exported(self):
+        before = hashing.limiter.metrics()
+        with hashing.limiter.slot():
+            self.request_token()
+
+        body = self.client.get(reverse('metrics')).content.decode()
+        self.assertIn('# TYPE password_hashing_timeouts_total counter', body)
+        self.assertIn('# TYPE password_hashing_in_flight gauge', body)
+        self.assertEqual(
+            sample(body, 'password_hashing_timeouts_total'),
+            before['timeouts'] + 1
+        )
+        self.assertGreaterEqual(
+            sample(body, 'password_hashing_wait_seconds_total'), 0.01
+        )
+        self.assertEqual(sample(body, 'password_hashing_concurrency'), 1)
+        self.assertEqual(sample(body, 'password_hashing_in_flight'), 0)
@@ -0,0 +1,119 @@
+"""
+Test the request instrumentation middleware and metrics endpoint
+"""
+import re
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core import metrics
+from core.db import pool
+from core.models import Recipe, Tag
+from recipe.views import RecipeViewSet
+
+METRICS_URL = reverse('metrics')
+RECIPE_URL = reverse('recipe:recipe-list')
+LIST_LABELS = '{view="recipe:recipe-list",method="GET",status="200"}'
+
+
+def sample(body, name, labels=''):
+    """read one sample value from a Prometheus text body"""
+    match = re.search(
+        rf'^{re.escape(name + labels)} (\S+)$', body, re.MULTILINE
+    )
+    return float(match.group(1)) if match else None
+
+
+@override_settings(RESPONSE_CACHE_TIMEOUT=0)
+class InstrumentationTests(TestCase):
+    """Test requests are measured and exposed per endpoint"""
+
+    def setUp(self):
+        metrics.registry.reset()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        for i in range(6):
+            recipe = Recipe.objects.create(
+                user=self.user,
+                title=f'Recipe {i}',
+                time_minutes=5,
+                price=Decimal('1.00')
+            )
+            recipe.tags.add(Tag.objects.create(user=self.user, name=f'T{i}'))
+
+    def get_metrics(self, **extra):
+        return self.client.get(METRICS_URL, **extra)
+
+    def test_list_request_recorded(self):
+        res = self.client.get(RECIPE_URL)
+        body = self.get_metrics().content.decode()
+
+        self.assertEqual(
+            sample(body, 'http_requests_total', LIST_LABELS), 1
+        )
+        self.assertGreaterEqual(
+            sample(body, 'http_request_db_queries_total', LIST_LABELS), 1
+        )
+        self.assertGreater(
+            sample(body, 'http_request_db_seconds_total', LIST_LABELS), 0
+        )
+        self.assertGreater(
+            sample(body, 'http_request_serializer_seconds_total',
+                   LIST_LABELS), 0
+        )
+        self.assertEqual(
+            sample(body, 'http_response_bytes_total', LIST_LABELS),
+            len(res.content)
+        )
+        inf_labels = LIST_LABELS[:-1] + ',le="+Inf"}'
+        self.assertEqual(
+            sample(body, 'http_request_duration_seconds_bucket', inf_labels),
+            1
+        )
+
+    def test_pool_counters_and_gauges_typed(self):
+        """Test growing pool stats are counters and levels are gauges"""
+        stats = pool.ConnectionPool(object).metrics()
+        with patch.object(pool, 'metrics', return_value={'db': stats}):
+            body = self.get_metrics().content.decode()
+
+        labels = '{pool="db"}'
+        for name in ('acquired', 'timeouts', 'wait_seconds'):
+            self.assertIn(f'# TYPE db_pool_{name}_total counter', body)
+            self.assertEqual(sample(body, f'db_pool_{name}_total', labels), 0)
+        for name in ('in_use', 'idle', 'waiting', 'size'):
+            self.assertIn(f'# TYPE db_pool_{name} gauge', body)
+        self.assertEqual(sample(body, 'db_pool_size', labels), 5)
+
+    def test_metrics_hidden_from_other_addresses(self):
+        res = self.get_metrics(REMOTE_ADDR='203.0.113.9')
+
+        self.assertEqual(res.status_code, 404)
+
+    @override_settings(DEBUG=True, RECIPE_TAGS_CACHE=False)
+    def test_n_plus_one_logged(self):
+        """Test a list loading tags per recipe is reported"""
+        def without_prefetch(view, queryset):
+            return queryset.defer('tags_cache')
+
+        with patch.object(RecipeViewSet, '_plan_queryset', without_prefetch), \
+                self.assertLogs('core.middleware', 'WARNING') as logs:
+            self.client.get(RECIPE_URL)
+
+        self.assertIn('recipe:recipe-list', logs.output[0])
+        self.assertIn('core_recipe_tags', logs.output[0])
+
+    @override_settings(DEBUG=True)
+    def test_prefetched_list_not_logged(self):
+        with patch('core.middleware.logger') as logger:
+            self.client.get(RECIPE_URL)
+
+        logger.warning.assert_not_called()
@@ -0,0 +1,43 @@
+"""Test checking queries against stored budgets"""
+from unittest import skipIf
+
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse
+
+from core.tests.query_budget import UPDATE, QueryBudgetTestCase
+
+SHAPE = ['SELECT core_user']
+
+
+@skipIf(UPDATE, 'budgets are being recorded')
+class QueryBudgetTests(QueryBudgetTestCase):
+    """Test budgets catch growth but accept improvements"""
+
+    def run_queries(self, count):
+        for _ in range(count):
+            get_user_model().objects.exists()
+        return HttpResponse()
+
+    def check(self, budget, count):
+        self.budgets = {'probe': {'queries': budget,
+                                  'shape': SHAPE * budget}}
+        self.assertQueryBudget(
+            'probe', lambda size: size, lambda _: self.run_queries(count)
+        )
+
+    def test_within_budget(self):
+        self.check(2, 2)
+
+    def test_fewer_queries_pass(self):
+        self.check(3, 1)
+
+    def test_more_queries_fail(self):
+        with self.assertRaisesMessage(AssertionError, 'over its budget'):
+            self.check(1, 2)
+
+    def test_queries_growing_with_size_fail(self):
+        with self.assertRaisesMessage(AssertionError, 'with 10 items'):
+            self.budgets = {'probe': {'queries': 50, 'shape': SHAPE}}
+            self.assertQueryBudget(
+                'probe', lambda size: size, self.run_queries
+            )
@@ -0,0 +1,109 @@
+"""
+Test the orjson backed renderer and parser
+"""
+import datetime
+import uuid
+from decimal import Decimal
+from io import BytesIO
+from unittest.mock import patch
+
+import pytz
+from django.test import SimpleTestCase
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from core import parsers, renderers
+from core.parsers import FastJSONParser
+from core.renderers import FastJSONRenderer
+
+SAMPLE = {
+    'id': 1,
+    'title': 'Crème brûlée \u2028 line \u2029 paragraph </script>',
+    'price': Decimal('15.30'),
+    'ok': True,
+    'missing': None,
+    'tags': [{'id': 2, 'name': '\U0001f35c'}, {'id': 3, 'name': '"q"'}],
+    'created': datetime.datetime(2024, 1, 1, 12, 0, 0, 123456, pytz.utc),
+    'local': pytz.timezone('Asia/Kolkata').localize(
+        datetime.datetime(2024, 7, 1, 12)
+    ),
+    'naive': datetime.datetime(2024, 1, 1, 12),
+    'day': datetime.date(2024, 1, 2),
+    'at': datetime.time(1, 2, 3, 40),
+    'uuid': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+    'lazy': gettext_lazy('Sample'),
+    'huge': 2 ** 70,
+    1: 'integer key',
+}
+
+
+class FastJSONRendererTests(SimpleTestCase):
+    """Test FastJSONRenderer output matches DRF's JSONRenderer"""
+
+    def test_output_matches_drf(self):
+        self.assertEqual(
+            FastJSONRenderer().render(SAMPLE),
+            JSONRenderer().render(SAMPLE)
+        )
+
+    def test_orjson_output_matches_drf(self):
+        """Test the orjson path itself, without the integer fallback"""
+        data = {key: value for key, value in SAMPLE.items() if key != 'huge'}
+        with patch.object(JSONRenderer, 'render') as drf_render:
+            ret = FastJSONRenderer().render(data)
+
+        drf_render.assert_not_called()
+        self.assertEqual(ret, JSONRenderer().render(data))
+
+    def test_indent_matches_drf(self):
+        media_type = 'application/json; indent=4'
+        self.assertEqual(
+            FastJSONRenderer().render(SAMPLE, media_type),
+            JSONRenderer().render(SAMPLE, media_type)
+        )
+
+    def test_none_renders_empty(self):
+        self.assertEqual(FastJSONRenderer().render(None), b'')
+
+    def test_fallback_without_orjson(self):
+        with patch.object(renderers, 'orjson', None):
+            ret = FastJSONRenderer().render(SAMPLE)
+
+        self.assertEqual(ret, JSONRenderer().render(SAMPLE))
+
+
+class FastJSONParserTests(SimpleTestCase):
+    """Test FastJSONParser reads bodies like DRF's JSONParser"""
+
+    BODY = '{"title": "Café", "tags": [{"name": "x"}], "n": 1.5}'
+
+    def parse(self, parser, body, encoding='utf-8'):
+        return parser.parse(
+            BytesIO(body.encode(encoding)),
+            parser_context={'encoding': encoding}
+        )
+
+    def test_parse_matches_drf(self):
+        self.assertEqual(
+            self.parse(FastJSONParser(), self.BODY),
+            self.parse(JSONParser(), self.BODY)
+        )
+
+    def test_parse_other_encoding(self):
+        self.assertEqual(
+            self.parse(FastJSONParser(), self.BODY, 'latin-1'),
+            self.parse(JSONParser(), self.BODY, 'latin-1')
+        )
+
+    def test_parse_error(self):
+        for body in ['{"title": ', '{"n": NaN}']:
+            with self.assertRaises(ParseError):
+                self.parse(FastJSONParser(), body)
+
+    def test_fallback_without_orjson(self):
+        with patch.object(parsers, 'orjson', None):
+            data = self.parse(FastJSONParser(), self.BODY)
+
+        self.assertEqual(data, self.parse(JSONParser(), self.BODY))
@@ -0,0 +1,148 @@
+"""
+Test routing reads to replicas and pinning clients to the primary
+"""
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connections
+from django.http import HttpResponse
+from django.test import (
+    RequestFactory,
+    SimpleTestCase,
+    TransactionTestCase,
+    override_settings
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.middleware import ReplicaPinMiddleware
+from core.models import Recipe
+from core.routers import PrimaryReplicaRouter, _use_primary, use_primary
+
+RECIPE_URL = reverse('recipe:recipe-list')
+
+
+@override_settings(DATABASE_REPLICAS=['replica_1', 'replica_2'])
+class PrimaryReplicaRouterTests(SimpleTestCase):
+    """Test choosing a database for reads and writes"""
+
+    def setUp(self):
+        self.router = PrimaryReplicaRouter()
+
+    def test_reads_go_to_replicas(self):
+        self.assertIn(
+            self.router.db_for_read(Recipe), ['replica_1', 'replica_2']
+        )
+
+    def test_writes_go_to_primary(self):
+        self.assertEqual(self.router.db_for_write(Recipe), 'default')
+
+    def test_pinned_reads_go_to_primary(self):
+        with use_primary():
+            self.assertEqual(self.router.db_for_read(Recipe), 'default')
+        self.assertNotEqual(self.router.db_for_read(Recipe), 'default')
+
+    def test_reads_in_transaction_go_to_primary(self):
+        with patch.object(connections['default'], 'in_atomic_block', True):
+            self.assertEqual(self.router.db_for_read(Recipe), 'default')
+
+    def test_token_reads_go_to_primary(self):
+        self.assertEqual(self.router.db_for_read(Token), 'default')
+
+    def test_no_migrations_on_replicas(self):
+        self.assertFalse(self.router.allow_migrate('replica_1', 'core'))
+        self.assertIsNone(self.router.allow_migrate('default', 'core'))
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_without_replicas_reads_go_to_primary(self):
+        self.assertEqual(self.router.db_for_read(Recipe), 'default')
+
+
+@override_settings(DATABASE_REPLICAS=['replica_1'])
+class ReplicaPinMiddlewareTests(SimpleTestCase):
+    """Test which requests the middleware pins to the primary"""
+
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory(HTTP_AUTHORIZATION='Token abc')
+        self.seen = []
+        self.middleware = ReplicaPinMiddleware(self.get_response)
+
+    def get_response(self, request):
+        self.seen.append(_use_primary.get())
+        return HttpResponse()
+
+    def test_reads_not_pinned(self):
+        self.middleware(self.factory.get('/'))
+        self.assertEqual(self.seen, [False])
+
+    def test_write_pins_later_reads(self):
+        self.middleware(self.factory.post('/'))
+        self.middleware(self.factory.get('/'))
+        self.middleware(RequestFactory().get('/'))
+
+        self.assertEqual(self.seen, [True, True, False])
+
+    @override_settings(DATABASE_REPLICA_PIN_SECONDS=0)
+    def test_pin_expires(self):
+        self.middleware(self.factory.post('/'))
+        self.middleware(self.factory.get('/'))
+
+        self.assertEqual(self.seen, [True, False])
+
+
+@override_settings(DATABASE_REPLICAS=['replica'], RESPONSE_CACHE_TIMEOUT=0)
+class ReplicaRoutingAPITests(TransactionTestCase):
+    """Test API reads against a second connection to the test database
+       standing in for a replica"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        connections.settings['replica'] = dict(
+            connections['default'].settings_dict
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        connections['replica'].close()
+        del connections['replica']
+        del connections.settings['replica']
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123'
+        )
+        token = Token.objects.create(user=user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+    def get_recipes(self):
+        """list recipes, returning the aliases that served queries"""
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections['replica']) as replica:
+            res = self.client.get(RECIPE_URL)
+        self.assertEqual(res.status_code, 200)
+        return {
+            alias for alias, queries in [('default', primary),
+                                         ('replica', replica)]
+            if any('core_recipe' in q['sql'] for q in queries)
+        }
+
+    def test_reads_served_by_replica(self):
+        self.assertEqual(self.get_recipes(), {'replica'})
+
+    def test_reads_after_write_served_by_primary(self):
+        payload = {'title': 'Soup', 'time_minutes': 5, 'price': '2.00'}
+        self.client.post(RECIPE_URL, payload)
+
+        self.assertEqual(self.get_recipes(), {'default'})
+
+        cache.clear()
+        self.assertEqual(self.get_recipes(), {'replica'})
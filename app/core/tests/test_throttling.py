@@ -0,0 +1,193 @@
+"""
+Test the token bucket throttles and rate limit headers
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework.test import APIClient, APIRequestFactory
+
+from core.throttling import TokenBucketThrottle, UserBucketThrottle
+
+RECIPE_URL = reverse('recipe:recipe-list')
+BULK_URL = reverse('recipe:recipe-bulk')
+EXPORT_URL = reverse('recipe:recipe-export')
+TOKEN_URL = reverse('user:token')
+
+RATES = dict(
+    api_settings.DEFAULT_THROTTLE_RATES,
+    user='3/min',
+    token='2/min',
+    bulk='5/min',
+    export='1/min',
+)
+
+
+class FakeTimer:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@override_settings(REST_FRAMEWORK=dict(
+    api_settings.user_settings, DEFAULT_THROTTLE_RATES=RATES
+))
+class TokenBucketThrottleTests(TestCase):
+    """Test request budgets per user, address and scope"""
+
+    def setUp(self):
+        cache.clear()
+        self.timer = FakeTimer()
+        patcher = patch.object(TokenBucketThrottle, 'timer', self.timer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_burst_then_throttled(self):
+        """Test a full bucket allows a burst and then reports the wait"""
+        remaining = [
+            self.client.get(RECIPE_URL)['X-RateLimit-Remaining']
+            for _ in range(3)
+        ]
+        res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(remaining, ['2', '1', '0'])
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(res['Retry-After'], '20')
+        self.assertEqual(res['X-RateLimit-Limit'], '3')
+        self.assertEqual(res['X-RateLimit-Scope'], 'user')
+
+    def test_bucket_refills(self):
+        for _ in range(3):
+            self.client.get(RECIPE_URL)
+
+        self.timer.now += 20
+        res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['X-RateLimit-Remaining'], '0')
+
+    def test_idle_bucket_holds_no_more_than_a_burst(self):
+        """Test a bucket idle for long still allows only a full burst"""
+        self.client.get(RECIPE_URL)
+        self.timer.now += 3600
+
+        codes = [self.client.get(RECIPE_URL).status_code for _ in range(4)]
+
+        self.assertEqual(codes, [200, 200, 200, 429])
+
+    def test_concurrent_requests_spend_each_token_once(self):
+        """Test racing requests never share the last tokens"""
+        user = SimpleNamespace(is_authenticated=True, pk=self.user.pk)
+        start = threading.Barrier(12)
+
+        def request():
+            req = Request(APIRequestFactory().get(RECIPE_URL))
+            req.user = user
+            throttle = UserBucketThrottle()
+            start.wait()
+            return throttle.allow_request(req, None)
+
+        with ThreadPoolExecutor(12) as pool:
+            allowed = list(pool.map(lambda _: request(), range(12)))
+
+        self.assertEqual(allowed.count(True), 3)
+
+    def test_users_have_separate_buckets(self):
+        for _ in range(3):
+            self.client.get(RECIPE_URL)
+        other = get_user_model().objects.create_user(
+            email='other@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(other)
+
+        res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_export_has_own_budget(self):
+        res = self.client.get(EXPORT_URL)
+        self.assertEqual(res['X-RateLimit-Scope'], 'export')
+        self.assertEqual(res['X-RateLimit-Remaining'], '0')
+
+        res = self.client.get(EXPORT_URL)
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(
+            self.client.get(RECIPE_URL).status_code, status.HTTP_200_OK
+        )
+
+    def test_bulk_charged_per_recipe(self):
+        payload = [
+            {'title': f'R{i}', 'time_minutes': 5, 'price': '1.00'}
+            for i in range(4)
+        ]
+        res = self.client.post(BULK_URL, payload, format='json')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res['X-RateLimit-Remaining'], '1')
+
+        res = self.client.post(BULK_URL, payload[:2], format='json')
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_token_issue_throttled_by_address(self):
+        client = APIClient()
+        payload = {'email': 'user@example.com', 'password': 'testpass123'}
+
+        codes = [
+            client.post(TOKEN_URL, payload).status_code for _ in range(3)
+        ]
+        other = client.post(TOKEN_URL, payload, REMOTE_ADDR='10.0.0.2')
+
+        self.assertEqual(codes, [200, 200, 429])
+        self.assertEqual(other.status_code, status.HTTP_200_OK)
+
+    def test_forwarded_for_ignored_without_proxies(self):
+        """Test a spoofed X-Forwarded-For does not get a fresh bucket"""
+        client = APIClient()
+        payload = {'email': 'user@example.com', 'password': 'testpass123'}
+
+        codes = [
+            client.post(TOKEN_URL, payload,
+                        HTTP_X_FORWARDED_FOR=f'203.0.113.{i}').status_code
+            for i in range(3)
+        ]
+
+        self.assertEqual(codes, [200, 200, 429])
+
+    def test_forwarded_for_read_behind_proxy(self):
+        client = APIClient()
+        payload = {'email': 'user@example.com', 'password': 'testpass123'}
+        proxied = dict(settings.REST_FRAMEWORK, NUM_PROXIES=1)
+
+        with override_settings(REST_FRAMEWORK=proxied):
+            codes = [
+                client.post(TOKEN_URL, payload,
+                            HTTP_X_FORWARDED_FOR=f'203.0.113.{i}').status_code
+                for i in range(3)
+            ]
+
+        self.assertEqual(codes, [200, 200, 200])
+
+    @override_settings(THROTTLE_ENABLED=False)
+    def test_disabled(self):
+        for _ in range(5):
+            res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotIn('X-RateLimit-Remaining', res)
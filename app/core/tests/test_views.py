@@ -0,0 +1,47 @@
+"""
+Test the health check endpoints
+"""
+from unittest.mock import patch
+
+from django.db import OperationalError, connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+HEALTHZ_URL = reverse('healthz')
+READYZ_URL = reverse('readyz')
+
+
+class HealthCheckTests(TestCase):
+    """Test the unauthenticated probe endpoints"""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_healthz_skips_database(self):
+        with self.assertNumQueries(0):
+            res = self.client.get(HEALTHZ_URL)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json(), {'status': 'ok'})
+
+    def test_readyz_runs_select_one(self):
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(READYZ_URL)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json()['databases']['default'], 'ok')
+        self.assertEqual([q['sql'] for q in queries], ['SELECT 1'])
+
+    def test_readyz_database_down(self):
+        with patch.object(connection, 'cursor', side_effect=OperationalError):
+            res = self.client.get(READYZ_URL)
+
+        self.assertEqual(res.status_code, 503)
+        self.assertEqual(res.json()['databases']['default'], 'unavailable')
+
+    def test_probes_reject_writes(self):
+        res = self.client.post(HEALTHZ_URL)
+
+        self.assertEqual(res.status_code, 405)
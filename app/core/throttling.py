@@ -0,0 +1,164 @@
+"""
+Token bucket throttles keeping their state in a shared cache
+"""
+import math
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.settings import api_settings
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """Allow bursts of up to N requests and refill N tokens per period
+       for a rate of 'N/period'
+
+    A bucket is stored as the time, in microseconds, at which it will be
+    full again, so spending tokens is an atomic add or incr. Buckets live
+    in the THROTTLE_CACHE_ALIAS cache; only a shared backend with atomic
+    increments, such as memcached or redis, enforces the limits across
+    workers.
+    """
+    cache_format = 'throttle:%(scope)s:%(ident)s:full_at'
+
+    @property
+    def cache(self):
+        return caches[settings.THROTTLE_CACHE_ALIAS]
+
+    def get_rate(self):
+        # read at call time so rate changes in settings take effect
+        self.THROTTLE_RATES = api_settings.DEFAULT_THROTTLE_RATES
+        return super().get_rate()
+
+    def get_cost(self, request, view):
+        """Tokens this request spends"""
+        return 1
+
+    def get_ident_key(self, request):
+        """the authenticated user, or the client address"""
+        if request.user and request.user.is_authenticated:
+            return f'user:{request.user.pk}'
+        return f'ip:{self.get_ident(request)}'
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {
+            'scope': self.scope,
+            'ident': self.get_ident_key(request),
+        }
+
+    def allow_request(self, request, view):
+        if self.rate is None or not settings.THROTTLE_ENABLED:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        self.now = self.timer()
+        self.refill = self.num_requests / self.duration
+        self.cost = self.get_cost(request, view)
+        now = int(self.now * 1e6)
+        capacity = self.duration * 10 ** 6
+        interval = capacity / self.num_requests
+        increment = round(self.cost * interval)
+
+        full_at = self.spend(now, increment)
+        allowed = full_at - now <= capacity
+        if allowed:
+            # keep the key until the bucket is full again
+            self.cache.touch(self.key, math.ceil((full_at - now) / 1e6) + 1)
+        else:
+            try:
+                full_at = self.cache.decr(self.key, increment)
+            except ValueError:
+                full_at -= increment
+        self.tokens = max(
+            min(self.num_requests, (now + capacity - full_at) / interval), 0
+        )
+        self.record(request)
+        return allowed
+
+    def spend(self, now, increment):
+        """Push back the time the bucket is full by increment, counting
+           from now when it is full already, and return the new time"""
+        while True:
+            if self.cache.add(self.key, now + increment, self.duration + 1):
+                return now + increment
+            try:
+                full_at = self.cache.incr(self.key, increment)
+                if full_at - increment < now:
+                    # the bucket filled up before its key expired
+                    full_at = self.cache.incr(
+                        self.key, now - (full_at - increment)
+                    )
+                return full_at
+            except ValueError:
+                # the key expired in between, start a new bucket
+                continue
+
+    def record(self, request):
+        """Note the bucket on the request for the rate limit headers"""
+        limits = getattr(request._request, 'rate_limits', [])
+        limits.append({
+            'scope': self.scope,
+            'limit': self.num_requests,
+            'remaining': int(self.tokens),
+            'reset': math.ceil(
+                (self.num_requests - self.tokens) / self.refill
+            ),
+        })
+        request._request.rate_limits = limits
+
+    def wait(self):
+        if self.cost > self.num_requests:
+            return None
+        return (self.cost - self.tokens) / self.refill
+
+
+class AnonBucketThrottle(TokenBucketThrottle):
+    """Limit anonymous clients by address"""
+    scope = 'anon'
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return None
+        return super().get_cache_key(request, view)
+
+
+class UserBucketThrottle(TokenBucketThrottle):
+    """Limit authenticated users by user"""
+    scope = 'user'
+
+    def get_cache_key(self, request, view):
+        if not (request.user and request.user.is_authenticated):
+            return None
+        return super().get_cache_key(request, view)
+
+
+class ScopedBucketThrottle(TokenBucketThrottle):
+    """Give expensive views and actions a budget of their own
+
+    The scope comes from the view's throttle_scopes mapping of action to
+    scope, or its throttle_scope. Views may charge more than one token per
+    request with get_throttle_cost(request).
+    """
+
+    def __init__(self):
+        # the rate is only known once the view is
+        pass
+
+    def allow_request(self, request, view):
+        self.scope = getattr(view, 'throttle_scopes', {}).get(
+            getattr(view, 'action', None),
+            getattr(view, 'throttle_scope', None)
+        )
+        if not self.scope:
+            return True
+        self.rate = self.get_rate()
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+        return super().allow_request(request, view)
+
+    def get_cost(self, request, view):
+        if hasattr(view, 'get_throttle_cost'):
+            return view.get_throttle_cost(request)
+        return 1
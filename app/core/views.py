@@ -0,0 +1,71 @@
+"""
+Liveness and readiness probes and metrics for orchestrators
+"""
+from django.conf import settings
+from django.db import DatabaseError, connections
+from django.http import Http404, HttpResponse, JsonResponse
+from django.views.decorators.cache import never_cache
+from django.views.decorators.http import require_safe
+
+from . import hashing
+from .db import pool
+from .metrics import registry
+
+
+@never_cache
+@require_safe
+def healthz(request):
+    """The process is up and serving requests"""
+    return JsonResponse({'status': 'ok'})
+
+
+@never_cache
+@require_safe
+def readyz(request):
+    """Every configured database answers SELECT 1"""
+    databases = {}
+    for alias in connections:
+        try:
+            with connections[alias].cursor() as cursor:
+                cursor.execute('SELECT 1')
+            databases[alias] = 'ok'
+        except DatabaseError:
+            databases[alias] = 'unavailable'
+    ready = all(state == 'ok' for state in databases.values())
+    return JsonResponse(
+        {'status': 'ok' if ready else 'unavailable', 'databases': databases},
+        status=200 if ready else 503
+    )
+
+
+@never_cache
+@require_safe
+def metrics(request):
+    """Request, password hashing and connection pool metrics for
+       Prometheus, served only to METRICS_ALLOWED_IPS"""
+    if request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_IPS:
+        raise Http404
+    gauges, counters = [], []
+    families = [
+        ('password_hashing', 'Password hashing ', hashing.limiter.counters,
+         {(): hashing.limiter.metrics()}),
+        ('db_pool', 'Database connection pool ', pool.ConnectionPool.counters,
+         {(('pool', label),): stats
+          for label, stats in pool.metrics().items()}),
+    ]
+    for prefix, help_text, counter_names, by_labels in families:
+        names = {name for stats in by_labels.values() for name in stats}
+        for name in sorted(names):
+            samples = [(labels, stats[name])
+                       for labels, stats in sorted(by_labels.items())]
+            if name in counter_names:
+                total = name if name.endswith('_total') else name + '_total'
+                counters.append(
+                    (f'{prefix}_{total}', help_text + name, samples)
+                )
+            else:
+                gauges.append((f'{prefix}_{name}', help_text + name, samples))
+    return HttpResponse(
+        registry.render(gauges, counters),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
@@ -0,0 +1,153 @@
+"""
+Per-user versioned response caching for recipe API's
+"""
+import hashlib
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.http import Http404
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+
+def _cache():
+    return caches[settings.RESPONSE_CACHE_ALIAS]
+
+
+def _version_key(user_id):
+    return f'recipe-api:version:{user_id}'
+
+
+def get_version(user_id):
+    """Return the current data version for a user"""
+    cache = _cache()
+    key = _version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        # seed from the clock so a lost counter never reuses a version
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+# users whose version bumps wait for the end of a batched_bumps() block
+_pending_bumps = ContextVar('pending_version_bumps', default=None)
+
+
+def bump_version(user_id):
+    """Invalidate every cached response for a user, now or at the end of
+       the enclosing batched_bumps() block"""
+    pending = _pending_bumps.get()
+    if pending is not None:
+        pending.add(user_id)
+        return
+    _bump(user_id)
+    # bump again once committed, replacing anything cached from the
+    # pre-commit state by a concurrent reader
+    transaction.on_commit(lambda: _bump(user_id))
+
+
+@contextmanager
+def batched_bumps():
+    """Bump each user's version once for all the changes inside the block"""
+    pending = set()
+    token = _pending_bumps.set(pending)
+    try:
+        yield
+    finally:
+        _pending_bumps.reset(token)
+    for user_id in pending:
+        bump_version(user_id)
+
+
+def _bump(user_id):
+    cache = _cache()
+    key = _version_key(user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
+
+
+def _version_digest(request, *parts):
+    """hash of the user, their data version, what the request asks for
+       and any other parts; versions are seeded from the clock, so two
+       users can share one"""
+    return hashlib.sha256('|'.join([
+        str(request.user.pk),
+        str(get_version(request.user.pk)),
+        request.build_absolute_uri(),
+        request.META.get('HTTP_ACCEPT', ''),
+        *map(str, parts),
+    ]).encode()).hexdigest()
+
+
+def _not_modified(request, etag):
+    """whether If-None-Match names etag, compared weakly since compressed
+       responses carry it as W/"..." """
+    return etag in (
+        tag[2:] if tag.startswith('W/') else tag
+        for tag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))
+    )
+
+
+class VersionedListCacheMixin:
+    """Serve list responses from a cache keyed on the user's data version"""
+
+    def list(self, request, *args, **kwargs):
+        digest = _version_digest(request)
+        etag = f'"{digest[:32]}"'
+
+        if _not_modified(request, etag):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            cache_key = f'recipe-api:list:{request.user.pk}:{digest}'
+            data = _cache().get(cache_key)
+            if data is None:
+                response = super().list(request, *args, **kwargs)
+                _cache().set(
+                    cache_key, response.data, settings.RESPONSE_CACHE_TIMEOUT
+                )
+            else:
+                response = Response(data)
+
+        response['ETag'] = etag
+        patch_vary_headers(response, ['Accept', 'Authorization'])
+        return response
+
+
+class VersionedDetailETagMixin:
+    """Tag detail responses with the user's data version and the object's
+       key, answering a matching If-None-Match with an existence check
+       instead of loading the object"""
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup = kwargs[self.lookup_url_kwarg or self.lookup_field]
+        etag = f'"{_version_digest(request, lookup)[:32]}"'
+        if _not_modified(request, etag):
+            # the queryset validates the query parameters, so bad ones
+            # and objects the user can't see still get a 400 or 404
+            self._check_exists(lookup)
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = super().retrieve(request, *args, **kwargs)
+
+        response['ETag'] = etag
+        patch_vary_headers(response, ['Accept', 'Authorization'])
+        return response
+
+    def _check_exists(self, lookup):
+        queryset = self.filter_queryset(self.get_queryset())
+        try:
+            exists = queryset.filter(**{self.lookup_field: lookup}).exists()
+        except (TypeError, ValueError, ValidationError):
+            exists = False
+        if not exists:
+            raise Http404
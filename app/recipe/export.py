@@ -0,0 +1,46 @@
+"""
+Streaming export of recipes
+"""
+import csv
+import json
+
+from django.db.models import prefetch_related_objects
+from rest_framework.utils.encoders import JSONEncoder
+
+
+class _Echo:
+    """file-like object handing csv.writer rows straight back"""
+    def write(self, value):
+        return value
+
+
+def iter_chunks(queryset, chunk_size):
+    """Yield lists of recipes read through a server-side cursor,
+       with the queryset's prefetches run once per chunk"""
+    lookups = queryset._prefetch_related_lookups
+    chunk = []
+    for recipe in queryset.prefetch_related(None).iterator(chunk_size):
+        chunk.append(recipe)
+        if len(chunk) == chunk_size:
+            prefetch_related_objects(chunk, *lookups)
+            yield chunk
+            chunk = []
+    if chunk:
+        prefetch_related_objects(chunk, *lookups)
+        yield chunk
+
+
+def ndjson_lines(rows):
+    """Encode serialized recipes as newline delimited JSON"""
+    for row in rows:
+        yield json.dumps(row, cls=JSONEncoder, ensure_ascii=False) + '\n'
+
+
+def csv_lines(rows, fields):
+    """Encode serialized recipes as CSV, joining tag names with ';'"""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(fields)
+    for row in rows:
+        if 'tags' in row:
+            row['tags'] = ';'.join(tag['name'] for tag in row['tags'])
+        yield writer.writerow([row[field] for field in fields])
@@ -0,0 +1,82 @@
+"""
+Pagination for recipe API's
+"""
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils.translation import gettext as _
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class RecipeCursorPagination(CursorPagination):
+    """keyset pagination over the recipe list ordering"""
+    ordering = '-id'
+    page_size = settings.API_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+
+class TagCursorPagination(RecipeCursorPagination):
+    """keyset pagination over the tag list ordering"""
+    ordering = '-name'
+
+
+class RecipeSearchPagination(PageNumberPagination):
+    """page numbers over search results, which are ordered by rank.
+
+    A page is read with one row past it to tell whether another follows,
+    so the matches are never counted.
+    """
+    page_size = settings.API_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        self.request = request
+        try:
+            self.number = int(request.query_params.get(
+                self.page_query_param, 1
+            ))
+            if self.number < 1:
+                raise ValueError
+        except ValueError:
+            raise NotFound(_('Invalid page.'))
+
+        start = (self.number - 1) * page_size
+        rows = list(queryset[start:start + page_size + 1])
+        if not rows and self.number > 1:
+            raise NotFound(_('Invalid page.'))
+        self.has_next = len(rows) > page_size
+        return rows[:page_size]
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.page_query_param, self.number + 1)
+
+    def get_previous_link(self):
+        if self.number == 1:
+            return None
+        url = self.request.build_absolute_uri()
+        if self.number == 2:
+            return remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.page_query_param, self.number - 1)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        schema = super().get_paginated_response_schema(schema)
+        del schema['properties']['count']
+        return schema
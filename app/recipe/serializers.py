@@ -1,51 +1,185 @@
-from rest_framework.serializers import ModelSerializer
+from functools import cached_property, partial
+
+from django.db import IntegrityError, transaction
+from django.utils.translation import gettext as _
+from rest_framework.serializers import (
+    BaseSerializer,
+    BooleanField,
+    CharField,
+    ChoiceField,
+    DecimalField,
+    IntegerField,
+    ListField,
+    ListSerializer,
+    ModelSerializer,
+    Serializer,
+    ValidationError
+)
+from core.metrics import TimedDataMixin, TimedListSerializer
 from core.models import Recipe, Tag
 
+# most recipes one bulk request may create or delete
+BULK_MAX_ITEMS = 1000
+
+
+def get_or_create_tags(user, names):
+    """Return the user's tags by name, creating missing ones in bulk"""
+    if not names:
+        return {}
+
+    existing = {
+        tag.name: tag
+        for tag in Tag.objects.filter(user=user, name__in=names)
+    }
+    missing = [Tag(user=user, name=name) for name in names
+               if name not in existing]
+    if missing:
+        Tag.objects.bulk_create(missing, ignore_conflicts=True)
+        created = Tag.objects.filter(
+            user=user,
+            name__in=[tag.name for tag in missing]
+        )
+        existing.update((tag.name, tag) for tag in created)
 
-class TagSerializer(ModelSerializer):
+    return existing
+
+
+class TagSerializer(TimedDataMixin, ModelSerializer):
     """Serializer class for Tags"""
     class Meta:
         model = Tag
         fields = ['id', 'name']
         read_only_fields = ['id']
+        list_serializer_class = TimedListSerializer
+
+    def update(self, instance, validated_data):
+        """Update a tag, rejecting names the user already has"""
+        try:
+            with transaction.atomic():
+                return super().update(instance, validated_data)
+        except IntegrityError:
+            msg = _('A tag with this name already exists')
+            raise ValidationError({'name': [msg]})
+
+
+class RecipeTagsSerializer(ListSerializer):
+    """Serializer class for a recipe's tags, read from the denormalized
+       tags_cache snapshot when the recipe was loaded with it"""
+
+    def get_attribute(self, instance):
+        if ('tags_cache' not in instance.get_deferred_fields()
+                and instance.tags_cache is not None):
+            return instance.tags_cache
+        return super().get_attribute(instance)
+
+
+class SparseFieldsMixin:
+    """Render only the fields named in the context's 'fields', if any"""
+
+    def get_fields(self):
+        fields = super().get_fields()
+        names = self.context.get('fields')
+        if names is None:
+            return fields
+        return {
+            name: field for name, field in fields.items() if name in names
+        }
+
 
+class RecipeListSerializer(TimedListSerializer):
+    """Serializer class for creating many recipes at once"""
+    batch_size = 500
 
-class RecipeSerializer(ModelSerializer):
+    def create(self, validated_data):
+        """Insert recipes and their tag assignments in bulk"""
+        user = self.context['request'].user
+        recipe_tags = [
+            list(dict.fromkeys(tag['name'] for tag in attrs.pop('tags', [])))
+            for attrs in validated_data
+        ]
+        names = list(dict.fromkeys(
+            name for names in recipe_tags for name in names
+        ))
+
+        with transaction.atomic():
+            recipes = Recipe.objects.bulk_create(
+                [Recipe(**attrs) for attrs in validated_data],
+                batch_size=self.batch_size
+            )
+            tags = get_or_create_tags(user, names)
+            RecipeTag = Recipe.tags.through
+            RecipeTag.objects.bulk_create(
+                [
+                    RecipeTag(recipe_id=recipe.id, tag_id=tags[name].id)
+                    for recipe, names in zip(recipes, recipe_tags)
+                    for name in names
+                ],
+                batch_size=self.batch_size
+            )
+            Recipe.objects.filter(
+                id__in=[recipe.id for recipe in recipes]
+            ).update_tag_fields()
+        return recipes
+
+
+class RecipeSerializer(SparseFieldsMixin, TimedDataMixin, ModelSerializer):
     """Serializer class for recipe"""
-    tags = TagSerializer(many=True, required=False)
+    tags = RecipeTagsSerializer(child=TagSerializer(), required=False)
 
     class Meta:
         model = Recipe
         fields = ['id', 'title', 'time_minutes', 'price', 'link', 'tags']
         read_only_fields = ['id']
+        list_serializer_class = RecipeListSerializer
+
+    def _get_or_create_tags(self, tags):
+        """fetch the user's tags by name, creating missing ones in bulk"""
+        names = list(dict.fromkeys(tag['name'] for tag in tags))
+        by_name = get_or_create_tags(self.context['request'].user, names)
+        return [by_name[name] for name in names]
 
     def _create_or_update_tags(self, tags, recipe):
         """creating or updating tags when needed"""
-        auth_user = self.context['request'].user
-        for tag in tags:
-            tag_obj, created = Tag.objects.get_or_create(
-                user=auth_user,
-                **tag
-            )
-            recipe.tags.add(tag_obj)
+        tags = self._get_or_create_tags(tags)
+        recipe.tags.set(tags)
+        self._set_tags_cache(recipe, tags)
+
+    def _set_tags_cache(self, recipe, tags):
+        """match the loaded tags_cache to the tags just written, as the
+           signals only update the stored one"""
+        recipe.tags_cache = [
+            {'id': tag.id, 'name': tag.name}
+            for tag in sorted(tags, key=lambda tag: tag.id)
+        ]
 
     def create(self, validated_data):
         tags = validated_data.pop('tags', [])
-        recipe = Recipe.objects.create(**validated_data)
-        self._create_or_update_tags(tags, recipe)
+        recipe = Recipe(**validated_data)
+        # adding the tags indexes the new recipe, text included
+        recipe._tags_follow = bool(tags)
+        recipe.save(force_insert=True)
+        if tags:
+            tags = self._get_or_create_tags(tags)
+            recipe.tags.add(*tags)
+            self._set_tags_cache(recipe, tags)
         return recipe
 
     def update(self, instance, validated_data):
         tags = validated_data.pop('tags', None)
 
         if tags is not None:
-            instance.tags.clear()
             self._create_or_update_tags(tags, instance)
 
-        for attr, value in validated_data.items():
-            setattr(instance, attr, value)
+        changed = [
+            attr for attr, value in validated_data.items()
+            if getattr(instance, attr) != value
+        ]
+        for attr in changed:
+            setattr(instance, attr, validated_data[attr])
 
-        instance.save()
+        # only what changed, so the text is re-indexed only when it did
+        # and the stored tag fields are never written back
+        instance.save(update_fields=[*changed, 'updated_at'])
 
         return instance
 
@@ -54,3 +188,147 @@ class RecipeDetailSerializer(RecipeSerializer):
     """Serializer class for recipe detail view"""
     class Meta(RecipeSerializer.Meta):
         fields = RecipeSerializer.Meta.fields + ['description']
+
+
+def _compile_fields(serializer, sources):
+    """(name, row key, conversion) of each field serializer renders"""
+    compiled = []
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        if isinstance(field, ListSerializer):
+            convert = partial(_render_rows, _compile_fields(field.child, {}))
+        elif isinstance(field, BaseSerializer):
+            convert = partial(_render_row, _compile_fields(field, {}))
+        else:
+            convert = field.to_representation
+        compiled.append((name, sources.get(name, field.source), convert))
+    return compiled
+
+
+def _render_row(compiled, row):
+    return {
+        name: None if row[key] is None else convert(row[key])
+        for name, key, convert in compiled
+    }
+
+
+def _render_rows(compiled, rows):
+    return [_render_row(compiled, row) for row in rows]
+
+
+class RowSerializer(TimedDataMixin, BaseSerializer):
+    """Read-only serializer rendering .values() rows exactly like
+       serializer_class, with each field's conversion looked up once
+       per class instead of introspected per row. The context's 'fields'
+       narrows the rendered fields like SparseFieldsMixin."""
+    serializer_class = None
+    sources = {}
+
+    class Meta:
+        list_serializer_class = TimedListSerializer
+
+    @classmethod
+    def compiled(cls, fields=None):
+        if '_compiled' not in cls.__dict__:
+            cls._compiled = _compile_fields(
+                cls.serializer_class(), cls.sources
+            )
+        if fields is None:
+            return cls._compiled
+        return [entry for entry in cls._compiled if entry[0] in fields]
+
+    @classmethod
+    def columns(cls, fields=None):
+        """the row keys to select with .values()"""
+        return [key for _name, key, _convert in cls.compiled(fields)]
+
+    @cached_property
+    def _selected(self):
+        return self.compiled(self.context.get('fields'))
+
+    def to_representation(self, instance):
+        return _render_row(self._selected, instance)
+
+
+class RecipeRowSerializer(RowSerializer):
+    """Render recipe rows like RecipeSerializer, tags from tags_cache"""
+    serializer_class = RecipeSerializer
+    sources = {'tags': 'tags_cache'}
+
+
+class TagRowSerializer(RowSerializer):
+    """Render tag rows like TagSerializer"""
+    serializer_class = TagSerializer
+
+
+class RecipeBulkDeleteSerializer(Serializer):
+    """Serializer class for deleting recipes by id"""
+    ids = ListField(
+        child=IntegerField(), allow_empty=False, max_length=BULK_MAX_ITEMS
+    )
+
+
+class RecipeFilterSerializer(Serializer):
+    """Serializer class for recipe list query parameters"""
+    tags = CharField(required=False)
+    tags_match = ChoiceField(choices=['any', 'all'], default='any')
+    max_time = IntegerField(required=False, min_value=0)
+    price_lte = DecimalField(max_digits=5, decimal_places=2, required=False)
+    max_tags = 20
+
+    def validate_tags(self, value):
+        """convert a comma separated list of ids to integers"""
+        try:
+            ids = [int(str_id) for str_id in value.split(',')]
+        except ValueError:
+            raise ValidationError(_('Give a comma separated list of ids'))
+        if len(ids) > self.max_tags:
+            msg = _('Filter by at most %(max)d tags')
+            raise ValidationError(msg % {'max': self.max_tags})
+        return ids
+
+
+class RecipeFieldsSerializer(Serializer):
+    """Serializer class for the ?fields= and ?expand= query parameters.
+
+    The context's 'fields' lists the fields that can be selected. Tags
+    are rendered by default, but once ?fields= is given only when listed
+    there or in ?expand=tags.
+    """
+    fields = CharField(required=False)
+    expand = CharField(required=False)
+    expandable = ['tags']
+
+    def _names(self, value, choices):
+        names = [name.strip() for name in value.split(',') if name.strip()]
+        unknown = [name for name in names if name not in choices]
+        if unknown or not names:
+            msg = _('Choose from %(choices)s')
+            raise ValidationError(msg % {'choices': ', '.join(choices)})
+        return names
+
+    def validate_fields(self, value):
+        return self._names(value, self.context['fields'])
+
+    def validate_expand(self, value):
+        return self._names(value, [
+            name for name in self.expandable if name in self.context['fields']
+        ])
+
+    def validate(self, attrs):
+        """add the selected field names in serializer order, or None to
+           render every field"""
+        if 'fields' in attrs:
+            names = set(attrs['fields']) | set(attrs.get('expand', []))
+            attrs['selected'] = [
+                name for name in self.context['fields'] if name in names
+            ]
+        else:
+            attrs['selected'] = None
+        return attrs
+
+
+class TagFilterSerializer(Serializer):
+    """Serializer class for tag list query parameters"""
+    assigned_only = BooleanField(default=False)
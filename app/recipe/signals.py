@@ -0,0 +1,24 @@
+"""
+Signal handlers keeping cached recipe API responses current
+"""
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from core.models import Recipe, Tag
+from .cache import bump_version
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def invalidate_on_change(sender, instance, **kwargs):
+    """Bump the owner's version when a recipe or tag changes"""
+    bump_version(instance.user_id)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def invalidate_on_tags_changed(sender, instance, action, **kwargs):
+    """Bump the owner's version when a recipe's tags change"""
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        bump_version(instance.user_id)
@@ -0,0 +1,152 @@
+"""Test filtering the recipe and tag lists"""
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+
+RECIPE_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+def create_recipe(user, **params):
+    """Create and return a sample recipe"""
+    defaults = {
+        'title': 'Sample recipe',
+        'time_minutes': 10,
+        'price': Decimal('5.00'),
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class RecipeFilterTests(TestCase):
+    """Test filtering recipes by tags, time and price"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        self.vegan = Tag.objects.create(user=self.user, name='Vegan')
+        self.quick = Tag.objects.create(user=self.user, name='Quick')
+        self.salad = create_recipe(
+            user=self.user, title='Salad', time_minutes=5,
+            price=Decimal('3.00')
+        )
+        self.salad.tags.add(self.vegan, self.quick)
+        self.curry = create_recipe(
+            user=self.user, title='Curry', time_minutes=40,
+            price=Decimal('9.50')
+        )
+        self.curry.tags.add(self.vegan)
+        self.steak = create_recipe(
+            user=self.user, title='Steak', time_minutes=20,
+            price=Decimal('20.00')
+        )
+
+    def titles(self, **params):
+        res = self.client.get(RECIPE_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return sorted(recipe['title'] for recipe in res.data['results'])
+
+    def test_filter_tags_any(self):
+        """Test recipes with any of the given tags are returned"""
+        tags = f'{self.vegan.id},{self.quick.id}'
+
+        self.assertEqual(self.titles(tags=tags), ['Curry', 'Salad'])
+
+    def test_filter_tags_all(self):
+        """Test recipes with all of the given tags are returned"""
+        tags = f'{self.vegan.id},{self.quick.id}'
+
+        self.assertEqual(self.titles(tags=tags, tags_match='all'), ['Salad'])
+
+    def test_filter_max_time(self):
+        """Test filtering by maximum preparation time"""
+        self.assertEqual(self.titles(max_time=20), ['Salad', 'Steak'])
+
+    def test_filter_price_lte(self):
+        """Test filtering by maximum price"""
+        self.assertEqual(self.titles(price_lte='9.50'), ['Curry', 'Salad'])
+
+    def test_filters_combined(self):
+        """Test filters narrow the list together"""
+        titles = self.titles(tags=str(self.vegan.id), max_time=30)
+
+        self.assertEqual(titles, ['Salad'])
+
+    def test_filter_no_duplicates(self):
+        """Test a recipe matching several tags is listed once"""
+        tags = f'{self.vegan.id},{self.quick.id}'
+        res = self.client.get(RECIPE_URL, {'tags': tags})
+
+        ids = [recipe['id'] for recipe in res.data['results']]
+        self.assertEqual(len(ids), len(set(ids)))
+
+    def test_filter_uses_exists_subquery(self):
+        """Test tag filtering does not join and de-duplicate"""
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(RECIPE_URL, {'tags': str(self.vegan.id)})
+
+        sql = next(
+            q['sql'] for q in queries if 'FROM "core_recipe"' in q['sql']
+        )
+        self.assertIn('EXISTS', sql)
+        self.assertNotIn('DISTINCT', sql)
+
+    def test_invalid_filters_error(self):
+        """Test malformed filter values are rejected"""
+        for params in [
+            {'tags': 'a,b'},
+            {'tags_match': 'some'},
+            {'max_time': 'soon'},
+            {'price_lte': 'cheap'},
+        ]:
+            res = self.client.get(RECIPE_URL, params)
+            self.assertEqual(
+                res.status_code, status.HTTP_400_BAD_REQUEST, params
+            )
+
+
+class TagFilterTests(TestCase):
+    """Test filtering tags assigned to recipes"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_filter_assigned_only(self):
+        """Test listing only tags assigned to a recipe"""
+        assigned = Tag.objects.create(user=self.user, name='Breakfast')
+        Tag.objects.create(user=self.user, name='Lunch')
+        for _ in range(2):
+            create_recipe(user=self.user).tags.add(assigned)
+
+        res = self.client.get(TAGS_URL, {'assigned_only': 1})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [tag['name'] for tag in res.data['results']], ['Breakfast']
+        )
+
+    def test_filter_assigned_only_off(self):
+        """Test all tags are listed by default"""
+        Tag.objects.create(user=self.user, name='Breakfast')
+
+        res = self.client.get(TAGS_URL, {'assigned_only': 0})
+
+        self.assertEqual(len(res.data['results']), 1)
@@ -0,0 +1,101 @@
+"""Test the recipe and tag list queries are served by indexes"""
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+
+
+RECIPE_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+class ListQueryPlanTests(TestCase):
+    """Test EXPLAIN output for the list endpoint queries"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='plan@example.com',
+            password='testpass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _explain_list_query(self, url, table, marker='SELECT', sort=False):
+        """run the list request and EXPLAIN its query on ``table``"""
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        sql = next(
+            query['sql'] for query in queries
+            if query['sql'].startswith('SELECT')
+            and f'FROM "{table}"' in query['sql']
+            and marker in query['sql']
+        )
+        with connection.cursor() as cursor:
+            # the test tables are tiny, so keep the planner off seq scans,
+            # and off sorting the few rows another (user_id, ...) index
+            # finds, which their stale statistics can make look cheaper
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            if not sort:
+                cursor.execute('SET LOCAL enable_sort = off')
+            cursor.execute(f'EXPLAIN {sql}')
+            return '\n'.join(row[0] for row in cursor.fetchall())
+
+    def test_recipe_list_uses_user_id_index(self):
+        """Test recipe list is an index scan on (user_id, id DESC)"""
+        for _ in range(3):
+            Recipe.objects.create(
+                user=self.user,
+                title='Sample',
+                time_minutes=5,
+                price=Decimal('1.00')
+            )
+
+        plan = self._explain_list_query(RECIPE_URL, 'core_recipe')
+
+        self.assertIn('Index Scan using core_recipe_user_id_desc_idx', plan)
+        self.assertNotIn('Sort', plan)
+
+    def test_tag_list_uses_user_name_index(self):
+        """Test tag list is an index scan on (user_id, name)"""
+        for name in ['Vegan', 'Dessert', 'Lunch']:
+            Tag.objects.create(user=self.user, name=name)
+
+        plan = self._explain_list_query(TAGS_URL, 'core_tag')
+
+        self.assertIn('core_tag_unique_user_name', plan)
+        self.assertNotIn('Sort', plan)
+
+    def test_recipe_search_uses_gin_index(self):
+        """Test recipe search is served by the (user, search_vector) GIN
+           index"""
+        Recipe.objects.bulk_create(
+            Recipe(
+                user=self.user,
+                title=f'Pancakes {i}',
+                time_minutes=5,
+                price=Decimal('1.00')
+            )
+            for i in range(2000)
+        )
+        Recipe.objects.create(
+            user=self.user,
+            title='Chicken curry',
+            time_minutes=5,
+            price=Decimal('1.00')
+        )
+        Recipe.objects.update_search_vector()
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE core_recipe')
+
+        plan = self._explain_list_query(
+            f'{RECIPE_URL}?q=curry', 'core_recipe', marker='ts_rank',
+            sort=True
+        )
+
+        self.assertIn('core_recipe_user_search_idx', plan)
@@ -0,0 +1,223 @@
+"""
+Query budgets for the recipe and tag API's
+"""
+import itertools
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+from core.tests.query_budget import QueryBudgetTestCase
+
+RECIPE_URL = reverse('recipe:recipe-list')
+BULK_URL = reverse('recipe:recipe-bulk')
+EXPORT_URL = reverse('recipe:recipe-export')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+def recipe_url(recipe_id):
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+def tag_url(tag_id):
+    return reverse('recipe:tag-detail', args=[tag_id])
+
+
+class RecipeBudgetTestCase(QueryBudgetTestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.tags = [
+            Tag.objects.create(user=self.user, name=f'Tag {i}')
+            for i in range(3)
+        ]
+        self.names = itertools.count()
+
+    def create_recipe(self, tags=()):
+        recipe = Recipe.objects.create(
+            user=self.user,
+            title='Spicy lentil soup',
+            time_minutes=10,
+            price=Decimal('5.00'),
+            link='https://example.com/recipe'
+        )
+        recipe.tags.add(*tags)
+        return recipe
+
+    def recipes(self, size):
+        """grow the user's recipes, each with three tags, to size"""
+        count = Recipe.objects.filter(user=self.user).count()
+        for _ in range(count, size):
+            self.create_recipe(self.tags)
+
+    def tagged_recipe(self, size):
+        """a new recipe with size tags"""
+        self.recipes(size)
+        return self.create_recipe([
+            Tag.objects.create(user=self.user, name=f'Own {next(self.names)}')
+            for _ in range(size)
+        ])
+
+
+class RecipeQueryBudgetTests(RecipeBudgetTestCase):
+    """Test recipe endpoints run a fixed, budgeted set of queries"""
+
+    def test_list(self):
+        self.assertQueryBudget(
+            'recipe.list', self.recipes,
+            lambda _: self.client.get(RECIPE_URL)
+        )
+
+    def test_list_filtered(self):
+        self.assertQueryBudget(
+            'recipe.list.filtered', self.recipes,
+            lambda _: self.client.get(RECIPE_URL, {
+                'tags': f'{self.tags[0].id},{self.tags[1].id}',
+                'tags_match': 'all',
+                'max_time': 30,
+                'price_lte': '10.00',
+            })
+        )
+
+    def test_list_search(self):
+        self.assertQueryBudget(
+            'recipe.list.search', self.recipes,
+            lambda _: self.client.get(RECIPE_URL, {'q': 'lentil'})
+        )
+
+    def test_retrieve(self):
+        self.assertQueryBudget(
+            'recipe.retrieve', self.tagged_recipe,
+            lambda recipe: self.client.get(recipe_url(recipe.id))
+        )
+
+    def test_create(self):
+        self.assertQueryBudget(
+            'recipe.create', self.recipes,
+            lambda _: self.client.post(RECIPE_URL, {
+                'title': 'New recipe',
+                'time_minutes': 5,
+                'price': '2.50',
+                'tags': [{'name': 'Tag 0'}, {'name': 'New tag'}],
+            }, format='json'),
+            status_code=status.HTTP_201_CREATED
+        )
+
+    def test_update(self):
+        self.assertQueryBudget(
+            'recipe.update', self.tagged_recipe,
+            lambda recipe: self.client.put(recipe_url(recipe.id), {
+                'title': 'Updated',
+                'time_minutes': 15,
+                'price': '3.00',
+                'tags': [{'name': 'Tag 1'}, {'name': 'Own 0'}],
+            }, format='json')
+        )
+
+    def test_partial_update(self):
+        self.assertQueryBudget(
+            'recipe.partial_update', self.tagged_recipe,
+            lambda recipe: self.client.patch(
+                recipe_url(recipe.id), {'title': 'Renamed'}, format='json'
+            )
+        )
+
+    def test_destroy(self):
+        self.assertQueryBudget(
+            'recipe.destroy', self.tagged_recipe,
+            lambda recipe: self.client.delete(recipe_url(recipe.id)),
+            status_code=status.HTTP_204_NO_CONTENT
+        )
+
+    def test_bulk_create(self):
+        self.assertQueryBudget(
+            'recipe.bulk.create', self.recipes,
+            lambda _: self.client.post(BULK_URL, [
+                {'title': 'Bulk 1', 'time_minutes': 5, 'price': '1.00',
+                 'tags': [{'name': 'Tag 0'}]},
+                {'title': 'Bulk 2', 'time_minutes': 5, 'price': '1.00',
+                 'tags': [{'name': 'Bulk tag'}]},
+            ], format='json'),
+            status_code=status.HTTP_201_CREATED
+        )
+
+    def test_bulk_delete(self):
+        def populate(size):
+            self.recipes(size)
+            return [self.create_recipe(self.tags).id for _ in range(size)]
+
+        self.assertQueryBudget(
+            'recipe.bulk.delete', populate,
+            lambda ids: self.client.delete(
+                BULK_URL, {'ids': ids}, format='json'
+            )
+        )
+
+    def test_export(self):
+        def export(_):
+            res = self.client.get(EXPORT_URL)
+            b''.join(res.streaming_content)
+            return res
+
+        self.assertQueryBudget('recipe.export', self.recipes, export)
+
+
+class TagQueryBudgetTests(RecipeBudgetTestCase):
+    """Test tag endpoints run a fixed, budgeted set of queries"""
+
+    def tags_on_recipes(self, size):
+        """grow the recipes and tags to size, returning a new tag on
+           every recipe"""
+        self.recipes(size)
+        count = Tag.objects.filter(user=self.user).count()
+        for _ in range(count, size):
+            name = f'Extra {next(self.names)}'
+            Tag.objects.create(user=self.user, name=name)
+        tag = Tag.objects.create(
+            user=self.user, name=f'Shared {next(self.names)}'
+        )
+        tag.recipe_set.add(*Recipe.objects.filter(user=self.user))
+        return tag
+
+    def test_list(self):
+        self.assertQueryBudget(
+            'tag.list', self.tags_on_recipes,
+            lambda _: self.client.get(TAGS_URL)
+        )
+
+    def test_list_assigned_only(self):
+        self.assertQueryBudget(
+            'tag.list.assigned_only', self.tags_on_recipes,
+            lambda _: self.client.get(TAGS_URL, {'assigned_only': 1})
+        )
+
+    def test_update(self):
+        self.assertQueryBudget(
+            'tag.update', self.tags_on_recipes,
+            lambda tag: self.client.put(
+                tag_url(tag.id), {'name': f'Renamed {tag.id}'}
+            )
+        )
+
+    def test_partial_update(self):
+        self.assertQueryBudget(
+            'tag.partial_update', self.tags_on_recipes,
+            lambda tag: self.client.patch(
+                tag_url(tag.id), {'name': f'Patched {tag.id}'}
+            )
+        )
+
+    def test_destroy(self):
+        self.assertQueryBudget(
+            'tag.destroy', self.tags_on_recipes,
+            lambda tag: self.client.delete(tag_url(tag.id)),
+            status_code=status.HTTP_204_NO_CONTENT
+        )
@@ -1,17 +1,28 @@
 """Test Recipe API Endpoints"""
+import csv
+import io
+import json
+from unittest.mock import patch
 from rest_framework.test import APIClient
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from decimal import Decimal
 from django.contrib.auth import get_user_model
 from core.models import Recipe, Tag
 from django.urls import reverse
 from rest_framework import status
 from recipe.serializers import (
+    BULK_MAX_ITEMS,
     RecipeSerializer,
     RecipeDetailSerializer
 )
+from recipe.pagination import RecipeCursorPagination
+from recipe.views import RecipeViewSet
 
 RECIPE_URL = reverse('recipe:recipe-list')
+BULK_URL = reverse('recipe:recipe-bulk')
+EXPORT_URL = reverse('recipe:recipe-export')
 
 
 def detail_url(recipe_id):
@@ -78,7 +89,7 @@ class PrivateRecipeAPITests(TestCase):
         serializer = RecipeSerializer(recipes, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_recipe_list_limited_to_user(self):
         """Test list of recipe is limited ti authenticated user"""
@@ -95,7 +106,7 @@ class PrivateRecipeAPITests(TestCase):
         serializer = RecipeSerializer(recipes, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_get_recipe_detail(self):
         """Test retrieve a list of recipes"""
@@ -267,6 +278,8 @@ class PrivateRecipeAPITests(TestCase):
         res = self.client.patch(url, payload, format='json')
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['tags'],
+                         [{'id': tag_lunch.id, 'name': 'Lunch'}])
         self.assertIn(tag_lunch, recipe.tags.all())
         self.assertNotIn(tag_breakfast, recipe.tags.all())
 
@@ -282,5 +295,309 @@ class PrivateRecipeAPITests(TestCase):
         res = self.client.patch(url, payload, format='json')
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['tags'], [])
         self.assertNotIn(tag, recipe.tags.all())
         self.assertEqual(recipe.tags.count(), 0)
+
+    def test_list_query_count_constant(self):
+        """Test listing recipes does not query tags per recipe"""
+        def count_list_queries():
+            with CaptureQueriesContext(connection) as queries:
+                res = self.client.get(RECIPE_URL)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            return len(queries)
+
+        for i in range(2):
+            recipe = create_recipe(user=self.user)
+            recipe.tags.add(Tag.objects.create(user=self.user, name=f'T{i}'))
+        baseline = count_list_queries()
+
+        for i in range(10):
+            recipe = create_recipe(user=self.user)
+            recipe.tags.add(Tag.objects.create(user=self.user, name=f'N{i}'))
+
+        self.assertEqual(count_list_queries(), baseline)
+
+    def test_detail_query_count(self):
+        """Test retrieving a recipe with tags uses a fixed number of queries"""
+        recipe = create_recipe(user=self.user)
+        for name in ['Vegan', 'Dinner', 'Quick']:
+            recipe.tags.add(Tag.objects.create(user=self.user, name=name))
+
+        with self.assertNumQueries(2):
+            res = self.client.get(detail_url(recipe.id))
+
+        self.assertEqual(len(res.data['tags']), 3)
+
+    def test_create_recipe_tag_queries_constant(self):
+        """Test creating a recipe takes the same queries for any tag count"""
+        def count_create_queries(tag_names):
+            payload = {
+                'title': 'Many tags',
+                'time_minutes': 10,
+                'price': Decimal('1.50'),
+                'tags': [{'name': name} for name in tag_names]
+            }
+            with CaptureQueriesContext(connection) as queries:
+                res = self.client.post(RECIPE_URL, payload, format='json')
+            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+            return len(queries)
+
+        Tag.objects.create(user=self.user, name='Existing')
+        few = count_create_queries(['Existing', 'A', 'B'])
+        many = count_create_queries(
+            ['Existing'] + [f'Tag {i}' for i in range(30)]
+        )
+
+        self.assertEqual(few, many)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 33)
+
+    def test_update_recipe_tag_queries_constant(self):
+        """Test updating recipe tags takes the same queries for any count"""
+        def count_update_queries(recipe, tag_names):
+            payload = {'tags': [{'name': name} for name in tag_names]}
+            with CaptureQueriesContext(connection) as queries:
+                res = self.client.patch(
+                    detail_url(recipe.id), payload, format='json'
+                )
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            return len(queries)
+
+        few = count_update_queries(
+            create_recipe(user=self.user), ['A', 'B']
+        )
+        many = count_update_queries(
+            create_recipe(user=self.user), [f'Tag {i}' for i in range(30)]
+        )
+
+        self.assertEqual(few, many)
+
+    def test_update_recipe_keeps_unchanged_tags(self):
+        """Test updating tags only adds and removes the difference"""
+        recipe = create_recipe(user=self.user)
+        kept = Tag.objects.create(user=self.user, name='Kept')
+        dropped = Tag.objects.create(user=self.user, name='Dropped')
+        recipe.tags.add(kept, dropped)
+        through_id = recipe.tags.through.objects.get(tag=kept).id
+
+        payload = {'tags': [{'name': 'Kept'}, {'name': 'Added'}]}
+        res = self.client.patch(detail_url(recipe.id), payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            recipe.tags.through.objects.get(tag=kept).id, through_id
+        )
+        self.assertNotIn(dropped, recipe.tags.all())
+        self.assertTrue(recipe.tags.filter(name='Added').exists())
+
+    def test_list_paginated_with_cursor(self):
+        """Test recipes are paged by cursor in descending id order"""
+        recipes = [create_recipe(user=self.user) for _ in range(5)]
+        expected = [recipe.id for recipe in reversed(recipes)]
+
+        res = self.client.get(RECIPE_URL, {'page_size': 2})
+        seen = [recipe['id'] for recipe in res.data['results']]
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertLessEqual(len(res.data['results']), 2)
+            seen += [recipe['id'] for recipe in res.data['results']]
+
+        self.assertEqual(seen, expected)
+
+    def test_list_page_size_capped(self):
+        """Test requested page size is limited to the maximum"""
+        for _ in range(3):
+            create_recipe(user=self.user)
+
+        with patch.object(RecipeCursorPagination, 'max_page_size', 2):
+            res = self.client.get(RECIPE_URL, {'page_size': 100})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 2)
+        self.assertIsNotNone(res.data['next'])
+
+    def test_bulk_create_recipes(self):
+        """Test creating many recipes with tags in one request"""
+        Tag.objects.create(user=self.user, name='Dinner')
+        payload = [
+            {
+                'title': f'Recipe {i}',
+                'time_minutes': 10 + i,
+                'price': '2.50',
+                'description': 'Bulk',
+                'tags': [{'name': 'Dinner'}, {'name': f'Tag {i % 2}'}],
+            }
+            for i in range(4)
+        ]
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['errors'], [])
+        self.assertEqual(
+            [recipe['title'] for recipe in res.data['created']],
+            [item['title'] for item in payload]
+        )
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 4)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 3)
+        for recipe in Recipe.objects.filter(user=self.user):
+            self.assertEqual(recipe.tags.count(), 2)
+            self.assertEqual(recipe.description, 'Bulk')
+
+    def test_bulk_create_reports_item_errors(self):
+        """Test invalid items are reported while valid ones are created"""
+        payload = [
+            {'title': 'Good', 'time_minutes': 5, 'price': '1.00'},
+            {'title': 'Bad', 'price': '1.00'},
+        ]
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(res.data['created']), 1)
+        self.assertEqual(res.data['errors'][0]['index'], 1)
+        self.assertIn('time_minutes', res.data['errors'][0]['errors'])
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 1)
+
+    def test_bulk_create_all_invalid_error(self):
+        """Test a batch without valid items returns an error"""
+        res = self.client.post(BULK_URL, [{'title': 'Bad'}], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Recipe.objects.filter(user=self.user).exists())
+
+    def test_bulk_create_requires_list(self):
+        """Test the bulk endpoint rejects a single object"""
+        payload = {'title': 'One', 'time_minutes': 5, 'price': '1.00'}
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_create_queries_constant(self):
+        """Test bulk create query count does not grow with batch size"""
+        def count_bulk_queries(size):
+            payload = [
+                {
+                    'title': f'Recipe {i}',
+                    'time_minutes': 5,
+                    'price': '1.00',
+                    'tags': [{'name': f'Size {size} tag {i}'}],
+                }
+                for i in range(size)
+            ]
+            with CaptureQueriesContext(connection) as queries:
+                res = self.client.post(BULK_URL, payload, format='json')
+            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+            return len(queries)
+
+        self.assertEqual(count_bulk_queries(3), count_bulk_queries(40))
+
+    def test_bulk_delete_recipes(self):
+        """Test deleting recipes by id only removes the user's own"""
+        other_user = create_user(email='other@example.com', password='pw123')
+        mine = [create_recipe(user=self.user) for _ in range(3)]
+        theirs = create_recipe(user=other_user)
+
+        payload = {'ids': [mine[0].id, mine[1].id, theirs.id]}
+        res = self.client.delete(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['deleted'], 2)
+        self.assertEqual(
+            list(Recipe.objects.filter(user=self.user)), [mine[2]]
+        )
+        self.assertTrue(Recipe.objects.filter(id=theirs.id).exists())
+
+    def test_bulk_delete_limited(self):
+        """Test deleting more recipes than the bulk limit is rejected"""
+        payload = {'ids': list(range(1, BULK_MAX_ITEMS + 2))}
+        res = self.client.delete(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('ids', res.data)
+
+    def test_bulk_delete_bumps_version_once(self):
+        """Test a bulk delete invalidates cached responses in one bump"""
+        ids = [create_recipe(user=self.user).id for _ in range(3)]
+
+        with patch('recipe.cache._bump') as bump:
+            self.client.delete(BULK_URL, {'ids': ids}, format='json')
+
+        bump.assert_called_once_with(self.user.id)
+
+    def test_export_ndjson(self):
+        """Test exporting recipes streams one JSON object per line"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        recipes = [create_recipe(user=self.user) for _ in range(3)]
+        recipes[0].tags.add(tag)
+        create_recipe(user=create_user(email='o@example.com', password='pw'))
+
+        res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+        content = b''.join(res.streaming_content).decode()
+        rows = [json.loads(line) for line in content.splitlines()]
+        expected = RecipeDetailSerializer(
+            Recipe.objects.filter(user=self.user).order_by('-id'), many=True
+        ).data
+        self.assertEqual(rows, json.loads(json.dumps(expected)))
+
+    def test_export_csv(self):
+        """Test exporting recipes as CSV with tag names joined"""
+        recipe = create_recipe(user=self.user, title='Curry')
+        recipe.tags.add(
+            Tag.objects.create(user=self.user, name='Thai'),
+            Tag.objects.create(user=self.user, name='Dinner'),
+        )
+
+        res = self.client.get(EXPORT_URL, {'export_format': 'csv'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'text/csv')
+        content = b''.join(res.streaming_content).decode()
+        header, row = list(csv.reader(io.StringIO(content)))
+        self.assertEqual(header, RecipeDetailSerializer.Meta.fields)
+        row = dict(zip(header, row))
+        self.assertEqual(row['title'], 'Curry')
+        self.assertEqual(row['price'], '15.30')
+        self.assertEqual(sorted(row['tags'].split(';')), ['Dinner', 'Thai'])
+
+    @override_settings(RECIPE_TAGS_CACHE=False)
+    def test_export_queries_per_chunk(self):
+        """Test export queries grow with chunks rather than recipes"""
+        for i in range(5):
+            recipe = create_recipe(user=self.user)
+            recipe.tags.add(Tag.objects.create(user=self.user, name=f'T{i}'))
+
+        with patch.object(RecipeViewSet, 'export_chunk_size', 2):
+            with CaptureQueriesContext(connection) as queries:
+                res = self.client.get(EXPORT_URL)
+                lines = b''.join(res.streaming_content).splitlines()
+
+        self.assertEqual(len(lines), 5)
+        tag_queries = [q for q in queries if 'core_recipe_tags' in q['sql']]
+        self.assertEqual(len(tag_queries), 3)
+
+    def test_export_reads_tag_snapshot(self):
+        """Test export renders tags without querying them per chunk"""
+        for i in range(5):
+            recipe = create_recipe(user=self.user)
+            recipe.tags.add(Tag.objects.create(user=self.user, name=f'T{i}'))
+
+        with patch.object(RecipeViewSet, 'export_chunk_size', 2):
+            with CaptureQueriesContext(connection) as queries:
+                res = self.client.get(EXPORT_URL)
+                lines = b''.join(res.streaming_content).splitlines()
+
+        self.assertEqual(len(lines), 5)
+        self.assertEqual(json.loads(lines[0])['tags'][0]['name'], 'T4')
+        tag_queries = [q for q in queries if 'core_recipe_tags' in q['sql']]
+        self.assertEqual(tag_queries, [])
+
+    def test_export_invalid_format_error(self):
+        """Test an unknown export format is rejected"""
+        res = self.client.get(EXPORT_URL, {'export_format': 'xml'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,216 @@
+"""Test the versioned list response cache"""
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+
+RECIPE_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+def create_recipe(user, **params):
+    """Create and return a sample recipe"""
+    defaults = {
+        'title': 'Sample recipe',
+        'time_minutes': 10,
+        'price': Decimal('5.00'),
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class ListResponseCacheTests(TestCase):
+    """Test caching of recipe and tag list responses"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_repeated_list_served_from_cache(self):
+        """Test an unchanged recipe list is not queried again"""
+        create_recipe(user=self.user)
+        first = self.client.get(RECIPE_URL)
+
+        with self.assertNumQueries(0):
+            second = self.client.get(RECIPE_URL)
+
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second['ETag'], first['ETag'])
+
+    def test_create_invalidates_list(self):
+        """Test creating a recipe through the API refreshes the list"""
+        self.client.get(RECIPE_URL)
+        payload = {'title': 'New', 'time_minutes': 5, 'price': '1.00'}
+        self.client.post(RECIPE_URL, payload)
+
+        res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_update_and_delete_invalidate_list(self):
+        """Test updating and deleting a recipe refreshes the list"""
+        recipe = create_recipe(user=self.user)
+        self.client.get(RECIPE_URL)
+        url = reverse('recipe:recipe-detail', args=[recipe.id])
+
+        self.client.patch(url, {'title': 'Changed'})
+        res = self.client.get(RECIPE_URL)
+        self.assertEqual(res.data['results'][0]['title'], 'Changed')
+
+        self.client.delete(url)
+        res = self.client.get(RECIPE_URL)
+        self.assertEqual(res.data['results'], [])
+
+    def test_tag_rename_invalidates_recipe_list(self):
+        """Test renaming a tag refreshes recipe lists showing it"""
+        recipe = create_recipe(user=self.user)
+        tag = Tag.objects.create(user=self.user, name='Dinner')
+        recipe.tags.add(tag)
+        self.client.get(RECIPE_URL)
+
+        url = reverse('recipe:tag-detail', args=[tag.id])
+        self.client.patch(url, {'name': 'Supper'})
+        res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(res.data['results'][0]['tags'][0]['name'], 'Supper')
+
+    def test_cache_separate_per_user(self):
+        """Test cached lists are never served to other users"""
+        create_recipe(user=self.user, title='Mine')
+        self.client.get(RECIPE_URL)
+        other = get_user_model().objects.create_user(
+            email='other@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(other)
+
+        res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(res.data['results'], [])
+
+    def test_users_sharing_a_version_kept_apart(self):
+        """Test two users on the same version counter get their own list
+           and ETag"""
+        create_recipe(user=self.user, title='Mine')
+        other = get_user_model().objects.create_user(
+            email='other@example.com',
+            password='testpass123'
+        )
+        with patch('recipe.cache.get_version', return_value=1):
+            etag = self.client.get(RECIPE_URL)['ETag']
+            self.client.force_authenticate(other)
+
+            cached = self.client.get(RECIPE_URL)
+            conditional = self.client.get(RECIPE_URL,
+                                          HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(cached.data['results'], [])
+        self.assertNotEqual(cached['ETag'], etag)
+        self.assertEqual(conditional.status_code, status.HTTP_200_OK)
+
+    def test_if_none_match_not_modified(self):
+        """Test a matching ETag returns 304 without querying"""
+        Tag.objects.create(user=self.user, name='Vegan')
+        etag = self.client.get(TAGS_URL)['ETag']
+
+        with self.assertNumQueries(0):
+            res = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res['ETag'], etag)
+
+    def test_etag_changes_after_write(self):
+        """Test a stale ETag gets a full response after a change"""
+        etag = self.client.get(TAGS_URL)['ETag']
+        Tag.objects.create(user=self.user, name='Vegan')
+
+        res = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_bulk_create_invalidates_list(self):
+        """Test bulk created recipes show up in a cached list"""
+        self.client.get(RECIPE_URL)
+        payload = [{'title': 'Bulk', 'time_minutes': 5, 'price': '1.00'}]
+        self.client.post(
+            reverse('recipe:recipe-bulk'), payload, format='json'
+        )
+
+        res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_detail_if_none_match_not_modified(self):
+        """Test a recipe's ETag answers 304 with only an existence check"""
+        recipe = create_recipe(user=self.user)
+        url = reverse('recipe:recipe-detail', args=[recipe.id])
+        etag = self.client.get(url)['ETag']
+
+        with self.assertNumQueries(1):
+            res = self.client.get(url, HTTP_IF_NONE_MATCH=f'W/{etag}')
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res['ETag'], etag)
+
+    def test_detail_etag_changes_after_write(self):
+        """Test a stale recipe ETag gets the changed recipe"""
+        recipe = create_recipe(user=self.user)
+        url = reverse('recipe:recipe-detail', args=[recipe.id])
+        etag = self.client.get(url)['ETag']
+        self.client.patch(url, {'title': 'Changed'})
+
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['title'], 'Changed')
+        self.assertNotEqual(res['ETag'], etag)
+
+    def test_detail_etag_per_recipe(self):
+        """Test one recipe's ETag does not answer for another"""
+        first, second = create_recipe(self.user), create_recipe(self.user)
+        etag = self.client.get(
+            reverse('recipe:recipe-detail', args=[first.id])
+        )['ETag']
+
+        res = self.client.get(
+            reverse('recipe:recipe-detail', args=[second.id]),
+            HTTP_IF_NONE_MATCH=etag
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_detail_etag_checks_params_and_existence(self):
+        """Test a matching ETag still gets a 400 or 404 when due"""
+        recipe = create_recipe(user=self.user)
+        other = get_user_model().objects.create_user(
+            email='other@example.com',
+            password='testpass123'
+        )
+        others = create_recipe(user=other)
+
+        with patch('recipe.cache._not_modified', return_value=True):
+            bad = self.client.get(
+                reverse('recipe:recipe-detail', args=[recipe.id]),
+                {'fields': 'secret'}
+            )
+            hidden = self.client.get(
+                reverse('recipe:recipe-detail', args=[others.id])
+            )
+
+        self.assertEqual(bad.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(hidden.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,98 @@
+"""
+Test the row serializers render exactly like the model serializers
+"""
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+from recipe.serializers import (
+    RecipeRowSerializer,
+    RecipeSerializer,
+    TagRowSerializer,
+    TagSerializer
+)
+
+RECIPE_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+class RowSerializerParityTests(TestCase):
+    """Test row serializers are byte-identical to the model serializers"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123'
+        )
+        tags = [
+            Tag.objects.create(user=self.user, name=name)
+            for name in ['Vegan', 'Café', 'Line break', '"Quoted"']
+        ]
+        samples = [
+            ('Plain', 5, Decimal('5'), '', []),
+            ('Crème brûlée', 45, Decimal('12.50'), 'https://example.com',
+             tags[:2]),
+            ('Spicy </script>', 0, Decimal('999.99'), 'x', tags),
+            ('\U0001f35c Ramen', 20, Decimal('0.01'), '', tags[2:]),
+        ]
+        for title, minutes, price, link, recipe_tags in samples:
+            recipe = Recipe.objects.create(
+                user=self.user,
+                title=title,
+                time_minutes=minutes,
+                price=price,
+                link=link
+            )
+            recipe.tags.add(*recipe_tags)
+
+    def render(self, data):
+        return JSONRenderer().render(data)
+
+    def test_recipe_rows_match_recipe_serializer(self):
+        recipes = Recipe.objects.order_by('-id')
+        rows = recipes.values(*RecipeRowSerializer.columns())
+
+        expected = RecipeSerializer(
+            recipes.prefetch_related('tags'), many=True
+        ).data
+        actual = RecipeRowSerializer(rows, many=True).data
+
+        self.assertEqual(self.render(actual), self.render(expected))
+
+    def test_tag_rows_match_tag_serializer(self):
+        tags = Tag.objects.order_by('-name')
+        rows = tags.values(*TagRowSerializer.columns())
+
+        expected = TagSerializer(tags, many=True).data
+        actual = TagRowSerializer(rows, many=True).data
+
+        self.assertEqual(self.render(actual), self.render(expected))
+
+    @override_settings(RESPONSE_CACHE_TIMEOUT=0)
+    def test_list_responses_identical(self):
+        """Test list endpoints return the same bytes on either path"""
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        for url, params in [
+            (RECIPE_URL, {'page_size': 2}),
+            (RECIPE_URL, {'page_size': 2, 'q': 'ramen OR vegan'}),
+            (TAGS_URL, {'page_size': 2}),
+        ]:
+            with override_settings(LIST_ROW_SERIALIZERS=True):
+                fast = client.get(url, params)
+            with override_settings(LIST_ROW_SERIALIZERS=False):
+                slow = client.get(url, params)
+            self.assertEqual(fast.content, slow.content)
+
+            next_url = fast.data['next']
+            with override_settings(LIST_ROW_SERIALIZERS=True):
+                fast = client.get(next_url)
+            with override_settings(LIST_ROW_SERIALIZERS=False):
+                slow = client.get(next_url)
+            self.assertEqual(fast.content, slow.content)
@@ -0,0 +1,161 @@
+"""Test full-text search on the recipe API"""
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+
+RECIPE_URL = reverse('recipe:recipe-list')
+
+
+def create_recipe(user, **params):
+    """Create and return a sample recipe"""
+    defaults = {
+        'title': 'Sample recipe',
+        'time_minutes': 10,
+        'price': Decimal('5.00'),
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class RecipeSearchTests(TestCase):
+    """Test searching recipes with ?q="""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def search(self, query, **params):
+        res = self.client.get(RECIPE_URL, {'q': query, **params})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [recipe['title'] for recipe in res.data['results']]
+
+    def test_search_title_and_description(self):
+        """Test matching recipe titles and descriptions"""
+        create_recipe(user=self.user, title='Chicken curry')
+        create_recipe(user=self.user, title='Stew', description='Curries')
+        create_recipe(user=self.user, title='Pancakes')
+
+        self.assertEqual(
+            sorted(self.search('curry')), ['Chicken curry', 'Stew']
+        )
+
+    def test_search_ranks_title_above_description(self):
+        """Test title matches are ranked before description matches"""
+        create_recipe(user=self.user, title='Stew', description='Lentil')
+        create_recipe(user=self.user, title='Lentil soup')
+
+        self.assertEqual(self.search('lentil'), ['Lentil soup', 'Stew'])
+
+    def test_search_tag_names(self):
+        """Test matching tag names, including after a rename"""
+        recipe = create_recipe(user=self.user, title='Pad thai')
+        tag = Tag.objects.create(user=self.user, name='Noodles')
+        recipe.tags.add(tag)
+        self.assertEqual(self.search('noodles'), ['Pad thai'])
+
+        tag.name = 'Street food'
+        tag.save()
+        self.assertEqual(self.search('noodles'), [])
+        self.assertEqual(self.search('street'), ['Pad thai'])
+
+        recipe.tags.remove(tag)
+        self.assertEqual(self.search('street'), [])
+
+    def test_search_after_tag_deleted(self):
+        """Test a deleted tag no longer matches its recipes"""
+        recipe = create_recipe(user=self.user, title='Salad')
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        recipe.tags.add(tag)
+
+        tag.delete()
+
+        self.assertEqual(self.search('vegan'), [])
+
+    def test_search_after_update(self):
+        """Test edited recipes are re-indexed"""
+        recipe = create_recipe(user=self.user, title='Pie')
+        url = reverse('recipe:recipe-detail', args=[recipe.id])
+        self.client.patch(url, {'title': 'Tart'})
+
+        self.assertEqual(self.search('pie'), [])
+        self.assertEqual(self.search('tart'), ['Tart'])
+
+    def test_search_created_with_and_without_tags(self):
+        """Test recipes created through the API are indexed once saved"""
+        for title, tags in (('Fried rice', [{'name': 'Wok'}]),
+                            ('Plain rice', [])):
+            self.client.post(RECIPE_URL, {
+                'title': title,
+                'time_minutes': 5,
+                'price': '1.00',
+                'tags': tags,
+            }, format='json')
+
+        self.assertEqual(sorted(self.search('rice')),
+                         ['Fried rice', 'Plain rice'])
+        self.assertEqual(self.search('wok'), ['Fried rice'])
+
+    def test_search_bulk_created(self):
+        """Test recipes created in bulk are searchable"""
+        payload = [{
+            'title': 'Bulk biryani',
+            'time_minutes': 5,
+            'price': '1.00',
+            'tags': [{'name': 'Rice'}],
+        }]
+        self.client.post(
+            reverse('recipe:recipe-bulk'), payload, format='json'
+        )
+
+        self.assertEqual(self.search('rice'), ['Bulk biryani'])
+
+    def test_search_limited_to_user(self):
+        """Test search only returns the user's own recipes"""
+        other = get_user_model().objects.create_user(
+            email='other@example.com',
+            password='testpass123'
+        )
+        create_recipe(user=other, title='Other curry')
+
+        self.assertEqual(self.search('curry'), [])
+
+    def test_search_paginated(self):
+        """Test search results are paged"""
+        for i in range(3):
+            create_recipe(user=self.user, title=f'Soup {i}')
+
+        res = self.client.get(RECIPE_URL, {'q': 'soup', 'page_size': 2})
+
+        self.assertNotIn('count', res.data)
+        self.assertIsNone(res.data['previous'])
+        self.assertEqual(len(res.data['results']), 2)
+        res = self.client.get(res.data['next'])
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertIsNone(res.data['next'])
+        self.assertIsNotNone(res.data['previous'])
+
+    def test_search_page_past_results_not_found(self):
+        create_recipe(user=self.user, title='Soup')
+
+        res = self.client.get(RECIPE_URL, {'q': 'soup', 'page': 2})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    @override_settings(SEARCH_MAX_MATCHES=2)
+    def test_search_ranks_newest_matches(self):
+        """Test only the newest SEARCH_MAX_MATCHES matches are ranked"""
+        create_recipe(user=self.user, title='Lentil soup')
+        create_recipe(user=self.user, title='Stew', description='Lentil')
+        create_recipe(user=self.user, title='Dal', description='Lentil')
+
+        self.assertEqual(sorted(self.search('lentil')), ['Dal', 'Stew'])
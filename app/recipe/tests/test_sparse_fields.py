@@ -0,0 +1,145 @@
+"""
+Test selecting recipe fields with ?fields= and ?expand=
+"""
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+
+RECIPE_URL = reverse('recipe:recipe-list')
+EXPORT_URL = reverse('recipe:recipe-export')
+
+
+def detail_url(recipe_id):
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+@override_settings(RESPONSE_CACHE_TIMEOUT=0)
+class SparseFieldsTests(TestCase):
+    """Test responses and queries narrow to the requested fields"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.tag = Tag.objects.create(user=self.user, name='Vegan')
+        for i in range(3):
+            recipe = Recipe.objects.create(
+                user=self.user,
+                title=f'Recipe {i}',
+                time_minutes=10,
+                price=Decimal('5.50'),
+                description='Long description',
+                link='https://example.com'
+            )
+            recipe.tags.add(self.tag)
+        self.recipe = recipe
+
+    def get(self, url, params):
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(url, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res, [query['sql'] for query in queries]
+
+    def test_list_fields(self):
+        """Test only the requested fields are selected and rendered"""
+        for row_serializers in (True, False):
+            with override_settings(LIST_ROW_SERIALIZERS=row_serializers):
+                res, queries = self.get(RECIPE_URL, {'fields': 'title,id'})
+
+            self.assertEqual(
+                [list(item) for item in res.data['results']],
+                [['id', 'title']] * 3
+            )
+            self.assertEqual(len(queries), 1)
+            self.assertNotIn('"price"', queries[0])
+            self.assertNotIn('"tags_cache"', queries[0])
+
+    def test_list_fields_paginate_without_id(self):
+        """Test the cursor still pages when id is not rendered"""
+        res, _queries = self.get(RECIPE_URL, {'fields': 'title',
+                                              'page_size': 2})
+
+        self.assertEqual(res.data['results'], [{'title': 'Recipe 2'},
+                                               {'title': 'Recipe 1'}])
+        res = self.client.get(res.data['next'])
+        self.assertEqual(res.data['results'], [{'title': 'Recipe 0'}])
+
+    def test_expand_tags(self):
+        """Test tags come back with ?expand=tags or listed in ?fields="""
+        expected = [{'id': self.tag.id, 'name': 'Vegan'}]
+        for params in ({'fields': 'title', 'expand': 'tags'},
+                       {'fields': 'title,tags'}):
+            res, queries = self.get(RECIPE_URL, params)
+
+            self.assertEqual(res.data['results'][0],
+                             {'title': 'Recipe 2', 'tags': expected})
+            self.assertIn('"tags_cache"', queries[0])
+
+    def test_expand_alone_renders_every_field(self):
+        res, _queries = self.get(RECIPE_URL, {'expand': 'tags'})
+
+        self.assertEqual(
+            list(res.data['results'][0]),
+            ['id', 'title', 'time_minutes', 'price', 'link', 'tags']
+        )
+
+    @override_settings(RECIPE_TAGS_CACHE=False)
+    def test_tags_prefetched_only_when_expanded(self):
+        """Test the tags join runs only when tags are rendered"""
+        _res, queries = self.get(RECIPE_URL, {'fields': 'id,title'})
+        self.assertEqual(len(queries), 1)
+
+        res, queries = self.get(RECIPE_URL, {'fields': 'id',
+                                             'expand': 'tags'})
+        self.assertEqual(len(queries), 2)
+        self.assertEqual(res.data['results'][0]['tags'][0]['name'], 'Vegan')
+
+    def test_retrieve_fields(self):
+        """Test detail fields, including description, can be selected"""
+        res, queries = self.get(detail_url(self.recipe.id),
+                                {'fields': 'description'})
+
+        self.assertEqual(res.data, {'description': 'Long description'})
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('"title"', queries[0])
+
+    def test_export_fields(self):
+        """Test exports write only the requested columns"""
+        res = self.client.get(EXPORT_URL, {'export_format': 'csv',
+                                           'fields': 'title,price'})
+        content = b''.join(res.streaming_content).decode()
+
+        self.assertEqual(content.splitlines()[:2],
+                         ['title,price', 'Recipe 2,5.50'])
+
+    def test_invalid_fields(self):
+        """Test unknown or empty selections are rejected"""
+        for params in ({'fields': 'title,secret'},
+                       {'fields': ','},
+                       {'fields': 'title', 'expand': 'user'},
+                       {'fields': 'description'}):
+            res = self.client.get(RECIPE_URL, params)
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_writes_ignore_fields(self):
+        """Test create responds with every field regardless of ?fields="""
+        res = self.client.post(
+            RECIPE_URL + '?fields=id',
+            {'title': 'New', 'time_minutes': 5, 'price': '1.00'},
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertIn('description', res.data)
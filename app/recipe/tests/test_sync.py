@@ -0,0 +1,288 @@
+"""
+Test incremental sync of recipes and tags with ?since=
+"""
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Tombstone
+from recipe.sync import make_token, parse_token
+
+RECIPE_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+def detail_url(recipe_id):
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+def tag_url(tag_id):
+    return reverse('recipe:tag-detail', args=[tag_id])
+
+
+def create_recipe(user, title='Sample recipe'):
+    return Recipe.objects.create(
+        user=user,
+        title=title,
+        time_minutes=10,
+        price=Decimal('5.00')
+    )
+
+
+def age(queryset, **delta):
+    """move rows' change times into the past"""
+    queryset.update(updated_at=timezone.now() - timedelta(**delta))
+
+
+class SyncTokenTests(TestCase):
+
+    def test_round_trip(self):
+        moment = timezone.now()
+
+        self.assertEqual(parse_token(make_token(moment)), moment)
+
+
+@override_settings(RESPONSE_CACHE_TIMEOUT=0, SYNC_OVERLAP_SECONDS=10)
+class SyncApiTests(TestCase):
+    """Test ?since= returns only what changed after a token"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.tag = Tag.objects.create(user=self.user, name='Dinner')
+        self.recipes = [create_recipe(self.user, f'Old {i}') for i in range(3)]
+        self.recipes[0].tags.add(self.tag)
+        age(Recipe.objects.all(), hours=1)
+        age(Tag.objects.all(), hours=1)
+        self.token = make_token(timezone.now() - timedelta(minutes=30))
+
+    def sync(self, url, since=None, **params):
+        if '?' in url:
+            # a next link
+            res = self.client.get(url)
+        else:
+            res = self.client.get(url, {'since': since or self.token,
+                                        **params})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res.data
+
+    def test_full_sync_from_zero(self):
+        data = self.sync(RECIPE_URL, '0')
+
+        self.assertEqual(len(data['results']), 3)
+        self.assertEqual(data['deleted'], [])
+        self.assertTrue(data['sync_token'])
+
+    def test_nothing_changed(self):
+        before = timezone.now()
+        data = self.sync(RECIPE_URL)
+
+        self.assertEqual(data['results'], [])
+        self.assertEqual(data['deleted'], [])
+        self.assertGreaterEqual(parse_token(data['sync_token']), before)
+
+    def test_changed_created_and_deleted_recipes(self):
+        """Test edits, new recipes and deletions show up"""
+        self.client.patch(detail_url(self.recipes[1].id), {'title': 'Edit'})
+        new = create_recipe(self.user, 'New')
+        self.client.delete(detail_url(self.recipes[2].id))
+
+        data = self.sync(RECIPE_URL)
+
+        self.assertEqual(
+            sorted(recipe['id'] for recipe in data['results']),
+            [self.recipes[1].id, new.id]
+        )
+        self.assertEqual(data['deleted'], [self.recipes[2].id])
+
+    def test_tag_changes_mark_recipes_changed(self):
+        """Test adding tags and renaming a tag resend affected recipes"""
+        self.recipes[1].tags.add(self.tag)
+        data = self.sync(RECIPE_URL)
+        self.assertEqual(
+            [recipe['id'] for recipe in data['results']],
+            [self.recipes[1].id]
+        )
+
+        age(Recipe.objects.all(), hours=1)
+        self.client.patch(tag_url(self.tag.id), {'name': 'Supper'})
+        data = self.sync(RECIPE_URL)
+
+        self.assertEqual(
+            sorted(recipe['id'] for recipe in data['results']),
+            [self.recipes[0].id, self.recipes[1].id]
+        )
+        self.assertEqual(data['results'][0]['tags'][0]['name'], 'Supper')
+
+    def test_deleted_tag(self):
+        """Test a deleted tag is reported and its recipe resent"""
+        self.client.delete(tag_url(self.tag.id))
+
+        tags = self.sync(TAGS_URL)
+        recipes = self.sync(RECIPE_URL)
+
+        self.assertEqual(tags['results'], [])
+        self.assertEqual(tags['deleted'], [self.tag.id])
+        self.assertEqual(recipes['deleted'], [])
+        self.assertEqual(recipes['results'][0]['tags'], [])
+
+    def test_tag_changes(self):
+        new = Tag.objects.create(user=self.user, name='Lunch')
+
+        data = self.sync(TAGS_URL)
+
+        self.assertEqual(data['results'], [{'id': new.id, 'name': 'Lunch'}])
+
+    def test_overlap_resends_recent_changes(self):
+        """Test rows changed just before the token are sent again"""
+        age(Recipe.objects.filter(id=self.recipes[0].id), minutes=30,
+            seconds=5)
+
+        data = self.sync(RECIPE_URL)
+
+        self.assertEqual([recipe['id'] for recipe in data['results']],
+                         [self.recipes[0].id])
+
+    def test_sync_with_fields_keeps_id(self):
+        self.client.patch(detail_url(self.recipes[1].id), {'title': 'Edit'})
+
+        for fields in ('id,title', 'title'):
+            data = self.sync(RECIPE_URL, fields=fields)
+
+            self.assertEqual(data['results'],
+                             [{'id': self.recipes[1].id, 'title': 'Edit'}])
+
+    @override_settings(SYNC_PAGE_SIZE=2)
+    def test_changes_paged(self):
+        """Test large syncs come in pages, with the token on the last"""
+        for row_serializers in (True, False):
+            with override_settings(LIST_ROW_SERIALIZERS=row_serializers):
+                first = self.sync(RECIPE_URL, '0')
+                self.assertIsNone(first['sync_token'])
+                self.assertEqual(first['deleted'], [])
+
+                last = self.sync(first['next'])
+                self.assertIsNone(last['next'])
+                self.assertTrue(last['sync_token'])
+                self.assertEqual(
+                    [recipe['id'] for recipe in first['results']
+                     + last['results']],
+                    [recipe.id for recipe in self.recipes]
+                )
+
+    @override_settings(SYNC_PAGE_SIZE=1)
+    def test_changes_while_paging_not_skipped(self):
+        """Test rows edited between pages are still sent, deletions are
+           listed on the last page"""
+        self.client.patch(detail_url(self.recipes[0].id), {'title': 'A'})
+        self.client.patch(detail_url(self.recipes[1].id), {'title': 'B'})
+        self.client.patch(detail_url(self.recipes[2].id), {'title': 'C'})
+
+        first = self.sync(RECIPE_URL)
+        self.client.patch(detail_url(self.recipes[0].id), {'title': 'A2'})
+        self.client.patch(detail_url(self.recipes[1].id), {'title': 'B2'})
+        self.client.delete(detail_url(self.recipes[2].id))
+        pages = [first]
+        while pages[-1]['next']:
+            pages.append(self.sync(pages[-1]['next']))
+
+        self.assertEqual(
+            [recipe['title'] for page in pages for recipe in page['results']],
+            ['A', 'A2', 'B2']
+        )
+        self.assertEqual([page['deleted'] for page in pages],
+                         [[], [], [self.recipes[2].id]])
+        self.assertEqual(
+            [bool(page['sync_token']) for page in pages],
+            [False, False, True]
+        )
+
+    def test_invalid_cursor(self):
+        res = self.client.get(RECIPE_URL, {'since': self.token,
+                                           'cursor': 'not a cursor'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_other_users_changes_excluded(self):
+        other = get_user_model().objects.create_user(
+            email='other@example.com',
+            password='testpass123'
+        )
+        create_recipe(other).delete()
+
+        data = self.sync(RECIPE_URL)
+
+        self.assertEqual(data['results'], [])
+        self.assertEqual(data['deleted'], [])
+
+    def test_invalid_and_expired_tokens(self):
+        expired = make_token(timezone.now() - timedelta(days=31))
+        for since in ('not a token!', 'zzzzzzzzzzzzzzzzzz', expired):
+            res = self.client.get(RECIPE_URL, {'since': since})
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_delete_records_tombstones(self):
+        ids = [recipe.id for recipe in self.recipes[:2]]
+        self.client.delete(reverse('recipe:recipe-bulk'), {'ids': ids},
+                           format='json')
+
+        data = self.sync(RECIPE_URL)
+
+        self.assertEqual(sorted(data['deleted']), ids)
+
+
+class TombstoneTests(TestCase):
+    """Test tombstones are kept and cleaned up"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123'
+        )
+
+    def test_deleting_user_leaves_no_tombstones(self):
+        """Test a user's cascaded recipes and tags record no tombstones,
+           while other deletions still do"""
+        recipe = create_recipe(self.user)
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Dinner'))
+        other = get_user_model().objects.create_user(
+            email='other@example.com',
+            password='testpass123'
+        )
+
+        with CaptureQueriesContext(connection) as queries:
+            self.user.delete()
+
+        self.assertFalse(any(
+            query['sql'].startswith('INSERT INTO "core_tombstone"')
+            for query in queries
+        ))
+        self.assertFalse(Tombstone.objects.exists())
+        create_recipe(other).delete()
+        self.assertEqual(Tombstone.objects.count(), 1)
+
+    def test_prune(self):
+        create_recipe(self.user).delete()
+        create_recipe(self.user).delete()
+        Tombstone.objects.filter(
+            id=Tombstone.objects.first().id
+        ).update(deleted_at=timezone.now() - timedelta(days=31))
+
+        call_command('prune_tombstones', stdout=StringIO())
+
+        self.assertEqual(Tombstone.objects.count(), 1)
@@ -0,0 +1,225 @@
+"""
+Test the denormalized tag snapshot stored on recipes
+"""
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+
+RECIPE_URL = reverse('recipe:recipe-list')
+BULK_URL = reverse('recipe:recipe-bulk')
+
+
+def detail_url(recipe_id):
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+def tag_url(tag_id):
+    return reverse('recipe:tag-detail', args=[tag_id])
+
+
+def create_recipe(user, **params):
+    defaults = {
+        'title': 'Sample recipe',
+        'time_minutes': 10,
+        'price': Decimal('5.00'),
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class TagsCacheTests(TestCase):
+    """Test Recipe.tags_cache follows the recipe's tags"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(self.user)
+
+    def assertSnapshotMatches(self, recipe):
+        recipe.refresh_from_db()
+        expected = [
+            {'id': tag.id, 'name': tag.name}
+            for tag in recipe.tags.order_by('id')
+        ]
+        self.assertEqual(recipe.tags_cache, expected)
+
+    def test_list_reads_tags_from_snapshot(self):
+        """Test listing recipes is one query without joining tags"""
+        for i in range(3):
+            recipe = create_recipe(self.user)
+            recipe.tags.add(Tag.objects.create(user=self.user, name=f'T{i}'))
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        sqls = [q['sql'] for q in queries]
+        self.assertEqual(len(sqls), 1)
+        self.assertNotIn('core_recipe_tags', sqls[0])
+        self.assertEqual(
+            [recipe['tags'][0]['name'] for recipe in res.data['results']],
+            ['T2', 'T1', 'T0']
+        )
+
+    def test_list_matches_prefetched_tags(self):
+        """Test the snapshot renders exactly like the joined tags"""
+        recipe = create_recipe(self.user)
+        for name in ['Vegan', 'Dinner', 'Quick']:
+            recipe.tags.add(Tag.objects.create(user=self.user, name=name))
+
+        cached = self.client.get(RECIPE_URL)
+        with override_settings(RECIPE_TAGS_CACHE=False):
+            joined = self.client.get(RECIPE_URL)
+
+        self.assertEqual(cached.content, joined.content)
+
+    def test_snapshot_follows_api_writes(self):
+        """Test creating and updating recipes through the API"""
+        payload = {
+            'title': 'Curry',
+            'time_minutes': 30,
+            'price': '9.50',
+            'tags': [{'name': 'Thai'}, {'name': 'Dinner'}],
+        }
+        res = self.client.post(RECIPE_URL, payload, format='json')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        recipe = Recipe.objects.get(id=res.data['id'])
+        self.assertSnapshotMatches(recipe)
+        self.assertEqual(
+            res.data['tags'],
+            self.client.get(RECIPE_URL).data['results'][0]['tags']
+        )
+
+        res = self.client.patch(
+            detail_url(recipe.id),
+            {'tags': [{'name': 'Lunch'}]},
+            format='json'
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertSnapshotMatches(recipe)
+
+        res = self.client.patch(
+            detail_url(recipe.id), {'title': 'Green curry'}, format='json'
+        )
+        self.assertSnapshotMatches(recipe)
+        self.assertEqual(recipe.tags_cache[0]['name'], 'Lunch')
+
+    def test_snapshot_follows_tag_rename_and_delete(self):
+        """Test renaming and deleting a tag updates its recipes"""
+        tag = Tag.objects.create(user=self.user, name='Breakfast')
+        other = Tag.objects.create(user=self.user, name='Quick')
+        recipe = create_recipe(self.user)
+        recipe.tags.add(tag, other)
+
+        self.client.patch(tag_url(tag.id), {'name': 'Brunch'})
+        self.assertSnapshotMatches(recipe)
+        self.assertEqual(recipe.tags_cache[0]['name'], 'Brunch')
+
+        self.client.delete(tag_url(tag.id))
+        self.assertSnapshotMatches(recipe)
+        self.assertEqual(
+            recipe.tags_cache, [{'id': other.id, 'name': 'Quick'}]
+        )
+
+        other.recipe_set.clear()
+        self.assertSnapshotMatches(recipe)
+        self.assertEqual(recipe.tags_cache, [])
+
+    def test_stale_instance_save_keeps_snapshot(self):
+        """Test saving an instance loaded before a tag change"""
+        recipe = create_recipe(self.user)
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Soup'))
+
+        recipe.title = 'Tomato soup'
+        recipe.save()
+
+        self.assertSnapshotMatches(recipe)
+        self.assertEqual(len(recipe.tags_cache), 1)
+
+    def test_update_without_text_change_skips_refresh(self):
+        """Test only edits to the text re-index and re-snapshot a recipe"""
+        recipe = create_recipe(self.user)
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Soup'))
+
+        for payload, refreshed in (({'time_minutes': 20}, False),
+                                   ({'title': 'Sample recipe'}, False),
+                                   ({'title': 'Tomato soup'}, True)):
+            with CaptureQueriesContext(connection) as queries:
+                res = self.client.patch(detail_url(recipe.id), payload)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+            updates = [query['sql'] for query in queries
+                       if query['sql'].startswith('UPDATE "core_recipe"')]
+            self.assertEqual(len(updates), 2 if refreshed else 1)
+            self.assertNotIn('"tags_cache"', updates[0])
+            self.assertEqual(
+                Recipe.objects.filter(
+                    id=recipe.id, search_vector='tomato'
+                ).exists(),
+                refreshed
+            )
+            self.assertSnapshotMatches(recipe)
+
+    def test_bulk_create_builds_snapshots(self):
+        """Test recipes created in bulk get their snapshots"""
+        payload = [
+            {'title': f'R{i}', 'time_minutes': 5, 'price': '1.00',
+             'tags': [{'name': 'Bulk'}, {'name': f'N{i}'}]}
+            for i in range(3)
+        ]
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        for recipe in Recipe.objects.filter(user=self.user):
+            self.assertSnapshotMatches(recipe)
+            self.assertEqual(len(recipe.tags_cache), 2)
+
+
+class RebuildTagsCacheCommandTests(TestCase):
+    """Test the rebuild_tags_cache command"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123'
+        )
+        self.recipes = [create_recipe(self.user) for _ in range(3)]
+        tag = Tag.objects.create(user=self.user, name='Stew')
+        for recipe in self.recipes:
+            recipe.tags.add(tag)
+
+    def test_verify_passes_when_current(self):
+        out = StringIO()
+
+        call_command('rebuild_tags_cache', '--verify', stdout=out)
+
+        self.assertIn('tags_cache is up to date', out.getvalue())
+
+    def test_rebuild_repairs_stale_snapshots(self):
+        Recipe.objects.filter(id=self.recipes[0].id).update(tags_cache=None)
+        Recipe.objects.filter(id=self.recipes[1].id).update(tags_cache=[])
+
+        with self.assertRaisesMessage(CommandError, '2 recipes'):
+            call_command('rebuild_tags_cache', '--verify', stdout=StringIO())
+
+        out = StringIO()
+        call_command('rebuild_tags_cache', '--batch-size', '2', stdout=out)
+        self.assertIn('Rebuilt tags_cache of 3 recipes', out.getvalue())
+
+        call_command('rebuild_tags_cache', '--verify', stdout=StringIO())
+        for recipe in Recipe.objects.all():
+            self.assertEqual(recipe.tags_cache[0]['name'], 'Stew')
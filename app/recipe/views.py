@@ -1,51 +1,395 @@
 """
 Views for Recipe API's
 """
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Prefetch
+from django.http import StreamingHttpResponse
+from django.utils.translation import gettext as _
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import (
+    OpenApiParameter,
+    extend_schema,
+    extend_schema_view
+)
 from rest_framework import (
     viewsets,
-    mixins
+    mixins,
+    status
 )
-from rest_framework.authentication import TokenAuthentication
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
 
-from core.models import Recipe, Tag
+from core.authentication import CachedTokenAuthentication
+from core.models import SEARCH_CONFIG, Recipe, Tag, Tombstone
+from .cache import (
+    VersionedDetailETagMixin,
+    VersionedListCacheMixin,
+    batched_bumps,
+    bump_version
+)
+from .export import csv_lines, iter_chunks, ndjson_lines
+from .pagination import (
+    RecipeCursorPagination,
+    RecipeSearchPagination,
+    TagCursorPagination
+)
 from .serializers import (
+    BULK_MAX_ITEMS,
     RecipeSerializer,
     RecipeDetailSerializer,
-    TagSerializer
+    RecipeBulkDeleteSerializer,
+    RecipeFieldsSerializer,
+    RecipeFilterSerializer,
+    RecipeRowSerializer,
+    RowSerializer,
+    TagSerializer,
+    TagFilterSerializer,
+    TagRowSerializer
 )
+from .sync import SyncListMixin
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+SPARSE_FIELDS_PARAMETERS = [
+    OpenApiParameter(
+        'fields',
+        OpenApiTypes.STR,
+        description='Comma separated list of fields to return'
+    ),
+    OpenApiParameter(
+        'expand',
+        OpenApiTypes.STR,
+        enum=['tags'],
+        description='Include tags along with the fields given in fields'
+    ),
+]
+
+SYNC_PARAMETER = OpenApiParameter(
+    'since',
+    OpenApiTypes.STR,
+    description='Sync token from an earlier response, or 0; returns the '
+                'changed rows, deleted ids and a new sync_token'
+)
+
+
+@extend_schema_view(
+    list=extend_schema(
+        parameters=SPARSE_FIELDS_PARAMETERS + [
+            SYNC_PARAMETER,
+            OpenApiParameter(
+                'tags',
+                OpenApiTypes.STR,
+                description='Comma separated list of tag IDs to filter'
+            ),
+            OpenApiParameter(
+                'tags_match',
+                OpenApiTypes.STR,
+                enum=['any', 'all'],
+                description='Match recipes with any (default) or all tags'
+            ),
+            OpenApiParameter(
+                'max_time',
+                OpenApiTypes.INT,
+                description='Maximum preparation time in minutes'
+            ),
+            OpenApiParameter(
+                'price_lte',
+                OpenApiTypes.DECIMAL,
+                description='Maximum price'
+            ),
+            OpenApiParameter(
+                'q',
+                OpenApiTypes.STR,
+                description='Full-text search over titles, descriptions '
+                            'and tag names'
+            ),
+        ]
+    ),
+    retrieve=extend_schema(parameters=SPARSE_FIELDS_PARAMETERS),
+    export=extend_schema(parameters=SPARSE_FIELDS_PARAMETERS)
+)
+class RecipeViewSet(SyncListMixin,
+                    VersionedListCacheMixin,
+                    VersionedDetailETagMixin,
+                    viewsets.ModelViewSet):
     """view for manage recipe  APIs"""
     serializer_class = RecipeDetailSerializer
     queryset = Recipe.objects.all()
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
+    pagination_class = RecipeCursorPagination
+    bulk_max_items = BULK_MAX_ITEMS
+    export_chunk_size = 500
+    throttle_scopes = {'bulk': 'bulk', 'export': 'export'}
+    tags_cache_actions = ('list', 'export')
+    sparse_fields_actions = ('list', 'retrieve', 'export')
+    # actions rendering recipes straight from get_queryset(); the writes
+    # reload what they render after saving
+    plan_actions = ('list', 'retrieve', 'export', 'bulk')
+    tombstone_kind = Tombstone.RECIPE
 
     def get_queryset(self):
         """Retrieve Recipes for authenticated users"""
-        return self.queryset.filter(user=self.request.user).order_by('-id')
+        queryset = self.queryset.filter(user=self.request.user)
+        if self.action == 'list':
+            queryset = self._filter_queryset(queryset)
+        if self._search_terms():
+            return self._search(queryset)
+        if self.action in self.plan_actions:
+            queryset = self._plan_queryset(queryset)
+        return queryset.order_by('-id')
+
+    def _filter_queryset(self, queryset):
+        """apply the tag, time and price filters from the query string"""
+        filters = RecipeFilterSerializer(data=self.request.query_params)
+        filters.is_valid(raise_exception=True)
+        params = filters.validated_data
+
+        tag_ids = params.get('tags')
+        if tag_ids:
+            RecipeTag = Recipe.tags.through
+            tagged = RecipeTag.objects.filter(recipe_id=OuterRef('pk'))
+            if params['tags_match'] == 'all':
+                for tag_id in set(tag_ids):
+                    queryset = queryset.filter(
+                        Exists(tagged.filter(tag_id=tag_id))
+                    )
+            else:
+                queryset = queryset.filter(
+                    Exists(tagged.filter(tag_id__in=tag_ids))
+                )
+        if 'max_time' in params:
+            queryset = queryset.filter(time_minutes__lte=params['max_time'])
+        if 'price_lte' in params:
+            queryset = queryset.filter(price__lte=params['price_lte'])
+        return queryset
+
+    def _search_terms(self):
+        if self.action == 'list':
+            return self.request.query_params.get('q', '').strip()
+        return ''
+
+    def _search(self, queryset):
+        """match recipes against ?q= and order the newest
+           SEARCH_MAX_MATCHES of them by rank"""
+        query = SearchQuery(
+            self._search_terms(),
+            search_type='websearch',
+            config=SEARCH_CONFIG
+        )
+        # rank only the newest matches, as ranking reads every matched
+        # vector and broad terms can match most of a collection
+        matches = queryset.filter(search_vector=query).order_by('-id')
+        queryset = queryset.filter(
+            id__in=matches.values('id')[:settings.SEARCH_MAX_MATCHES]
+        ).annotate(rank=SearchRank(F('search_vector'), query))
+        return self._plan_queryset(queryset).order_by('-rank', '-id')
+
+    @property
+    def paginator(self):
+        if self._search_terms() and not hasattr(self, '_paginator'):
+            self._paginator = RecipeSearchPagination()
+        return super().paginator
+
+    def _requested_fields(self):
+        """the fields selected with ?fields= and ?expand=, or None"""
+        if (self.action not in self.sparse_fields_actions
+                or getattr(self, 'swagger_fake_view', False)):
+            return None
+        if not hasattr(self, '_sparse_fields'):
+            serializer_class = self.get_serializer_class()
+            declared = getattr(
+                serializer_class, 'serializer_class', serializer_class
+            ).Meta.fields
+            params = RecipeFieldsSerializer(
+                data=self.request.query_params,
+                context={'fields': declared}
+            )
+            params.is_valid(raise_exception=True)
+            self._sparse_fields = params.validated_data['selected']
+        return self._sparse_fields
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['fields'] = self._requested_fields()
+        return context
+
+    def _plan_queryset(self, queryset):
+        """load only the columns and relations the serializer renders"""
+        serializer_class = self.get_serializer_class()
+        requested = self._requested_fields()
+        if issubclass(serializer_class, RowSerializer):
+            # the cursor paginates on id, rendered or not
+            columns = serializer_class.columns(requested)
+            return queryset.values(*dict.fromkeys(['id', *columns]))
+        fields = requested or serializer_class.Meta.fields
+        columns = ['user'] + [field for field in fields if field != 'tags']
+        if 'tags' not in fields:
+            return queryset.only(*columns)
+        if (settings.RECIPE_TAGS_CACHE
+                and self.action in self.tags_cache_actions):
+            return queryset.only(*columns, 'tags_cache')
+        return queryset.only(*columns).prefetch_related(
+            Prefetch('tags', queryset=Tag.objects.order_by('id'))
+        )
 
     def get_serializer_class(self):
         if self.action == 'list':
+            if (settings.LIST_ROW_SERIALIZERS and settings.RECIPE_TAGS_CACHE
+                    and not getattr(self, 'swagger_fake_view', False)):
+                return RecipeRowSerializer
             return RecipeSerializer
         return self.serializer_class
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
+    def get_throttle_cost(self, request):
+        """charge bulk requests per recipe written or deleted"""
+        if self.action != 'bulk':
+            return 1
+        items = request.data
+        if isinstance(items, dict):
+            items = items.get('ids')
+        if not isinstance(items, list):
+            return 1
+        return max(len(items), 1)
+
+    @action(methods=['post', 'delete'], detail=False)
+    def bulk(self, request):
+        """Create a list of recipes, or delete recipes by id, in bulk"""
+        if request.method == 'DELETE':
+            return self._bulk_delete(request)
+
+        items = request.data
+        if not isinstance(items, list):
+            raise ValidationError(_('Expected a list of recipes'))
+        if len(items) > self.bulk_max_items:
+            msg = _('Send at most %(max)d recipes per request')
+            raise ValidationError(msg % {'max': self.bulk_max_items})
+
+        valid, errors = [], []
+        for index, item in enumerate(items):
+            serializer = self.get_serializer(data=item)
+            if serializer.is_valid():
+                valid.append(
+                    dict(serializer.validated_data, user=request.user)
+                )
+            else:
+                errors.append({'index': index, 'errors': serializer.errors})
+
+        created = []
+        if valid:
+            recipes = self.get_serializer(many=True).create(valid)
+            bump_version(request.user.pk)
+            created = self.get_queryset().filter(
+                id__in=[recipe.id for recipe in recipes]
+            ).order_by('id')
+
+        return Response(
+            {
+                'created': self.get_serializer(created, many=True).data,
+                'errors': errors,
+            },
+            status=status.HTTP_201_CREATED if valid
+            else status.HTTP_400_BAD_REQUEST
+        )
+
+    @action(methods=['get'], detail=False)
+    def export(self, request):
+        """Stream all the user's recipes as NDJSON or CSV"""
+        export_format = request.query_params.get('export_format', 'ndjson')
+        if export_format not in ('ndjson', 'csv'):
+            raise ValidationError(
+                {'export_format': _('Choose one of ndjson or csv')}
+            )
+
+        queryset = self.get_queryset()
+        serializer_class = self.get_serializer_class()
+        context = self.get_serializer_context()
+        rows = (
+            row
+            for chunk in iter_chunks(queryset, self.export_chunk_size)
+            for row in serializer_class(chunk, many=True,
+                                        context=context).data
+        )
+
+        if export_format == 'csv':
+            fields = (
+                self._requested_fields() or serializer_class.Meta.fields
+            )
+            lines = csv_lines(rows, fields)
+            content_type = 'text/csv'
+        else:
+            lines = ndjson_lines(rows)
+            content_type = 'application/x-ndjson'
 
-class TagViewSet(mixins.ListModelMixin,
+        response = StreamingHttpResponse(lines, content_type=content_type)
+        response['Content-Disposition'] = (
+            f'attachment; filename="recipes.{export_format}"'
+        )
+        return response
+
+    def _bulk_delete(self, request):
+        serializer = RecipeBulkDeleteSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        recipes = self.queryset.filter(
+            user=request.user,
+            id__in=serializer.validated_data['ids']
+        )
+        with transaction.atomic(), Tombstone.objects.batched(), \
+                batched_bumps():
+            _total, deleted = recipes.delete()
+        return Response({'deleted': deleted.get(Recipe._meta.label, 0)})
+
+
+@extend_schema_view(
+    list=extend_schema(
+        parameters=[
+            SYNC_PARAMETER,
+            OpenApiParameter(
+                'assigned_only',
+                OpenApiTypes.INT,
+                enum=[0, 1],
+                description='Filter by tags assigned to recipes'
+            ),
+        ]
+    )
+)
+class TagViewSet(SyncListMixin,
+                 VersionedListCacheMixin,
+                 mixins.ListModelMixin,
                  mixins.UpdateModelMixin,
                  mixins.DestroyModelMixin,
                  viewsets.GenericViewSet):
     """manage tags in the database"""
     serializer_class = TagSerializer
     queryset = Tag.objects.all()
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
+    pagination_class = TagCursorPagination
+    tombstone_kind = Tombstone.TAG
 
     def get_queryset(self):
         """filter queryset to authenticated users"""
-        return self.queryset.filter(user=self.request.user).order_by('-name')
+        queryset = self.queryset.filter(user=self.request.user)
+        if self.action == 'list':
+            filters = TagFilterSerializer(data=self.request.query_params)
+            filters.is_valid(raise_exception=True)
+            if filters.validated_data['assigned_only']:
+                queryset = queryset.filter(Exists(
+                    Recipe.tags.through.objects.filter(tag_id=OuterRef('pk'))
+                ))
+            serializer_class = self.get_serializer_class()
+            if issubclass(serializer_class, RowSerializer):
+                queryset = queryset.values(*serializer_class.columns())
+        return queryset.order_by('-name')
+
+    def get_serializer_class(self):
+        if (self.action == 'list' and settings.LIST_ROW_SERIALIZERS
+                and not getattr(self, 'swagger_fake_view', False)):
+            return TagRowSerializer
+        return self.serializer_class
@@ -7,10 +7,13 @@ from django.contrib.auth import (
     get_user_model,
     authenticate
 )
+from django.contrib.auth.hashers import make_password
 from django.utils.translation import gettext as _
 
+from core.metrics import TimedDataMixin
 
-class UserSerializer(serializers.ModelSerializer):
+
+class UserSerializer(TimedDataMixin, serializers.ModelSerializer):
     """ Serializer for the User object"""
     class Meta:
         model = get_user_model()
@@ -24,12 +27,10 @@ class UserSerializer(serializers.ModelSerializer):
     def update(self, instance, validated_data):
         """Update and return a user"""
         password = validated_data.pop('password', None)
-        user = super().update(instance, validated_data)
-
         if password:
-            user.set_password(password)
-            user.save()
-        return user
+            # hash before the single save rather than saving twice
+            validated_data['password'] = make_password(password)
+        return super().update(instance, validated_data)
 
 
 class AuthTokenSerializer(serializers.Serializer):
@@ -0,0 +1,86 @@
+"""
+Query budgets for the user API
+"""
+import itertools
+
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.tests.query_budget import QueryBudgetTestCase
+
+CREATE_USER_URL = reverse('user:create')
+TOKEN_URL = reverse('user:token')
+ME_URL = reverse('user:me')
+
+
+class UserQueryBudgetTests(QueryBudgetTestCase):
+    """Test user endpoints run a fixed, budgeted set of queries"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+            name='Test Name'
+        )
+        self.client = APIClient()
+        self.emails = itertools.count()
+
+    def users(self, size):
+        """grow the number of other users to size"""
+        count = get_user_model().objects.count() - 1
+        for _ in range(count, size):
+            get_user_model().objects.create_user(
+                email=f'other{next(self.emails)}@example.com',
+                password='testpass123'
+            )
+        return self.user
+
+    def test_create(self):
+        self.assertQueryBudget(
+            'user.create', self.users,
+            lambda _: self.client.post(CREATE_USER_URL, {
+                'email': f'new{next(self.emails)}@example.com',
+                'password': 'testpass123',
+                'name': 'New User',
+            }),
+            status_code=status.HTTP_201_CREATED
+        )
+
+    def test_token(self):
+        self.assertQueryBudget(
+            'user.token', self.users,
+            lambda user: self.client.post(TOKEN_URL, {
+                'email': user.email,
+                'password': 'testpass123',
+            })
+        )
+
+    def test_me_retrieve(self):
+        self.client.force_authenticate(self.user)
+
+        self.assertQueryBudget(
+            'user.me.retrieve', self.users,
+            lambda _: self.client.get(ME_URL)
+        )
+
+    def test_me_update(self):
+        self.client.force_authenticate(self.user)
+
+        self.assertQueryBudget(
+            'user.me.update', self.users,
+            lambda user: self.client.put(ME_URL, {
+                'email': user.email,
+                'password': 'newpass123',
+                'name': 'Updated Name',
+            })
+        )
+
+    def test_me_partial_update(self):
+        self.client.force_authenticate(self.user)
+
+        self.assertQueryBudget(
+            'user.me.partial_update', self.users,
+            lambda _: self.client.patch(ME_URL, {'name': 'Patched Name'})
+        )
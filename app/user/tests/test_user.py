@@ -106,6 +106,19 @@ class PublicUserAPITests(TestCase):
         self.assertNotIn('token', res.data)
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_create_token_inactive_user_error(self):
+        """Test no token is issued to an inactive user"""
+        user_details = {
+            'email': 'test@example.com',
+            'password': 'test-user-password123',
+        }
+        create_user(is_active=False, **user_details)
+
+        res = self.client.post(TOKEN_URL, user_details)
+
+        self.assertNotIn('token', res.data)
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
     def test_retrieve_user_unauthorize(self):
         """Test authentication is required for user"""
         res = self.client.get(ME_URL)
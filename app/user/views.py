@@ -3,9 +3,10 @@ Views for User API
 """
 from rest_framework import (
     generics,
-    authentication,
     permissions
 )
+from core.authentication import CachedTokenAuthentication
+from core.throttling import AnonBucketThrottle, ScopedBucketThrottle
 from .serializers import (
     UserSerializer,
     AuthTokenSerializer
@@ -23,12 +24,14 @@ class CreateTokenView(ObtainAuthToken):
     """Create a new Auth token for User"""
     serializer_class = AuthTokenSerializer
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
+    throttle_classes = [AnonBucketThrottle, ScopedBucketThrottle]
+    throttle_scope = 'token'
 
 
 class ManageUserView(generics.RetrieveUpdateAPIView):
     """Manage the Authenticated User"""
     serializer_class = UserSerializer
-    authentication_classes = [authentication.TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [permissions.IsAuthenticated]
 
     def get_object(self):